@@ -7,12 +7,19 @@
 #
 # Captured fields: ID, Description
 #
+# The fields are read by the shared extraction engine (nvd_extraction.py), which can also write the annotation and
+# the cluster data in a single pass over the feed.
+#
 # How to run this program (parameters are optional)
 #   python nvd_annotaion_data_parser.py input.json  output.csv
 #
 # The program takes two optional command line arguments, the name of the input json file and the name of the output csv file.
+# The input feed may also be gzip (.json.gz) or zip (.json.zip) compressed, it is read as a stream (see nvd_feed_reader.py).
+# A directory or glob pattern of several feeds (e.g. every NVD yearly feed) can be given as the input file, the feeds
+# are then parsed in parallel and merged with one record per ID (see BATCH MODE in nvd_extraction.py).
 #
-# A summary of errors and exceptions will print to the screen.
+# A summary of errors and exceptions will print to the screen.  The time, cpu time, peak memory and records per
+# second of every stage can be logged or exported for Prometheus, see nvd_instrumentation.py.
 #
 # SAMPLE OUTPUT
 # $ python nvd_annotaion_data_parser.py "Data/threats.json" "Project/threats.csv"
@@ -22,12 +29,16 @@
 # {'Records in file': 8748, 'Records read': 8748, 'No data': 0, 'Error': 0}
 #
 # DIRECTORY STRUCTURE
-# The program is expecting a /Data directory where new files will be written to.
+# The sample files are written to the directory of the output file.
 #
-# Additional OUTPUT FILES:  small random samples (i.e. files are different every time), with no replacement
+# Additional OUTPUT FILES:  small random samples, with no replacement, drawn from one seeded random order so the same
+# seed (SAMPLE_SEED in nvd_extraction.py) gives the same samples; STRATIFY_BY = 'Vendor' spreads the vendors evenly
 # In addition to the main output file containing all of the threat data in csv format
 # this program also creates 6 small files of 50 records each 50_sample_1/2/3/etc.csv and a 7th file (remainder_sample_7.csv) containing
 # all remaining records.  There is no overlap beween these 7 files.
+# The samples hold one record per group of near identical descriptions, the groups are kept in an index next to the
+# output file (near_duplicates.sqlite) and written to near_duplicate_groups.csv (see nvd_near_duplicates.py).
+# The output file is fingerprinted (nvd_fingerprint.py), a run on unchanged feeds with the same seed reuses it.
 #
 # Version History:
 #
@@ -37,98 +48,71 @@
 #   Modified by: .....
 #
 
-import json
-import pandas as pd
 import sys
 
+from nvd_extraction import new_error_report, find_feeds, extract_feeds, annotation_frame, write_annotation_data, \
+    annotation_files, annotation_inputs, record_column, near_duplicate_representatives, STRATIFY_BY, NEAR_DUPLICATE_INDEX, SAMPLE_SEED
+from nvd_instrumentation import stage, flush
+from nvd_fingerprint import fingerprint, fingerprinted_outputs, unchanged, write_fingerprint
+
 DEFAULT_INPUT_FILE_NAME = "Data/threats.json"
 DEFAULT_OUTPUT_FILE_NAME = "Data/threats.csv"
 
-input_file = ""
-output_file = ""
-
-# If there are no command line arguments the default file names will be used.
-if (len(sys.argv)==3):
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-else:
-    input_file = DEFAULT_INPUT_FILE_NAME
-    output_file = DEFAULT_OUTPUT_FILE_NAME
-
-with open(input_file) as recent_threats:
-    threats_parsed = json.loads(recent_threats.read())
-
-
-# DataFrame to hold ID and Description records
-df = pd.DataFrame()
-
-# list containing features to be added to the df
-features = []
-
-
-# dictionary object containing program statistics, exceptions, and errors
-errorReport = dict([
-    ('Records in file', len(threats_parsed['CVE_Items'])),
-    ('Records read', 0),
-    ('No data', 0),
-    ('Error', 0)
-])
-
-
-for index in range(0, len(threats_parsed['CVE_Items']), 1):
-
-    # string containing the ID number
-    CVD_ID = ""
-
-    # string containing the description
-    description = ""
-
-    try:
-        CVD_ID =  threats_parsed['CVE_Items'][index]['cve']['CVE_data_meta']['ID']
-        description = threats_parsed['CVE_Items'][index]['cve']['description']['description_data'][0]['value']
-        errorReport["Records read"] += 1
-    except:
-        print("Unknown Exception (General Data) Index ", index, " ", threats_parsed['CVE_Items'][index] )
-        errorReport["Error"] += 1
-
-    description =  CVD_ID + " | " + description
-    f = [CVD_ID, description]
-    features.append(f)
-
-    index += 1
-
-print(errorReport)
-
-
-# combine id and description into one column
-df = pd.DataFrame(features)
-
-# create 6 files of 50 randomly selected records each
-df.to_csv(output_file)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_1.csv", index=False, header=False)
-df=df.drop(sample1.index)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_2.csv", index=False, header=False)
-df=df.drop(sample1.index)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_3.csv", index=False, header=False)
-df=df.drop(sample1.index)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_4.csv", index=False, header=False)
-df=df.drop(sample1.index)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_5.csv", index=False, header=False)
-df=df.drop(sample1.index)
-
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/50_sample_6.csv", index=False, header=False)
-df=df.drop(sample1.index)
 
-# remaining records not in an annotation sample
-df.to_csv("Data/remainder_sample_7.csv", index=False, header=False)
+def run(input_file, output_file, seed=SAMPLE_SEED):
+
+    # the outputs are reused when the feeds, the near duplicate index, the parameters and the code are unchanged (see
+    # nvd_fingerprint.py), every file written is fingerprinted, the samples and the remainder as well
+    # the number of samples depends on the data, the files written by the last run are checked
+    feeds = find_feeds(input_file)
+    params = dict(output=output_file, seed=seed)
+    record = fingerprint(annotation_inputs(feeds, output_file), params)
+    outputs = fingerprinted_outputs(output_file, annotation_files(output_file))
+    if unchanged(outputs, record):
+        print("The feeds are unchanged since the last run, reusing " + ", ".join(outputs))
+        return
+
+    # dictionary object containing program statistics, exceptions, and errors
+    errorReport = new_error_report()
+
+    # records are extracted by the shared engine (nvd_extraction.py), the feed is read one record at a time
+    # a directory or glob of feeds is parsed in parallel, one feed per worker process
+    # every stage is measured (see nvd_instrumentation.py)
+    with stage("extraction") as entry:
+        records = extract_feeds(feeds, errorReport)
+        entry.update(records=len(records), error_report=errorReport)
+
+    print(errorReport)
+
+    # combine id and description into one column
+    # write all threat data and create 6 files of 50 randomly selected records each (seeded, see nvd_sampler.py)
+    # one record per group of near duplicate descriptions is sampled (see nvd_near_duplicates.py)
+    strata = record_column(records, STRATIFY_BY) if STRATIFY_BY else None
+    with stage("near_duplicates", len(records)):
+        flags = near_duplicate_representatives(records, output_file) if NEAR_DUPLICATE_INDEX else None
+    with stage("annotation_data", len(records)):
+        n_samples = write_annotation_data(annotation_frame(records), output_file, strata, seed=seed,
+                                          representatives=flags)
+    # the records of this run are now in the near duplicate index, the next run is compared with that state
+    record = fingerprint(annotation_inputs(feeds, output_file), params)
+    write_fingerprint(annotation_files(output_file, n_samples), record)
+    flush()
+
+
+def main():
+
+    input_file = ""
+    output_file = ""
+
+    # If there are no command line arguments the default file names will be used.
+    if (len(sys.argv)==3):
+        input_file = sys.argv[1]
+        output_file = sys.argv[2]
+    else:
+        input_file = DEFAULT_INPUT_FILE_NAME
+        output_file = DEFAULT_OUTPUT_FILE_NAME
+    run(input_file, output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#
+# DESCRIPTION:
+# This module (nvd_assessment.py) profiles the cluster data in one pass for the data assessment of
+# nvd_clustering_hyperparameter_validation.py.
+#
+# Every column is taken as integer codes (its categories, code -1 for a missing value), and all counts are bincounts:
+#   Records             number of records
+#   Nulls               missing values per column
+#   Values              count of every value of the seven base metric 3 fields
+#   Top_Vendor/Product  the TOP_N most common vendors and products (missing as "UNKNOWN")
+#   Frequency           count of every combination of the seven base metric 3 fields, one bincount over the packed
+#                       codes of the seven fields
+#
+# The report is written as json (nested) and as csv with one row per count:
+#   Section,Field,Value,Count
+#   Values,Attack_Vector,NETWORK,5712
+#   Frequency,Attack_Vector/.../Availability_Impact,NETWORK/LOW/NONE/NONE/HIGH/HIGH/HIGH,905
+#
+# How to use this module
+#   from nvd_assessment import profile, write_report
+#   report = profile(df)
+#   write_report(report, "Data/Assessment.json", "Data/Assessment.csv")
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import csv
+import json
+
+import numpy as np
+import pandas as pd
+
+from nvd_data_io import CVSS_COLUMNS
+
+# number of vendors and products listed
+TOP_N = 10
+
+# label of a missing vendor or product
+UNKNOWN = "UNKNOWN"
+
+# separator of the field names and values of a combination in the csv report
+SEPARATOR = "/"
+
+
+def column_codes(values):
+
+    # integer codes of a column and its categories, missing values get code -1
+    categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    return np.asarray(categorical.cat.codes, dtype=np.int64), list(categorical.cat.categories)
+
+
+def top_counts(counts, categories, top_n):
+
+    # the top_n most common values, missing values (counts[0]) reported as UNKNOWN, ties in category order
+    labels = [UNKNOWN] + [str(category) for category in categories]
+    order = np.argsort(-counts, kind='stable')
+    return [(labels[i], int(counts[i])) for i in order[:top_n] if counts[i] > 0]
+
+
+def profile(df, top_n=TOP_N, columns=CVSS_COLUMNS):
+
+    # count everything the data assessment reports, in one pass over the codes of every column
+    report = dict()
+    report['Records'] = len(df)
+    report['Nulls'] = dict((col, int(df[col].isnull().sum())) for col in df.columns)
+
+    # value counts, shifted by one so missing values (code -1) are counted in bin 0
+    codes = dict()
+    categories = dict()
+    counts = dict()
+    for col in list(columns) + [col for col in ("Vendor", "Product") if col in df.columns]:
+        codes[col], categories[col] = column_codes(df[col])
+        counts[col] = np.bincount(codes[col] + 1, minlength=len(categories[col]) + 1)
+
+    report['Values'] = dict(
+        (col, dict((str(category), int(count)) for category, count in zip(categories[col], counts[col][1:])))
+        for col in columns)
+    if "Vendor" in counts:
+        report['Top_Vendor'] = top_counts(counts["Vendor"], categories["Vendor"], top_n)
+    if "Product" in counts:
+        report['Top_Product'] = top_counts(counts["Product"], categories["Product"], top_n)
+
+    # joint frequency, records with a missing field are left out as groupby does
+    complete = np.ones(len(df), dtype=bool)
+    key = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        complete &= codes[col] >= 0
+        key = key * len(categories[col]) + np.maximum(codes[col], 0)
+    levels = [len(categories[col]) for col in columns]
+    joint = np.bincount(key[complete], minlength=int(np.prod(levels)))
+    present = np.flatnonzero(joint)
+    order = present[np.argsort(-joint[present], kind='stable')]
+    combinations = np.stack(np.unravel_index(order, levels), axis=1)
+    report['Frequency'] = [
+        dict([(col, str(categories[col][combination[j]])) for j, col in enumerate(columns)] +
+             [('Count', int(joint[index]))])
+        for combination, index in zip(combinations, order)]
+
+    return report
+
+
+def frequency_frame(report, columns=CVSS_COLUMNS):
+
+    # the joint frequency as a table, one row per combination of values with its Count
+    return pd.DataFrame(report['Frequency'], columns=list(columns) + ['Count'])
+
+
+def report_rows(report, columns=CVSS_COLUMNS):
+
+    # the report as (Section, Field, Value, Count) rows
+    rows = [('Records', '', '', report['Records'])]
+    rows += [('Nulls', col, '', count) for col, count in report['Nulls'].items()]
+    rows += [('Values', col, value, count) for col, values in report['Values'].items()
+             for value, count in values.items()]
+    for section, field in (('Top_Vendor', 'Vendor'), ('Top_Product', 'Product')):
+        rows += [(section, field, value, count) for value, count in report.get(section, [])]
+    field = SEPARATOR.join(columns)
+    rows += [('Frequency', field, SEPARATOR.join(row[col] for col in columns), row['Count'])
+             for row in report['Frequency']]
+    return rows
+
+
+def write_report(report, json_file, csv_file):
+    with open(json_file, "w") as f:
+        json.dump(report, f, indent=2)
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(['Section', 'Field', 'Value', 'Count'])
+        writer.writerows(report_rows(report))
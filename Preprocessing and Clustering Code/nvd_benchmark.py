@@ -0,0 +1,294 @@
+#
+# DESCRIPTION:
+# This Program  (nvd_benchmark.py) measures the performance of the pipeline on synthetic NVD feeds, so changes can be
+# compared from run to run.
+#
+# generate_feed() writes a feed with the schema of the NVD 1.0 json feeds (CVE_Items with cve, impact, publishedDate,
+# lastModifiedDate) and any number of items.  Vendors follow a long tailed (Zipf) distribution, the CVSS v3 fields
+# follow the frequencies of the 2018 feed, and a share of the items has no baseMetricV3 (MISSING_BM3) or no vendor
+# data (MISSING_VENDOR), as in the real feeds.  The feed is written one item at a time and can be gzip compressed.
+#
+# Timed stages, each on the output of the previous one:
+#   parse        read every item of the feed (nvd_feed_reader.py)
+#   extraction   extract the records (nvd_extraction.py)
+#   write        annotation csv and typed cluster data file (nvd_extraction.py, nvd_data_io.py)
+#   assessment   profile of the cluster data and the assessment report (nvd_assessment.py, as data_assessment does)
+#   kmodes_fit   one KModes fit with the nvd_clustering.py hyperparameters (nvd_kmodes.py)
+#   sweep        the hyperparameter sweep of nvd_clustering_hyperparameter_validation.py (nvd_sweep.py), no cache
+# For every stage the wall time, cpu time (of this process and its worker processes), the number of records, the
+# records per second and the peak resident memory (RSS) during the stage are recorded.
+#
+# OUTPUT:  benchmark.json, a list of runs, every run is appended to the file
+#   {"items": 100000, "timestamp": "...", "platform": ..., "generate_seconds": ...,
+#    "stages": [{"stage": "parse", "seconds": 4.1, "cpu_seconds": 4.0, "records": 100000, "records_per_second": ...,
+#                "peak_rss_mb": 61.2}, ...],
+#    "peak_rss_mb": 412.0}
+# The change in time of every stage against the last run of the same size is printed.
+#
+# How to run this program (parameters are optional)
+#   python nvd_benchmark.py  items  output.json  work_directory
+#   python nvd_benchmark.py  10000,100000,1000000  "Data/benchmark.json"  "Data/benchmark"
+#
+# The synthetic feeds are kept in the work directory and reused by later runs with the same number of items.
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import datetime
+import gzip
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from nvd_assessment import profile, frequency_frame, write_report
+from nvd_data_io import read_cluster_data, write_cluster_data_file, NVD_DATE_FORMAT
+from nvd_encoding import encode_cvss, n_levels
+from nvd_extraction import new_error_report, extract_feeds, annotation_frame, cluster_frame
+from nvd_feed_reader import iter_cve_items
+from nvd_instrumentation import stage
+from nvd_kmodes import KModes
+from nvd_sweep import sweep_grid, run_sweep
+
+DEFAULT_SIZES = "10000"
+DEFAULT_OUTPUT_FILE_NAME = "Data/benchmark.json"
+DEFAULT_WORK_DIRECTORY = "Data/benchmark"
+
+# synthetic feed
+FEED_SEED = 0
+FEED_YEAR = 2018
+MISSING_BM3 = 0.22       # share of items without baseMetricV3 (about 1 in 5 in the 2018 feed)
+MISSING_VENDOR = 0.3     # share of items without vendor data
+N_VENDORS = 5000
+PRODUCTS_PER_VENDOR = 8
+VENDOR_ZIPF = 1.3        # exponent of the vendor popularity
+
+# CVSS v3 fields: feed key, vector abbreviation, labels and their frequency
+CVSS_V3_FIELDS = [
+    ('attackVector', 'AV', ['NETWORK', 'LOCAL', 'ADJACENT_NETWORK', 'PHYSICAL'], [0.72, 0.23, 0.04, 0.01]),
+    ('attackComplexity', 'AC', ['LOW', 'HIGH'], [0.93, 0.07]),
+    ('privilegesRequired', 'PR', ['NONE', 'LOW', 'HIGH'], [0.62, 0.31, 0.07]),
+    ('userInteraction', 'UI', ['NONE', 'REQUIRED'], [0.63, 0.37]),
+    ('confidentialityImpact', 'C', ['HIGH', 'LOW', 'NONE'], [0.62, 0.19, 0.19]),
+    ('integrityImpact', 'I', ['HIGH', 'LOW', 'NONE'], [0.55, 0.22, 0.23]),
+    ('availabilityImpact', 'A', ['HIGH', 'NONE', 'LOW'], [0.62, 0.36, 0.02]),
+]
+
+WEAKNESSES = ["cross-site scripting", "SQL injection", "buffer overflow", "use-after-free", "path traversal",
+              "improper input validation", "information disclosure", "denial of service", "privilege escalation",
+              "cross-site request forgery", "XML external entity", "integer overflow", "memory corruption"]
+ATTACKERS = ["A remote attacker", "An authenticated user", "A local user", "An unauthenticated attacker",
+             "A remote authenticated attacker"]
+IMPACTS = ["execute arbitrary code", "obtain sensitive information", "cause a denial of service",
+           "bypass authentication", "gain elevated privileges", "inject arbitrary web script or HTML"]
+
+# sweep and fit of the benchmark, the defaults of the clustering programs
+FIT_CLUSTERS = 10
+FIT_INIT = 'Huang'
+FIT_N_INIT = 10
+FIT_MAX_ITER = 300
+SWEEP_INITS = ['Huang', 'Cao', 'random']
+SWEEP_CLUSTERS = range(1, 236, 5)
+SWEEP_SEEDS = [0]
+SWEEP_WORKERS = None
+
+# measures of every stage written to the results
+STAGE_FIELDS = ['stage', 'seconds', 'cpu_seconds', 'records', 'records_per_second', 'peak_rss_mb']
+
+
+def synthetic_item(index, random_state, vendor, product):
+
+    # one CVE item with the structure of the NVD 1.0 feed
+    cve_id = "CVE-%d-%d" % (FEED_YEAR, 1000 + index)
+    weakness = WEAKNESSES[random_state.randint(len(WEAKNESSES))]
+    attacker = ATTACKERS[random_state.randint(len(ATTACKERS))]
+    name = (vendor + " " + product) if vendor else "the affected product"
+    description = "%s vulnerability in %s %d.%d.%d allows %s to %s via a crafted request." % (
+        weakness.capitalize(), name, random_state.randint(1, 12), random_state.randint(0, 10),
+        random_state.randint(0, 30), attacker[0].lower() + attacker[1:], IMPACTS[random_state.randint(len(IMPACTS))])
+
+    published = datetime.datetime(FEED_YEAR, 1, 1) + datetime.timedelta(minutes=int(random_state.randint(365 * 1440)))
+    modified = published + datetime.timedelta(minutes=int(random_state.exponential(40 * 1440)))
+
+    vendor_data = []
+    if vendor:
+        vendor_data = [{"vendor_name": vendor, "product": {"product_data": [
+            {"product_name": product, "version": {"version_data": [{"version_value": "-"}]}}]}}]
+    item = {
+        "cve": {
+            "data_type": "CVE", "data_format": "MITRE", "data_version": "4.0",
+            "CVE_data_meta": {"ID": cve_id, "ASSIGNER": "cve@mitre.org"},
+            "affects": {"vendor": {"vendor_data": vendor_data}},
+            "problemtype": {"problemtype_data": [{"description": []}]},
+            "references": {"reference_data": []},
+            "description": {"description_data": [{"lang": "en", "value": description}]},
+        },
+        "configurations": {"CVE_data_version": "4.0", "nodes": []},
+        "impact": {},
+        "publishedDate": published.strftime(NVD_DATE_FORMAT),
+        "lastModifiedDate": modified.strftime(NVD_DATE_FORMAT),
+    }
+    if random_state.random_sample() >= MISSING_BM3:
+        cvss = {"version": "3.0"}
+        vector = ["CVSS:3.0"]
+        for key, abbreviation, labels, frequency in CVSS_V3_FIELDS:
+            label = labels[random_state.choice(len(labels), p=frequency)]
+            cvss[key] = label
+            vector.append(abbreviation + ":" + label[0])
+        cvss["vectorString"] = "/".join(vector[:5] + ["S:U"] + vector[5:])
+        cvss["scope"] = "UNCHANGED"
+        item["impact"]["baseMetricV3"] = {"cvssV3": cvss}
+    return item
+
+
+def generate_feed(path, n_items, seed=FEED_SEED):
+
+    # write a synthetic feed of n_items items, gzip compressed when the name ends in .gz
+    random_state = np.random.RandomState(seed)
+    popularity = 1.0 / np.arange(1, N_VENDORS + 1) ** VENDOR_ZIPF
+    vendors = random_state.choice(N_VENDORS, n_items, p=popularity / popularity.sum())
+    header = {"CVE_data_type": "CVE", "CVE_data_format": "MITRE", "CVE_data_version": "4.0",
+              "CVE_data_numberOfCVEs": str(n_items), "CVE_data_timestamp": "%d-12-31T07:00Z" % FEED_YEAR}
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header)[:-1] + ', "CVE_Items": [\n')
+        for index in range(n_items):
+            if random_state.random_sample() < MISSING_VENDOR:
+                vendor = product = ""
+            else:
+                vendor = "vendor%d" % vendors[index]
+                product = "product%d" % random_state.randint(PRODUCTS_PER_VENDOR)
+            f.write(("" if index == 0 else ",\n") + json.dumps(synthetic_item(index, random_state, vendor, product)))
+        f.write("\n]}\n")
+
+
+def timed(stages, name, function, *args):
+
+    # run one stage (see nvd_instrumentation.py), returns the result, function returns it with the number of records
+    with stage(name) as entry:
+        result, entry['records'] = function(*args)
+    stages.append(dict((key, entry[key]) for key in STAGE_FIELDS))
+    print("%-12s %10.3f s  %10d records  %8.1f MB" % (name, entry['seconds'], entry['records'], entry['peak_rss_mb']))
+    return result
+
+
+def parse_stage(feed):
+    count = 0
+    for item in iter_cve_items(feed):
+        count += 1
+    return count, count
+
+
+def extraction_stage(feed):
+    records = extract_feeds([feed], new_error_report())
+    return records, len(records)
+
+
+def write_stage(records, directory):
+    annotation_frame(records).to_csv(os.path.join(directory, "threats.csv"))
+    cluster_file = os.path.join(directory, "cluster_data.parquet")
+    write_cluster_data_file(cluster_frame(records), cluster_file)
+    return cluster_file, len(records)
+
+
+def assessment_stage(df, directory):
+    report = profile(df)
+    frequency_frame(report).to_csv(os.path.join(directory, "Frequency.csv"), index=False)
+    write_report(report, os.path.join(directory, "Assessment.json"), os.path.join(directory, "Assessment.csv"))
+    return report, len(df)
+
+
+def encode_stage(df):
+    codes, codebook = encode_cvss(df)
+    return (codes, n_levels(codebook)), len(df)
+
+
+def kmodes_stage(codes, levels):
+    km = KModes(n_clusters=FIT_CLUSTERS, init=FIT_INIT, n_init=FIT_N_INIT, max_iter=FIT_MAX_ITER, random_state=0)
+    km.fit(codes, levels)
+    return km, len(codes)
+
+
+def sweep_stage(codes, levels):
+    fits = run_sweep(codes, levels, sweep_grid(SWEEP_INITS, SWEEP_CLUSTERS, SWEEP_SEEDS), n_init=FIT_N_INIT,
+                     deduplicate_rows=True, workers=SWEEP_WORKERS, cache=None)
+    return fits, len(codes)
+
+
+def run_benchmark(n_items, directory):
+
+    # generate (or reuse) a feed of n_items items and time every stage, returns the run
+    os.makedirs(directory, exist_ok=True)
+    feed = os.path.join(directory, "synthetic_%d.json.gz" % n_items)
+    start = time.perf_counter()
+    if not os.path.exists(feed):
+        generate_feed(feed, n_items)
+    generate_seconds = time.perf_counter() - start
+
+    stages = []
+    print("\nBenchmark,", n_items, "items")
+    timed(stages, 'parse', parse_stage, feed)
+    records = timed(stages, 'extraction', extraction_stage, feed)
+    cluster_file = timed(stages, 'write', write_stage, records, directory)
+    del records
+    df = read_cluster_data(cluster_file)
+    timed(stages, 'assessment', assessment_stage, df, directory)
+    codes, levels = timed(stages, 'encoding', encode_stage, df)
+    timed(stages, 'kmodes_fit', kmodes_stage, codes, levels)
+    timed(stages, 'sweep', sweep_stage, codes, levels)
+
+    return dict([
+        ('items', n_items),
+        ('timestamp', datetime.datetime.now().isoformat(timespec='seconds')),
+        ('platform', dict(python=platform.python_version(), system=platform.platform(), cpus=os.cpu_count(),
+                          numpy=np.__version__)),
+        ('generate_seconds', generate_seconds),
+        ('stages', stages),
+        ('peak_rss_mb', max(stage['peak_rss_mb'] for stage in stages)),
+    ])
+
+
+def compare(run, history):
+
+    # change in time of every stage against the last run with the same number of items
+    previous = [old for old in history if old.get('items') == run['items']]
+    if not previous:
+        return
+    before = dict((stage['stage'], stage['seconds']) for stage in previous[-1]['stages'])
+    print("\nChange against the run of", previous[-1]['timestamp'])
+    for stage in run['stages']:
+        if before.get(stage['stage']):
+            print("%-12s %+8.1f %%" % (stage['stage'], 100.0 * (stage['seconds'] / before[stage['stage']] - 1.0)))
+
+
+def main():
+
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SIZES).split(",")]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT_FILE_NAME
+    directory = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_WORK_DIRECTORY
+
+    history = []
+    if os.path.exists(output_file):
+        with open(output_file) as f:
+            history = json.load(f)
+
+    for n_items in sizes:
+        run = run_benchmark(n_items, directory)
+        compare(run, history)
+        history.append(run)
+        with open(output_file, "w") as f:
+            json.dump(history, f, indent=2)
+    print("\nBenchmark results written to", output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#
+# DESCRIPTION:
+# This Program  (nvd_cli.py) is one command line entry point for every step of the pipeline, with a subcommand per
+# step.  The subcommands call the same functions as the step programs, which stay runnable on their own.
+#
+#   parse     feed(s) to the annotation data and the cluster data (nvd_extraction.py), or with --store only the cluster
+#             data through the record store (nvd_cluster_data_parser.py), or with --annotation-only only the
+#             annotation data (nvd_annotation_data_parser.py)
+#   assess    data assessment of the cluster data (nvd_clustering_hyperparameter_validation.py)
+#   sweep     hyperparameter sweep of the cluster data (nvd_clustering_hyperparameter_validation.py)
+#   cluster   final clustering of the cluster data or the record store (nvd_clustering.py), or with --window
+#             and/or --vendors one clustering per time window and/or vendor
+#   predict   cluster of CVSS v3 vectors or json records with the final clusters (nvd_cluster_model.py)
+#   serve     prediction service (nvd_cluster_service.py)
+#
+# Every random step is seeded, --seed replaces the default seed of parse (annotation samples), sweep and cluster.  A
+# step whose input, parameters and code are unchanged reuses its previous outputs (see nvd_fingerprint.py), set
+# NVD_RECOMPUTE=1 to run it anyway.
+#
+# Only argparse is loaded at start up; the modules of a subcommand (pandas, the clustering, matplotlib for the sweep
+# plot) are imported when the subcommand runs, so --help answers at once and predict only loads numpy.
+#
+# How to run this program
+#   python nvd_cli.py --help
+#   python nvd_cli.py parse "Data/threats.json" --annotation "Data/threats.csv" --cluster "Data/cluster_data.parquet"
+#   python nvd_cli.py parse "Data/nvdcve-1.0-modified.json.gz" --cluster "Data/cluster_data.parquet" --store "Data/nvd_records.sqlite"
+#   python nvd_cli.py assess "Data/cluster_data.parquet"
+#   python nvd_cli.py sweep "Data/cluster_data.parquet"
+#   python nvd_cli.py cluster "Data/cluster_data.parquet" --mixed
+#   python nvd_cli.py cluster "Data/cluster_data.parquet" --window Q --vendors 10
+#   python nvd_cli.py cluster "Data/cluster_data.parquet" --exact
+#   python nvd_cli.py predict "CVSS:3.0/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"
+#   cat records.jsonl | python nvd_cli.py predict
+#   python nvd_cli.py serve 127.0.0.1:8765
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import argparse
+import sys
+
+
+def parse_command(args):
+    from nvd_extraction import SAMPLE_SEED
+    seed = SAMPLE_SEED if args.seed is None else args.seed
+    if args.store:
+        from nvd_cluster_data_parser import run, DEFAULT_OUTPUT_FILE_NAME
+        run(args.input, args.cluster or DEFAULT_OUTPUT_FILE_NAME, args.store, seed)
+    elif args.annotation_only:
+        from nvd_annotation_data_parser import run, DEFAULT_OUTPUT_FILE_NAME
+        run(args.input, args.annotation or DEFAULT_OUTPUT_FILE_NAME, seed)
+    else:
+        from nvd_extraction import run, DEFAULT_ANNOTATION_FILE_NAME, DEFAULT_CLUSTER_FILE_NAME
+        run(args.input, args.annotation or DEFAULT_ANNOTATION_FILE_NAME, args.cluster or DEFAULT_CLUSTER_FILE_NAME,
+            seed)
+
+
+def assess_command(args):
+    from nvd_clustering_hyperparameter_validation import run
+    run(args.input, validation=False)
+
+
+def sweep_command(args):
+
+    # the cluster data is only read and encoded when the file changed (see nvd_encoded_data.py)
+    from nvd_clustering_hyperparameter_validation import run, SEEDS
+    run(args.input, assessment=False, seeds=SEEDS if args.seed is None else [args.seed])
+
+
+def cluster_command(args):
+    import nvd_clustering
+    nvd_clustering.run(args.input, args.mixed or nvd_clustering.MIXED_FEATURES,
+                       args.window or nvd_clustering.GROUP_WINDOW, args.vendors or nvd_clustering.GROUP_VENDORS,
+                       nvd_clustering.RANDOM_STATE if args.seed is None else args.seed,
+                       args.exact or nvd_clustering.EXACT_SEARCH)
+
+
+def predict_command(args):
+
+    # vectors from the command line, or one vector string or json record per line of the standard input
+    import json
+    from nvd_cluster_model import load_model, DEFAULT_MODEL_FILE_NAME, DEFAULT_CODEBOOK_FILE_NAME
+    lines = args.records if args.records else [line.strip() for line in sys.stdin if line.strip()]
+    records = [json.loads(line) if line.startswith("{") else {"vectorString": line} for line in lines]
+    model = load_model(args.model or DEFAULT_MODEL_FILE_NAME, args.codebook or DEFAULT_CODEBOOK_FILE_NAME)
+    for line, cluster in zip(lines, model.predict_records(records)):
+        print(line + "\t" + str(cluster))
+
+
+def serve_command(args):
+    from nvd_cluster_service import run, DEFAULT_ADDRESS
+    from nvd_cluster_model import DEFAULT_MODEL_FILE_NAME, DEFAULT_CODEBOOK_FILE_NAME
+    run(args.address or DEFAULT_ADDRESS, args.model or DEFAULT_MODEL_FILE_NAME,
+        args.codebook or DEFAULT_CODEBOOK_FILE_NAME)
+
+
+def build_parser():
+
+    # the defaults shown in the help are the defaults of the step programs, they are read there when the step runs
+    parser = argparse.ArgumentParser(prog="nvd_cli.py", description="INCAT NVD threat clustering pipeline")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    command = commands.add_parser("parse", help="parse NVD json feeds into annotation and cluster data")
+    command.add_argument("input", help="feed (.json, .json.gz, .json.zip), directory or glob of feeds")
+    command.add_argument("--annotation", help="annotation csv file (default Data/threats.csv)")
+    command.add_argument("--cluster", help="cluster data file, .parquet/.feather/.csv (default Data/cluster_data.parquet)")
+    command.add_argument("--store", help="record store (.sqlite), apply the changed records and write the cluster data")
+    command.add_argument("--annotation-only", action="store_true", help="only write the annotation data")
+    command.add_argument("--seed", type=int, help="seed of the annotation and cluster samples (default 0)")
+    command.set_defaults(function=parse_command)
+
+    command = commands.add_parser("assess", help="data assessment of the cluster data")
+    command.add_argument("input", help="cluster data file")
+    command.set_defaults(function=assess_command)
+
+    command = commands.add_parser("sweep", help="hyperparameter sweep of the cluster data")
+    command.add_argument("input", help="cluster data file")
+    command.add_argument("--seed", type=int, help="seed of every fit of the sweep (default 0)")
+    command.set_defaults(function=sweep_command)
+
+    command = commands.add_parser("cluster", help="final clustering")
+    command.add_argument("input", help="cluster data file, or record store (.sqlite) for mini-batch clustering")
+    command.add_argument("--mixed", action="store_true", help="k-prototypes with the dates and the vendor")
+    command.add_argument("--window", help="one clustering per period of Date_Published, e.g. Q (quarters), M or Y")
+    command.add_argument("--vendors", type=int, help="one clustering per vendor, for this many most frequent vendors")
+    command.add_argument("--seed", type=int, help="seed of the clustering (default 0)")
+    command.add_argument("--exact", action="store_true",
+                         help="improve the k-modes clusters with a k-medoids search over every CVSS vector")
+    command.set_defaults(function=cluster_command)
+
+    command = commands.add_parser("predict", help="cluster of CVSS v3 vectors with the final clusters")
+    command.add_argument("records", nargs="*",
+                         help="CVSS v3 vector strings, or json records, read from the standard input if not given")
+    command.add_argument("--model", help="model file (default Data/Final_Clusters_model.npz)")
+    command.add_argument("--codebook", help="codebook file (default Data/Final_Clusters_codebook.json)")
+    command.set_defaults(function=predict_command)
+
+    command = commands.add_parser("serve", help="serve the final clusters over http")
+    command.add_argument("address", nargs="?", help="host:port or unix:path (default 127.0.0.1:8765)")
+    command.add_argument("--model", help="model file (default Data/Final_Clusters_model.npz)")
+    command.add_argument("--codebook", help="codebook file (default Data/Final_Clusters_codebook.json)")
+    command.set_defaults(function=serve_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,13 +12,29 @@
 # "bm3AttackVector", "bm3attackComplexity", "bm3userInteraction", "bm3privilegesRequired",
 # "bm3ConfidentialityImpact", "bm3IntegrityImpact", "bm3availabilityImpact"
 #
+# The fields are read by the shared extraction engine (nvd_extraction.py), which can also write the annotation and
+# the cluster data in a single pass over the feed.
+#
 # How to run this program
-#   python nvd_cluster_data_parser.py input.json  output.csv
+#   python nvd_cluster_data_parser.py input.json  output.parquet
 #
-# The program takes two command line arguments, the name of the input json file and the name of the output csv file.
+# The program takes two command line arguments, the name of the input json file and the name of the output file.
+# The output is a typed columnar file (.parquet or .feather), a .csv file name exports plain csv (see nvd_data_io.py).
+# The input feed may also be gzip (.json.gz) or zip (.json.zip) compressed, it is read as a stream (see nvd_feed_reader.py).
+# A directory or glob pattern of several feeds (e.g. every NVD yearly feed) can be given as the input file, the feeds
+# are then parsed in parallel and merged with one record per ID (see BATCH MODE in nvd_extraction.py).
 # If command line arguments are not provided defaults will be used.
 #
-# A summary of errors and exceptions will print to the screen.
+# INCREMENTAL RUNS
+# An optional third argument names a persistent record store (see nvd_record_store.py)
+#   python nvd_cluster_data_parser.py "Data/nvdcve-1.0-modified.json.gz"  cluster_data.parquet  "Data/nvd_records.sqlite"
+# Only records that are new or have a newer lastModifiedDate are applied to the store, the number of inserted, updated
+# and unchanged records is printed, and the output file is written from the complete store.
+# Without a record store the output file is fingerprinted (nvd_fingerprint.py), a run on unchanged feeds with the same
+# seed reuses it instead of parsing again.
+#
+# A summary of errors and exceptions will print to the screen.  The time, cpu time, peak memory and records per
+# second of every stage can be logged or exported for Prometheus, see nvd_instrumentation.py.
 #
 # DIRECTORY STRUCTURE
 # The program is expecting a /Data directory where new files will be written to.
@@ -41,125 +57,80 @@
 
 
 
-import json
-import pandas as pd
 import sys
 
+from nvd_extraction import new_error_report, find_feeds, extract_feeds, cluster_frame, write_cluster_data, \
+    cluster_data_files, SAMPLE_SEED
+from nvd_instrumentation import stage, flush
+from nvd_fingerprint import fingerprint, unchanged, write_fingerprint, remove_fingerprint
+from nvd_record_store import open_store, apply_records, load_cluster_frame
+
 DEFAULT_INPUT_FILE_NAME = "Data/threats.json"
-DEFAULT_OUTPUT_FILE_NAME = "Data/cluster_data.csv"
-
-input_file = ""
-output_file = ""
-
-# add filename as a command line argument
-if (len(sys.argv)==3):
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-else:
-    input_file = DEFAULT_INPUT_FILE_NAME
-    output_file = DEFAULT_OUTPUT_FILE_NAME
-
-with open(input_file) as recent_threats:
-    threats_parsed = json.loads(recent_threats.read())
-
-
-# DataFrame to hold the vulnerability records
-df = pd.DataFrame()
-
-# flag to indicate that the data for the record is complete
-complete = False
-
-col_names = ['CVD_ID', 'Date_Published', 'Date_Modified', "Vendor", "Product", "Attack_Vector", "Attack_Complexity",
-                 "User_Interaction", "Privileges_Required", "Confidentiality_Impact", "Integrity_Impact", "Availability_Impact"]
-
-# list of contain each record as it is retrived from the database
-features = []
-ls = []
-ls_bm3 = []
-
-
-errorReport = dict([
-    ('Records in file', len(threats_parsed['CVE_Items'])),
-    ('Records read', 0),
-    ('No vendor/product data', 0),
-    ('BM3 read', 0),
-    ('No BM3 data', 0),
-    ('No data', 0),
-    ('Error', 0)
-])
-
-for index in range(0, len(threats_parsed['CVE_Items']), 1):
-
-    try:
-        CVD_ID =  threats_parsed['CVE_Items'][index]['cve']['CVE_data_meta']['ID']
-        published_date = threats_parsed['CVE_Items'][index]['publishedDate']
-        modified_date = threats_parsed['CVE_Items'][index]['lastModifiedDate']
-
-        if (threats_parsed['CVE_Items'][index]['cve']['affects']['vendor']['vendor_data']!=[]):
-            product_name = threats_parsed['CVE_Items'][index]['cve']['affects']['vendor']['vendor_data'][0]['product']['product_data'][
-                    0]['product_name']
-            vendor_name = threats_parsed['CVE_Items'][index]['cve']['affects']['vendor']['vendor_data'][0][
-                'vendor_name']
-        else:
-            product_name = ""
-            vendor_name = ""
-            errorReport["No vendor/product data"] += 1
-
-        ls = [CVD_ID, published_date, modified_date, vendor_name, product_name]
-
-        errorReport["Records read"] += 1
-
-    except:
-        print("Unknown Exception (General Data) Index ", index, " ", threats_parsed['CVE_Items'][index] )
-        errorReport["Error"] += 1
-
-    try:
-        if (threats_parsed['CVE_Items'][index]['impact']!={}):
-            bm3AttackVector = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3']['attackVector']
-            bm3attackComplexity = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'attackComplexity']
-            bm3userInteraction = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'userInteraction']
-            bm3privilegesRequired = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'privilegesRequired']
-            bm3confidentialityImpact = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'confidentialityImpact']
-            bm3integrityImpact = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'integrityImpact']
-            bm3availabilityImpact = threats_parsed['CVE_Items'][index]['impact']['baseMetricV3']['cvssV3'][
-                'availabilityImpact']
-
-            ls_bm3 = [bm3AttackVector, bm3attackComplexity, bm3userInteraction,
-                    bm3privilegesRequired, bm3confidentialityImpact,
-                     bm3integrityImpact, bm3availabilityImpact]
-
-            errorReport["BM3 read"] += 1
-            complete = True
-
-        else:
-            ls_bm3 = ["", "", "", "", "", "", ""]
-
-    except KeyError:
-        # print("Key Error Exception (BM3 Data) Index ", index, " ", threats_parsed['CVE_Items'][index] )
-        # no bm2 or 3 data
-        errorReport["No BM3 data"] += 1
-        ls_bm3 = ["", "", "", "", "", "", ""]
-
-    except:
-        print("Unknown Exception (BM3 Data) Index ", index, " ", threats_parsed['CVE_Items'][index] )
-        errorReport["Error"] += 1
-
-    if complete==True:
-        features.append(ls + ls_bm3)
-        complete = False
-
-    index += 1
-
-# output error report and create csv file
-print(errorReport)
-df = pd.DataFrame(features, columns=col_names)
-df.to_csv(output_file, index=False)
-
-# create short sample file for testing
-sample1 = df.sample(n=50,  replace=False, axis=None)
-sample1.to_csv("Data/cluster_sample_50.csv", index=False)
+DEFAULT_OUTPUT_FILE_NAME = "Data/cluster_data.parquet"
+
+
+def run(input_file, output_file, store_file="", seed=SAMPLE_SEED):
+
+    # without a record store the output is reused when the feeds, the parameters and the code are unchanged (see
+    # nvd_fingerprint.py), the record store changes with every feed and is always updated
+    feeds = find_feeds(input_file)
+    record = fingerprint(feeds, dict(output=output_file, seed=seed))
+    if not store_file and unchanged(cluster_data_files(output_file), record):
+        print("The feeds are unchanged since the last run, reusing " + ", ".join(cluster_data_files(output_file)))
+        return
+
+    # dictionary object containing program statistics, exceptions, and errors
+    errorReport = new_error_report()
+
+    # records are extracted by the shared engine (nvd_extraction.py), the feed is read one record at a time
+    # a directory or glob of feeds is parsed in parallel, one feed per worker process
+    # only records with base metric 3 data are kept for clustering
+    # every stage is measured (see nvd_instrumentation.py)
+    with stage("extraction") as entry:
+        records = extract_feeds(feeds, errorReport)
+        entry.update(records=len(records), error_report=errorReport)
+
+    # output error report and create the cluster data file
+    print(errorReport)
+
+    if store_file:
+        # incremental run, only new or changed records are written to the store
+        remove_fingerprint(cluster_data_files(output_file))
+        with stage("record_store", len(records)) as entry:
+            store = open_store(store_file)
+            entry['changes'] = apply_records(store, records)
+            print(entry['changes'])
+        with stage("cluster_data") as entry:
+            df = load_cluster_frame(store)
+            entry['records'] = len(df)
+            write_cluster_data(df, output_file, seed)
+        store.close()
+    else:
+        with stage("cluster_data") as entry:
+            df = cluster_frame(records)
+            entry['records'] = len(df)
+            write_cluster_data(df, output_file, seed)
+        write_fingerprint(cluster_data_files(output_file), record)
+    flush()
+
+
+def main():
+
+    input_file = ""
+    output_file = ""
+    store_file = ""
+
+    # add filename as a command line argument
+    if (len(sys.argv)>=3):
+        input_file = sys.argv[1]
+        output_file = sys.argv[2]
+        if (len(sys.argv)==4):
+            store_file = sys.argv[3]
+    else:
+        input_file = DEFAULT_INPUT_FILE_NAME
+        output_file = DEFAULT_OUTPUT_FILE_NAME
+    run(input_file, output_file, store_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#
+# DESCRIPTION:
+# This module (nvd_cluster_model.py) loads the final clustering written by nvd_clustering.py and assigns new CVEs to
+# its clusters without rerunning the clustering.
+#
+# The model is read from
+#   Final_Clusters_model.npz             centroids (and label counts) saved by nvd_clustering.py
+#   Final_Clusters_codebook.json         labels of the integer codes (see nvd_encoding.py)
+#
+# There are only a few hundred possible CVSS vectors (4 x 2 x 2 x 3 x 3 x 3 x 3 = 1296), so the nearest centroid of
+# every one of them is computed once when the model is loaded.  Assigning a record is then a lookup of its packed
+# code (nvd_encoding.pack) in that table.
+#
+# Records are given as dicts of the seven base metric 3 fields (the cluster data column names), or as a CVSS v3
+# vector string, e.g.
+#   {"Attack_Vector": "NETWORK", "Attack_Complexity": "LOW", ..., "Availability_Impact": "HIGH"}
+#   {"vectorString": "CVSS:3.0/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"}
+# A record with a missing or unknown label is assigned to cluster -1.  The cluster numbers are the Cluster column of
+# Final_Clusters.csv (the index of the centroid in the model).
+#
+# How to use this module
+#   from nvd_cluster_model import load_model
+#   model = load_model()
+#   clusters = model.predict_records(records)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import numpy as np
+
+from nvd_encoding import load_codebook, n_levels, pack
+from nvd_kmodes import assign
+
+DEFAULT_MODEL_FILE_NAME = "Data/Final_Clusters_model.npz"
+DEFAULT_CODEBOOK_FILE_NAME = "Data/Final_Clusters_codebook.json"
+
+# cluster of a record that cannot be encoded
+UNKNOWN_CLUSTER = -1
+
+# CVSS v3 vector string metrics and their values, mapped to the cluster data columns and labels
+VECTOR_METRICS = {
+    "AV": ("Attack_Vector", {"N": "NETWORK", "A": "ADJACENT_NETWORK", "L": "LOCAL", "P": "PHYSICAL"}),
+    "AC": ("Attack_Complexity", {"L": "LOW", "H": "HIGH"}),
+    "PR": ("Privileges_Required", {"N": "NONE", "L": "LOW", "H": "HIGH"}),
+    "UI": ("User_Interaction", {"N": "NONE", "R": "REQUIRED"}),
+    "C": ("Confidentiality_Impact", {"H": "HIGH", "L": "LOW", "N": "NONE"}),
+    "I": ("Integrity_Impact", {"H": "HIGH", "L": "LOW", "N": "NONE"}),
+    "A": ("Availability_Impact", {"H": "HIGH", "L": "LOW", "N": "NONE"}),
+}
+
+
+def all_vectors(levels):
+
+    # every possible code vector, in packed key order
+    grids = np.meshgrid(*[np.arange(level, dtype=np.uint8) for level in levels], indexing='ij')
+    return np.stack([grid.reshape(-1) for grid in grids], axis=1)
+
+
+def parse_vector_string(vector):
+
+    # CVSS v3 vector string to a record of labels, metrics that are not clustered (e.g. S) are ignored
+    record = dict()
+    for part in vector.split("/")[1:]:
+        metric, _, value = part.partition(":")
+        if metric in VECTOR_METRICS:
+            column, labels = VECTOR_METRICS[metric]
+            record[column] = labels.get(value)
+    return record
+
+
+class ClusterModel:
+
+    # final clusters with the nearest centroid of every possible code vector
+
+    def __init__(self, centroids, codebook):
+        self.centroids = np.asarray(centroids, dtype=np.uint8)
+        self.codebook = codebook
+        self.columns = list(codebook)
+        self.levels = n_levels(codebook)
+        self.positions = [dict((label, code) for code, label in enumerate(labels)) for labels in codebook.values()]
+        self.lookup = assign(all_vectors(self.levels), self.centroids, self.levels)[0].astype(np.int32)
+
+    def predict_codes(self, codes):
+
+        # cluster of every row of a code matrix
+        return self.lookup[pack(np.asarray(codes, dtype=np.uint8), self.levels)]
+
+    def encode_records(self, records):
+
+        # code matrix of a list of records and a mask of the records that could be encoded
+        codes = np.zeros((len(records), len(self.columns)), dtype=np.uint8)
+        valid = np.ones(len(records), dtype=bool)
+        for i, record in enumerate(records):
+            if "vectorString" in record:
+                record = parse_vector_string(record["vectorString"])
+            for j, column in enumerate(self.columns):
+                code = self.positions[j].get(record.get(column))
+                if code is None:
+                    valid[i] = False
+                    break
+                codes[i, j] = code
+        return codes, valid
+
+    def predict_records(self, records):
+
+        # cluster of every record, UNKNOWN_CLUSTER for records with missing or unknown labels
+        codes, valid = self.encode_records(records)
+        return np.where(valid, self.predict_codes(codes), UNKNOWN_CLUSTER)
+
+
+def load_model(model_file=DEFAULT_MODEL_FILE_NAME, codebook_file=DEFAULT_CODEBOOK_FILE_NAME):
+    with np.load(model_file) as model:
+        centroids = model['cluster_centroids']
+    return ClusterModel(centroids, load_codebook(codebook_file))
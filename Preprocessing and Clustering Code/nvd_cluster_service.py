@@ -0,0 +1,129 @@
+#
+# DESCRIPTION:
+# This Program (nvd_cluster_service.py) is a small local service that assigns incoming CVEs to the final clusters,
+# e.g. to route them to training content, without rerunning nvd_clustering.py.  The model (nvd_cluster_model.py) is
+# loaded once at start up and every request is a table lookup.
+#
+# Endpoints (json)
+#   POST /predict    {"records": [{"Attack_Vector": "NETWORK", ...}, {"vectorString": "CVSS:3.0/AV:N/..."}, ...]}
+#                    returns {"clusters": [3, 7, ...]}, -1 for records with missing or unknown labels, the cluster
+#                    numbers are the Cluster column of Final_Clusters.csv
+#   GET  /health     returns {"status": "ok", "clusters": <number of clusters>}
+#
+# The service listens on a local TCP port or, given an address starting with unix:, on a Unix socket.
+#
+# How to run this program
+#   python nvd_cluster_service.py                                  (127.0.0.1:8765, Data/Final_Clusters_model.npz)
+#   python nvd_cluster_service.py 127.0.0.1:9000
+#   python nvd_cluster_service.py unix:/tmp/nvd_clusters.sock  Data/Final_Clusters_model.npz  Data/Final_Clusters_codebook.json
+#
+#   curl -s -X POST localhost:8765/predict -d '{"records": [{"vectorString": "CVSS:3.0/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"}]}'
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import json
+import os
+import socketserver
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from nvd_cluster_model import load_model, DEFAULT_MODEL_FILE_NAME, DEFAULT_CODEBOOK_FILE_NAME
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+UNIX_PREFIX = "unix:"
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    # http over a Unix socket
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+
+    # keep the connection open between requests, clients send batches back to back, and send small replies at once
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    model = None
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "clusters": len(self.model.centroids)})
+        else:
+            self.send_json(404, {"error": "unknown path " + self.path})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_json(404, {"error": "unknown path " + self.path})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = request["records"] if isinstance(request, dict) else request
+            clusters = self.model.predict_records(records)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {"error": "bad request: " + str(e)})
+            return
+        self.send_json(200, {"clusters": clusters.tolist()})
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else UNIX_PREFIX
+
+    def log_message(self, format, *args):
+        # no log line per request, the service is called for every incoming CVE
+        pass
+
+
+def make_server(address, model):
+
+    # http server for the model on a host:port or unix:path address
+    handler = type("ModelPredictHandler", (PredictHandler,), {"model": model})
+    if address.startswith(UNIX_PREFIX):
+        return ThreadingUnixHTTPServer(address[len(UNIX_PREFIX):], handler)
+    host, _, port = address.rpartition(":")
+    return ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+
+
+def run(address=DEFAULT_ADDRESS, model_file=DEFAULT_MODEL_FILE_NAME, codebook_file=DEFAULT_CODEBOOK_FILE_NAME):
+
+    model = load_model(model_file, codebook_file)
+    server = make_server(address, model)
+    print("Serving", len(model.centroids), "clusters on", address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+
+    address = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS
+    model_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL_FILE_NAME
+    codebook_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_CODEBOOK_FILE_NAME
+    run(address, model_file, codebook_file)
+
+
+if __name__ == "__main__":
+    main()
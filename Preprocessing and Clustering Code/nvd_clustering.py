@@ -1,6 +1,7 @@
 # DESCRIPTION:
-# This Program  (nvd_clustering.py) takes a csv data file derived from the nvd database as an input file
-# The format of the csv file is:
+# This Program  (nvd_clustering.py) takes a cluster data file derived from the nvd database as an input file
+# (typed .parquet/.feather file written by nvd_cluster_data_parser.py, or a .csv export, see nvd_data_io.py)
+# The format of the file is:
 # CVD_ID
 # Date_Published
 # Date_Modified
@@ -14,12 +15,59 @@
 # Integrity_Impact
 # Availability_Impact
 #
-# NOTE:  not all fields are used in processing
+# NOTE:  not all fields are used in processing, the dates, Vendor and Product only with MIXED_FEATURES
 #
 # This program performs the following tasks:
 #
 # Clusters data, using hyperparameters selected based on validation
-#        OUTPUT:  Final_Clusters.csv, details of each cluster and frequency
+#        OUTPUT:  Final_Clusters.csv, details of each cluster and frequency, the Cluster column is the cluster number
+#                 returned for a record by nvd_cluster_model.py and the /predict endpoint of nvd_cluster_service.py
+#                 Final_Clusters_codebook.json, labels of the integer codes used for clustering (see nvd_encoding.py)
+#                 Final_Clusters_model.npz, centroids and per cluster label counts, used to fold in new records
+#
+# The seven categorical fields are encoded as a uint8 code matrix (nvd_encoding.py) and clustered with the vectorized
+# k-modes in nvd_kmodes.py, which gives the same result as the kmodes package for the same random seed.
+# The code matrix is kept as an encoded dataset in Data/encoded (nvd_encoded_data.py, ENCODED_DIRECTORY) and opened
+# memory-mapped, so clustering an unchanged input file again does not read or encode the data.
+#
+# With EXACT_SEARCH the k-modes result is improved by a weighted k-medoids (PAM swap) search over all 1296 possible
+# CVSS v3 vectors (nvd_kmedoids.py), started from the k-modes centroids and from a greedy build; the cheaper result is
+# kept, so its cost is never higher than the k-modes cost, and the cost gap to k-modes is printed.
+#
+# With MIXED_FEATURES the records are clustered with k-prototypes (nvd_kprototypes.py): the seven codes plus Vendor and
+# Product with a bounded number of labels (CATEGORY_ENCODING, MAX_CATEGORIES) as categorical features, and the days
+# between publication and last modification and the log vendor frequency as numeric features.  The cluster means
+# are added to Final_Clusters.csv; the model and codebook files are only written for k-modes, and the ones of an
+# earlier k-modes run are removed, so nvd_cluster_service.py and nvd_cli.py predict never serve clusters that do not
+# match Final_Clusters.csv.
+#
+# With GROUP_WINDOW and/or GROUP_VENDORS the records are partitioned by the quarter (or other period) of Date_Published
+# and/or by the most frequent vendors, and every partition is clustered in one job on a pool of worker processes
+# (nvd_grouped_clustering.py).  The clusters of all partitions are written to one table keyed by Window and Vendor,
+# and the centroid drift and change of the CVSS vector mix between consecutive windows to a second table:
+#        OUTPUT:  Final_Clusters_Grouped.csv, details of each cluster of every partition and frequency
+#                 Cluster_Drift.csv, drift between consecutive windows of every vendor
+# The partitions have no single model to predict with, so a grouped run removes the model and codebook files of an
+# earlier k-modes run as a mixed run does.
+#   python nvd_cli.py cluster "Data/cluster_data.parquet" --window Q --vendors 10
+#
+# When the input file is a record store (.sqlite, see nvd_record_store.py) the records are read in chunks of
+# MINI_BATCH_SIZE and clustered with mini-batch k-modes (MiniBatchKModes in nvd_kmodes.py), so the data never has to
+# fit in memory.  With UPDATE_MODEL and an existing Final_Clusters_model.npz only the records published since the model
+# was saved are folded into the existing centroids (partial_fit), there is no full refit after each feed update.  The
+# records published before were already folded into the model and are not added again; an update of one of them
+# cannot be taken out of the running counts of the model, so when more than REBUILD_SHARE of the records of the model
+# were updated since it was saved the clusters are rebuilt from scratch:
+#   python nvd_cluster_data_parser.py "Data/nvdcve-1.0-modified.json.gz" "Data/cluster_data.parquet" "Data/nvd_records.sqlite"
+#   python nvd_clustering.py "Data/nvd_records.sqlite"
+#
+# The time, cpu time, peak memory and per iteration cost and moves of the fit can be logged or exported for
+# Prometheus, see nvd_instrumentation.py.
+#
+# Every fit is seeded with RANDOM_STATE, so the same data gives the same clusters.  The outputs are fingerprinted with
+# the hash of the input file, the run parameters and the code version (nvd_fingerprint.py); a run on unchanged data
+# with unchanged parameters reuses the previous outputs instead of clustering again.  The record store is updated in
+# place by every feed and is always clustered.
 #
 # The program takes two optional command line arguments, the name of the input json file and the name of the output csv file.
 #
@@ -39,71 +87,274 @@
 #
 
 
-import pandas as pd
-from kmodes.kmodes import KModes
+import os
+import numpy as np
 import sys
 
-#DEFAULT_INPUT_FILE_NAME = "Project/cluster_sample_50.csv"
-DEFAULT_INPUT_FILE_NAME = "Project/cluster_data.csv"
+from nvd_data_io import read_cluster_data
+from nvd_encoding import encode_cvss, decode_codes, n_levels, save_codebook, load_codebook, CVSS_V3_CODEBOOK
+from nvd_encoded_data import encoded_dataset
+from nvd_grouped_clustering import partition_index, fit_partitions, grouped_table, drift
+from nvd_fingerprint import fingerprint, unchanged, write_fingerprint, remove_fingerprint
+from nvd_kprototypes import KPrototypes, mixed_features, scale_numeric, decode_numeric
+from nvd_kmodes import KModes, MiniBatchKModes, minibatch_from_labels, save_minibatch, load_minibatch
+from nvd_kmedoids import KMedoids
+from nvd_record_store import open_store, count_cluster_records, iter_cluster_chunks
+from nvd_instrumentation import stage, iteration_recorder, flush
+
+#DEFAULT_INPUT_FILE_NAME = "Project/cluster_sample_50.parquet"
+DEFAULT_INPUT_FILE_NAME = "Project/cluster_data.parquet"
+
+CLUSTERS_FILE_NAME = "Data/Final_Clusters.csv"
+CODEBOOK_FILE_NAME = "Data/Final_Clusters_codebook.json"
+MODEL_FILE_NAME = "Data/Final_Clusters_model.npz"
 
 # HYPERPARAMETERS
-ITERATIONS_MAX = 300   # KModes default
+ITERATIONS_MAX = 300   # largest number of iterations of one run (the KModes default is 100)
 NUMBER_RUNS = 10       # KModes default, number of runs with different centroid seeds
 CLUSTERING_ALGORITHM  = 'Huang'
 NUMBER_OF_CLUSTERS = 10
 MAX_COST= 1000000
+RANDOM_STATE = 0       # seed of every fit, the same seed and data always give the same clusters
+DEDUPLICATE = False    # True clusters the distinct CVSS vectors weighted by their frequency (faster, see nvd_kmodes.py)
+ENCODED_DIRECTORY = "Data/encoded"   # encoded datasets (see nvd_encoded_data.py)
+EXACT_SEARCH = False   # improve the k-modes clusters with a k-medoids search over every CVSS vector (see nvd_kmedoids.py)
 
-input_file = ""
+# mixed type clustering (k-prototypes) with the dates and the vendor, see nvd_kprototypes.py
+MIXED_FEATURES = False
+CATEGORY_ENCODING = 'capped'   # Vendor and Product: 'capped' (most frequent values + OTHER) or 'hashed'
+MAX_CATEGORIES = 64            # labels kept per field
 
-# add filename as a command line argument
-if (len(sys.argv)==2):
-    input_file = sys.argv[1]
-else:
-    input_file = DEFAULT_INPUT_FILE_NAME
+# grouped clustering, one model per time window and/or vendor, see nvd_grouped_clustering.py
+GROUP_WINDOW = None      # period of Date_Published, e.g. 'Q' (quarters), 'M' or 'Y', None does not split by time
+GROUP_VENDORS = None     # number of most frequent vendors clustered on their own, None does not split by vendor
+GROUP_MIN_RECORDS = 20   # smaller partitions are not clustered
+WORKERS = None           # number of worker processes, None uses one per cpu
+GROUPED_FILE_NAME = "Data/Final_Clusters_Grouped.csv"
+DRIFT_FILE_NAME = "Data/Cluster_Drift.csv"
 
-# Global variable
-data = pd.read_csv(input_file)
+# record store input
+STORE_EXTENSION = ".sqlite"
+MINI_BATCH_SIZE = 10000   # records per chunk read from the record store
+UPDATE_MODEL = True       # fold new records into an existing Final_Clusters_model.npz instead of clustering from scratch
+REBUILD_SHARE = 0.1       # share of the records of the model updated since it was saved that rebuilds the clusters
 
-def cluster():
 
-    # create a DataFrame to hold the categorical data
-    df = pd.DataFrame(data)
+def cluster(dataset, seed=RANDOM_STATE, exact=EXACT_SEARCH):
 
-    # remove all features not appropriate for clustering
-    df = df.drop(['CVD_ID', 'Date_Published', 'Date_Modified', 'Vendor', 'Product'], axis=1)
+    # the encoded dataset of the cluster data (see nvd_encoded_data.py), a uint8 code matrix and the codebook that
+    # turns the centroids back into labels
+    codes = dataset.codes
+    codebook = dataset.codebook
+    save_codebook(codebook, CODEBOOK_FILE_NAME)
 
-    km = KModes(n_clusters=NUMBER_OF_CLUSTERS, init=CLUSTERING_ALGORITHM, verbose=0)
-    km.fit_predict(df)
+    # the cost and moves of every iteration are kept with the stage measures (see nvd_instrumentation.py)
+    # with DEDUPLICATE the distinct vectors and weights of the dataset are clustered and the labels expanded
+    with stage("clustering", len(codes)) as entry:
+        km = KModes(n_clusters=NUMBER_OF_CLUSTERS, init=CLUSTERING_ALGORITHM, max_iter=ITERATIONS_MAX, verbose=0,
+                    random_state=seed, deduplicate=DEDUPLICATE, callback=iteration_recorder(entry))
+        if DEDUPLICATE:
+            km.fit(dataset.unique, dataset.levels, dataset.weights)
+            km.labels_ = km.labels_[dataset.inverse]
+        else:
+            km.fit(codes, dataset.levels)
+        entry['cost'] = km.cost_
     centroids = km.cluster_centroids_
     labels = km.labels_
     cost = km.cost_
 
-    # add counts to this dataframe
-    l = pd.DataFrame(centroids, columns=df.columns)
+    # k-medoids swap search over the whole vector space from the k-modes centroids and from a greedy build, on the
+    # distinct vectors, the cheaper one is kept and is never worse than k-modes
+    if exact:
+        with stage("exact_search", len(codes)) as entry:
+            searches = [KMedoids(n_clusters=NUMBER_OF_CLUSTERS, init=start).fit(dataset.unique, dataset.levels,
+                                                                              dataset.weights)
+                        for start in (centroids, 'build')]
+            kd = min(searches, key=lambda search: search.cost_)
+            entry.update(cost=kd.cost_, kmodes_cost=km.cost_, swaps=kd.n_iter_)
+        print("\nk-modes cost: ", km.cost_, " k-medoids search cost: ", kd.cost_)
+        print("Cost gap: ", km.cost_ - kd.cost_, "(%.2f%% of the k-modes cost)" % (100.0 * (km.cost_ - kd.cost_) /
+                                                                               max(km.cost_, 1.0)))
+        centroids = kd.cluster_centroids_
+        labels = kd.labels_[dataset.inverse]
+        cost = kd.cost_
+
+    # keep the centroids and their label counts, new records can be folded in later by cluster_minibatch()
+    save_minibatch(minibatch_from_labels(codes, centroids, labels, dataset.levels), MODEL_FILE_NAME, dataset.newest)
+
+    display(centroids, codebook, np.bincount(labels, minlength=len(centroids)), cost)
+
+
+def cluster_mixed(data, seed=RANDOM_STATE):
+
+    # k-prototypes over the CVSS codes, the capped or hashed Vendor and Product and the numeric features
+    codes, numeric, codebook = mixed_features(data, CATEGORY_ENCODING, MAX_CATEGORIES)
+    scaled, mean, std = scale_numeric(numeric)
+
+    with stage("clustering", len(codes)) as entry:
+        kp = KPrototypes(n_clusters=NUMBER_OF_CLUSTERS, init=CLUSTERING_ALGORITHM, n_init=NUMBER_RUNS,
+                         max_iter=ITERATIONS_MAX, verbose=0, random_state=seed, callback=iteration_recorder(entry))
+        kp.fit(codes, scaled, n_levels(codebook))
+        entry['cost'] = kp.cost_
+
+    display(kp.cluster_centroids_, codebook, np.bincount(kp.labels_, minlength=NUMBER_OF_CLUSTERS), kp.cost_,
+            decode_numeric(kp.cluster_means_, mean, std))
+
+
+def cluster_grouped(dataset, data, window=GROUP_WINDOW, top_vendors=GROUP_VENDORS, seed=RANDOM_STATE):
+
+    # one k-modes model per partition of the encoded dataset, data holds the Date_Published and Vendor of the same
+    # rows and is only used to build the partition index
+    partitions = partition_index(data, window, top_vendors, GROUP_MIN_RECORDS)
+    with stage("grouped_clustering", len(dataset)) as entry:
+        fits = fit_partitions(dataset.codes, dataset.levels, partitions, n_clusters=NUMBER_OF_CLUSTERS,
+                              init=CLUSTERING_ALGORITHM, n_init=NUMBER_RUNS, max_iter=ITERATIONS_MAX, seed=seed,
+                              workers=WORKERS)
+        entry.update(partitions=len(fits), cost=sum(fit[3] for fit in fits))
 
-    # add assigned cluster to record
-    df['Cluster'] = labels
-    clusters = pd.DataFrame(df.groupby('Cluster')['Cluster'].count())
-    clusters.rename(columns={'Cluster':'Cluster_Count'}, inplace=True)
+    table = grouped_table(fits, dataset.codebook)
+    changes = drift(fits, dataset.levels)
+    print("\nPartitions clustered: ", len(fits), " (window: ", window or "none", ", vendors: ", top_vendors or "all", ")")
+    print("Records in the partitions: ", sum(len(rows) for rows in partitions.values()), "of", len(dataset))
+    print("Cluster data is printed to Final_Clusters_Grouped.csv.")
+    print(table)
+    table.to_csv(GROUPED_FILE_NAME, index=False)
+    print("\nCentroid drift between consecutive windows is printed to Cluster_Drift.csv.")
+    print(changes)
+    changes.to_csv(DRIFT_FILE_NAME, index=False)
 
-    cnt = []
-    for i in range(0, len(clusters)):
-         cnt.append(clusters.iloc[i][0])
 
-    l['Count'] = cnt
+def cluster_minibatch(store_file, seed=RANDOM_STATE):
+
+    # cluster the records of the record store chunk by chunk, or fold the records published since the last run into
+    # the saved model
+    store = open_store(store_file)
+    km = None
+    if UPDATE_MODEL and os.path.exists(MODEL_FILE_NAME):
+        km, last_modified = load_minibatch(MODEL_FILE_NAME)
+        codebook = load_codebook(CODEBOOK_FILE_NAME)
+        # records published up to the newest Date_Modified of the model are in the model, with their old values
+        updated = count_cluster_records(store, modified_after=last_modified, published_until=last_modified)
+        if not last_modified or updated > REBUILD_SHARE * km.n_records_:
+            print(updated, "records of", MODEL_FILE_NAME, "were updated since", last_modified or "it was saved",
+                  "- clustering from scratch")
+            km = None
+        else:
+            print("Adding the records published after", last_modified, "to", MODEL_FILE_NAME, "-", updated,
+                  "updated records are kept with their old values")
+    if km is None:
+        km = MiniBatchKModes(n_clusters=NUMBER_OF_CLUSTERS, init=CLUSTERING_ALGORITHM, verbose=0, random_state=seed)
+        codebook = CVSS_V3_CODEBOOK
+        last_modified = ""
+    levels = n_levels(codebook)
+
+    newest = last_modified
+    with stage("minibatch") as entry:
+        added = 0
+        for chunk in iter_cluster_chunks(store, MINI_BATCH_SIZE, published_after=last_modified):
+            km.partial_fit(encode_cvss(chunk, codebook=codebook)[0], levels)
+            added += len(chunk)
+        entry['records'] = added
+    print("Records added to the clusters: ", added)
+
+    # second pass, size of every cluster and cost over all stored records with the final centroids, and the newest
+    # Date_Modified of the store, the records published up to it are in the model
+    with stage("scoring") as entry:
+        sizes = np.zeros(km.n_clusters, dtype=np.int64)
+        cost = 0.0
+        for chunk in iter_cluster_chunks(store, MINI_BATCH_SIZE):
+            codes = encode_cvss(chunk, codebook=codebook)[0]
+            sizes += np.bincount(km.predict(codes), minlength=km.n_clusters)
+            cost += km.score(codes)
+            newest = max(newest, chunk['Date_Modified'].max())
+        entry.update(records=int(sizes.sum()), cost=cost)
+    store.close()
+
+    save_codebook(codebook, CODEBOOK_FILE_NAME)
+    save_minibatch(km, MODEL_FILE_NAME, newest)
+    display(km.cluster_centroids_, codebook, sizes, cost)
+
+
+def remove_model():
+
+    # remove the k-modes model and codebook, and their fingerprints, when a mixed or grouped run replaces the k-modes
+    # clustering
+    remove_fingerprint([CODEBOOK_FILE_NAME, MODEL_FILE_NAME])
+    for path in (CODEBOOK_FILE_NAME, MODEL_FILE_NAME):
+        if os.path.exists(path):
+            os.remove(path)
+            print("Removed", path, "of an earlier k-modes run")
+
+
+def display(centroids, codebook, sizes, cost, numeric=None):
+
+    # add counts to this dataframe, and the cluster means of the numeric features when given
+    # the Cluster column is the centroid index, the cluster number of a prediction with the saved model
+    l = decode_codes(centroids, codebook)
+    l.insert(0, 'Cluster', np.arange(len(l)))
+    if numeric is not None:
+        l = l.join(numeric)
+
+    # number of records assigned to each cluster
+    l['Count'] = sizes
     print("\nTotal Cost of Selected Clustering Hyperparameters: ", cost)
-    print("Number of Clusters:  ", NUMBER_OF_CLUSTERS)
+    print("Number of Clusters:  ", len(l))
     print("Algorithm: ", CLUSTERING_ALGORITHM)
     print("Cluster data is printed to Final_Clusters.csv.")
-    print(l.sort_values('Count', ascending=False))
-    l.sort_values('Count', ascending=False).to_csv("Data/Final_Clusters.csv", index=False)
+    l = l.sort_values('Count', ascending=False, kind='stable')
+    print(l)
+    l.to_csv(CLUSTERS_FILE_NAME, index=False)
 
 
 
-def main():
+def run(input_file, mixed=MIXED_FEATURES, window=GROUP_WINDOW, top_vendors=GROUP_VENDORS, seed=RANDOM_STATE,
+        exact=EXACT_SEARCH):
 
     # perform clustering clustering results
     # display final clustering results
-    cluster()
+    # a record store is not loaded here but read in chunks by cluster_minibatch()
+    if input_file.endswith(STORE_EXTENSION):
+        remove_fingerprint([CLUSTERS_FILE_NAME, CODEBOOK_FILE_NAME, MODEL_FILE_NAME])
+        cluster_minibatch(input_file, seed)
+        flush()
+        return
+
+    # the previous outputs are reused when the data, the parameters and the code are unchanged (see nvd_fingerprint.py)
+    if window or top_vendors:
+        outputs = [GROUPED_FILE_NAME, DRIFT_FILE_NAME]
+    elif mixed:
+        outputs = [CLUSTERS_FILE_NAME]
+    else:
+        outputs = [CLUSTERS_FILE_NAME, CODEBOOK_FILE_NAME, MODEL_FILE_NAME]
+    record = fingerprint([input_file], dict(mixed=bool(mixed), window=window, top_vendors=top_vendors, seed=seed,
+                                            exact=bool(exact)))
+    if unchanged(outputs, record):
+        print("The cluster data and the parameters are unchanged since the last run, reusing " + ", ".join(outputs))
+        return
+
+    # grouped clustering only reads the columns of the partition index, the codes come from the encoded dataset
+    if window or top_vendors:
+        remove_model()
+        cluster_grouped(encoded_dataset(input_file, ENCODED_DIRECTORY),
+                        read_cluster_data(input_file, columns=['Date_Published', 'Vendor']), window, top_vendors, seed)
+    elif mixed:
+        remove_model()
+        cluster_mixed(read_cluster_data(input_file), seed)
+    else:
+        cluster(encoded_dataset(input_file, ENCODED_DIRECTORY), seed, exact)
+    write_fingerprint(outputs, record)
+    flush()
+
+
+def main():
+
+    # add filename as a command line argument
+    if (len(sys.argv)==2):
+        input_file = sys.argv[1]
+    else:
+        input_file = DEFAULT_INPUT_FILE_NAME
+    run(input_file)
+
 
-main()
+if __name__ == "__main__":
+    main()
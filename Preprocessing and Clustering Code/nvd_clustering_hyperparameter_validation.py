@@ -1,7 +1,8 @@
 #
 # DESCRIPTION:
-# This Program  (nvd_clustering_hyperparameter_validation.py) takes a csv data file derived from the nvd database as an input file
-# The format of the csv file is:
+# This Program  (nvd_clustering_hyperparameter_validation.py) takes a cluster data file derived from the nvd database as an input file
+# (typed .parquet/.feather file written by nvd_cluster_data_parser.py, or a .csv export, see nvd_data_io.py)
+# The format of the file is:
 # CVD_ID
 # Date_Published
 # Date_Modified
@@ -20,12 +21,31 @@
 # This program performs the following tasks:
 # 1.  Data assessment, including number of missing fields, values for categorical fields and frequency
 #        OUTPUT:  frequency.csv, listing every combination of categorical values with associated vulnerability
+#                 Assessment.json and Assessment.csv, every count of the assessment (see nvd_assessment.py)
 #                 to console, info about number of missing values, frequency of categorical values
 # 2.  Clustering validation, comparison of 3 different seeding algorithms and number of clusters
 #        OUTPUT:  hyperparameter.png, graph comparing various hyperparameters
 # 3.  Clustering data, using hyperparameters with the least cost found in #2 and frequency
 #        OUTPUT:  Clusters.csv, details of each cluster and frequency
 #
+# The seven categorical fields are encoded once as a uint8 code matrix (nvd_encoding.py) and every fit uses the
+# vectorized k-modes in nvd_kmodes.py, which gives the same result as the kmodes package for the same random seed.
+# The code matrix, its distinct vectors with their weights and the CVD_IDs are saved as an encoded dataset in
+# Data/encoded (nvd_encoded_data.py, ENCODED_DIRECTORY) and opened memory-mapped by the sweep, the metrics and every
+# worker process, so the data is not copied per worker and a re-run on an unchanged input file does not encode again.
+# The grid of (seeding algorithm, number of clusters, seed) fits is run on a pool of worker processes (nvd_sweep.py,
+# WORKERS); every fit has its own seed so the results table is the same for any number of workers.  Finished fits are
+# cached in Data/sweep_cache (nvd_fit_cache.py), a re-run only fits the grid points that are not in the cache.
+# With WARM_START each algorithm instead fits k in increasing order from the centroids of the previous k and stops at
+# the elbow; the chosen k is added to the results table (Chosen_K) and marked on hyperparameter.png.
+# Every grid point also gets the quality metrics of nvd_metrics.py (Silhouette, Davies_Bouldin, Stability) as columns
+# of the results table and panels of hyperparameter.png; the best grid point is the one with the best SELECTION_METRIC.
+# The time, cpu time and peak memory of the assessment, the sweep and the metrics can be logged or exported for
+# Prometheus, see nvd_instrumentation.py.
+# Every fit is seeded (SEEDS), so the same data gives the same results.  The outputs of the assessment and of the
+# clustering validation are fingerprinted with the hash of the input file, the run parameters and the code version
+# (nvd_fingerprint.py); a step whose input, parameters and code are unchanged reuses its previous outputs.
+#
 # The program takes two optional command line arguments, the name of the input json file and the name of the output csv file.
 #
 # DIRECTORY STRUCTURE
@@ -47,99 +67,102 @@
 
 
 
+import numpy as np
 import pandas as pd
-from kmodes.kmodes import KModes
-import matplotlib.pyplot as plt
 import sys
 
+from nvd_data_io import read_cluster_data
+from nvd_assessment import profile, frequency_frame, write_report
+from nvd_encoding import decode_codes
+from nvd_encoded_data import encoded_dataset
+from nvd_sweep import sweep_grid, run_sweep, warm_sweep
+from nvd_fit_cache import evict
+from nvd_metrics import evaluate_sweep, METRICS, HIGHER_IS_BETTER
+from nvd_instrumentation import stage, flush
+from nvd_fingerprint import fingerprint, unchanged, write_fingerprint
+
 
-#DEFAULT_INPUT_FILE_NAME = "Project/cluster_sample_50.csv"
-DEFAULT_INPUT_FILE_NAME = "Project/cluster_data.csv"
+#DEFAULT_INPUT_FILE_NAME = "Project/cluster_sample_50.parquet"
+DEFAULT_INPUT_FILE_NAME = "Project/cluster_data.parquet"
 
 # DEFAULT HYPERPARAMETERS
-ITERATIONS_MAX = 300   # KModes default
+ITERATIONS_MAX = 300   # largest number of iterations of one run (the KModes default is 100)
 NUMBER_RUNS = 10       # KModes default, number of runs with different centroid seeds
 CLUSTERING_ALGORITHMS  = ['Huang', 'Cao', 'random']
 NUMBER_OF_CLUSTERS = range(1,236,5)
 MAX_COST= 2000000
+DEDUPLICATE = True     # cluster the distinct CVSS vectors weighted by their frequency, labels expanded to every record
+SEEDS = [0]            # random_state of each fit, every (algorithm, number of clusters, seed) is one grid point
+WORKERS = None         # number of worker processes for the sweep, None uses one per cpu (see nvd_sweep.py)
+WARM_START = False     # warm started elbow search per algorithm with early stopping instead of the full grid (see nvd_sweep.py)
+QUALITY_METRICS = True # silhouette, Davies-Bouldin and stability of every grid point (see nvd_metrics.py)
+STABILITY_RESTARTS = 5 # single runs compared by adjusted Rand index for the stability
+SELECTION_METRIC = 'Cost'              # the best grid point has the best value of 'Cost' or of one of the quality metrics
+CACHE_DIRECTORY = "Data/sweep_cache"   # finished fits are kept here and not fitted again (see nvd_fit_cache.py), None disables
+CACHE_MAX_AGE_DAYS = 30                # cache entries not used for longer are removed, None keeps them
+CACHE_MAX_MB = 500                     # least recently used entries are removed above this size, None for no limit
+ENCODED_DIRECTORY = "Data/encoded"     # encoded datasets, memory-mapped by the sweep workers (see nvd_encoded_data.py)
 
-
-input_file = ""
-
-# add filename as a command line argument
-if (len(sys.argv)==2):
-    input_file = sys.argv[1]
-else:
-    input_file = DEFAULT_INPUT_FILE_NAME
+# OUTPUT FILES
+FREQUENCY_FILE_NAME = "Data/Frequency.csv"
+ASSESSMENT_FILE_NAMES = ["Data/Assessment.json", "Data/Assessment.csv"]
+HYPERPARAMETER_FILE_NAME = "Data/Hyperparameter.png"
+CLUSTERS_FILE_NAME = "Data/Clusters.csv"
 
 
-# Global variable
-data = pd.read_csv(input_file)
 
-def data_assessment():
+def data_assessment(data):
 
-    # create a DataFrame to hold the categorical data
-    df = pd.DataFrame(data)
+    # profile the data in one pass (see nvd_assessment.py), every count below comes from this report
+    with stage("data_assessment", len(data)):
+        report = profile(data)
 
     # assess data quality, number of missing values by feature
     # and total number of records
     print("Following is a survey of the data used for clustering.")
-    print("Total number of records:  " , len(df))
+    print("Total number of records:  " , report['Records'])
     print("\nNumber of null values by field:  ")
-    print(df.isnull().sum())
+    print(pd.Series(report['Nulls']))
 
     print("\nUnique values for each categorical feature:")
-    print(df.groupby(['Attack_Vector'])['Attack_Vector'].count())
-    print("\n", df.groupby(['Attack_Complexity'])['Attack_Complexity'].count())
-    print("\n", df.groupby(['User_Interaction'])['User_Interaction'].count())
-    print("\n", df.groupby(['Privileges_Required'])['Privileges_Required'].count())
-    print("\n", df.groupby(['Confidentiality_Impact'])['Confidentiality_Impact'].count())
-    print("\n", df.groupby(['Integrity_Impact'])['Integrity_Impact'].count())
-    print("\n", df.groupby(['Availability_Impact'])['Availability_Impact'].count())
-
-    # replace missing product and vendor with unknown
-    df.fillna("UNKNOWN", inplace=True)
+    for col, values in report['Values'].items():
+        print("\n", pd.Series(values, name=col).rename_axis(col))
 
     print("\nThe 10 most common Vendors and frequency of appearance")
     print("If value for Vendor was null or missing it will display as \"UNKNOWN\".")
-    vendors = pd.DataFrame(df.groupby('Vendor')['Vendor'].count())
-    vendors.rename(columns={'Vendor':'Vendor_Count'}, inplace=True)
-    print(vendors.sort_values('Vendor_Count', ascending=False).head(10))
+    print(pd.DataFrame(report['Top_Vendor'], columns=['Vendor', 'Vendor_Count']).set_index('Vendor'))
 
     print("\nThe 10 most common Products and frequency of appearance")
     print("If value for Product was null or missing it will display as \"UNKNOWN\".")
-    products = pd.DataFrame(df.groupby('Product')['Product'].count())
-    products.rename(columns={'Product':'Product_Count'}, inplace=True)
-    print(products.sort_values('Product_Count', ascending=False).head(10))
-
-    # Print Group by query to file containing all combinations of features and frequency
-    newdf = df.groupby(['Attack_Vector','Attack_Complexity','User_Interaction','Privileges_Required',
-                        'Confidentiality_Impact','Integrity_Impact','Availability_Impact'])['Attack_Vector'].count()
-    newdf = pd.DataFrame(newdf)
-    newdf.rename(columns={'Attack_Vector':'Count'}, inplace=True)
-    newdf.sort_values('Count', ascending=False).to_csv("Data/Frequency.csv")
-    print("\nFrequency information for all combinations of categorical values with an associated record have been printed to frequency.csv")
+    print(pd.DataFrame(report['Top_Product'], columns=['Product', 'Product_Count']).set_index('Product'))
 
+    # Print the frequency of all combinations of features to file, and the whole report as json and csv
+    frequency_frame(report).to_csv(FREQUENCY_FILE_NAME, index=False)
+    write_report(report, *ASSESSMENT_FILE_NAMES)
+    print("\nFrequency information for all combinations of categorical values with an associated record have been printed to frequency.csv")
+    print("The complete data assessment has been printed to Assessment.json and Assessment.csv")
 
-def clustering_validation():
 
-    # create a DataFrame to hold the categorical data
-    df = pd.DataFrame(data)
+def clustering_validation(dataset, seeds=SEEDS):
 
-    # remove all features not appropriate for clustering
-    df = df.drop(['CVD_ID', 'Date_Published', 'Date_Modified', 'Vendor', 'Product'], axis=1)
+    # returns the results table, one row per grid point
+    # the encoded dataset of the cluster data (see nvd_encoded_data.py), its arrays are memory-mapped and shared by
+    # every fit and worker process without a copy
+    codes = dataset.codes
+    codebook = dataset.codebook
+    levels = dataset.levels
 
     # Clustering hyperparameters
     # n_clusters:  Number of clusters possbile values for this study are between 1:236, however we are looking for the
     # optimum in the range of 5-20
-    # max_iter:  Maximum number of iterations, use default of 300
+    # max_iter:  Maximum number of iterations, ITERATIONS_MAX (300) as in nvd_clustering.py
     # init:  Initialization function 'Huang', 'Cao', 'random'
     # n_init:  number of runs with different centroid seeds (does not apply to Cao), use default of 10
     # create array to store data for evaluating the clustering results
     # cost is the sum of distance of all points to their assigned centroid
     # [n_clusters, max_iter, init, n_init, cost]
 
-    # ITERATIONS_MAX = 300   # KModes default
+    # ITERATIONS_MAX = 300
     # NUMBER_RUNS = 10       # KModes default, number of runs with different centroid seeds
     # CLUSTERING_ALGORITHMS  = ['Huang', 'Cao', 'random']
     # NUMBER_OF_CLUSTERS = range(5,25,5)
@@ -150,86 +173,167 @@ def clustering_validation():
     init = CLUSTERING_ALGORITHMS
     n_clusters = NUMBER_OF_CLUSTERS
     cost = 1000000
+    score = np.inf
     centroids = []
     labels = []
     best = []
 
-    # evaluate the various clusters for cost
-    for type in init:
-
-        for num in n_clusters:
-            km = KModes(n_clusters=num, init=type, verbose=0)
-            km.fit_predict(df)
-            ls = [num, max_iter, type, n_init, km.cost_]
-            results.append(ls)
-            if (km.cost_ < cost):
-                centroids = km.cluster_centroids_
-                labels = km.labels_
-                best = ls
-                cost = km.cost_
-
-
-    df_results = pd.DataFrame(results, columns=['Num_Clusters','Max_Iter','Init_Algorithm', 'Num_Iter' ,'Cost' ])
+    # evaluate the various clusters for cost, the grid points are fitted in parallel (see nvd_sweep.py)
+    # finished fits are read from the cache, so an interrupted or extended sweep only fits the missing grid points
+    if CACHE_DIRECTORY is not None:
+        evict(CACHE_DIRECTORY,
+              max_age=None if CACHE_MAX_AGE_DAYS is None else CACHE_MAX_AGE_DAYS * 86400,
+              max_bytes=None if CACHE_MAX_MB is None else CACHE_MAX_MB * 2**20)
+    # with WARM_START every k starts from the centroids of the previous k and the sweep stops at the elbow, the
+    # chosen k of each algorithm is kept in the Chosen_K column
+    with stage("sweep", len(codes)) as entry:
+        if WARM_START:
+            fits = []
+            chosen = dict()
+            for type in init:
+                warm, chosen[type] = warm_sweep(codes, levels, n_clusters, init=type, n_init=n_init,
+                                                max_iter=max_iter, deduplicate_rows=DEDUPLICATE, seed=seeds[0])
+                fits.extend(warm)
+        else:
+            # the distinct vectors and their weights were computed when the dataset was encoded
+            grid = sweep_grid(init, n_clusters, seeds)
+            if DEDUPLICATE:
+                fits = run_sweep(dataset.unique, levels, grid, n_init=n_init, max_iter=max_iter, workers=WORKERS,
+                                 cache=CACHE_DIRECTORY, weights=dataset.weights, inverse=dataset.inverse)
+            else:
+                fits = run_sweep(codes, levels, grid, n_init=n_init, max_iter=max_iter, workers=WORKERS,
+                                 cache=CACHE_DIRECTORY)
+        entry['fits'] = len(fits)
+
+    # cost alone always favours the largest number of clusters, the quality metrics of every fit are computed in
+    # parallel on the distinct vectors (see nvd_metrics.py)
+    if QUALITY_METRICS:
+        with stage("quality_metrics", len(codes)):
+            quality = evaluate_sweep(dataset.unique, levels, fits, restarts=STABILITY_RESTARTS, max_iter=max_iter,
+                                     workers=WORKERS, weights=dataset.weights, inverse=dataset.inverse)
+        selection = SELECTION_METRIC
+    else:
+        quality = [dict() for fit in fits]
+        selection = 'Cost'
+
+    for (type, num, seed, km_cost, km_centroids, km_labels, n_iter), metrics in zip(fits, quality):
+        ls = [num, max_iter, type, n_init, km_cost, seed] + [metrics.get(name, np.nan) for name in METRICS]
+        results.append(ls)
+        if WARM_START and num != chosen[type]:
+            # the best warm started run is taken from the chosen k of every algorithm
+            continue
+        # lower is better, grid points without a value for the metric (e.g. silhouette of 1 cluster) are not chosen
+        value = km_cost if selection == 'Cost' else metrics.get(selection, np.nan)
+        value = -value if HIGHER_IS_BETTER[selection] else value
+        if (value < score):
+            centroids = decode_codes(km_centroids, codebook)
+            labels = km_labels
+            best = ls
+            cost = km_cost
+            score = value
+
+
+    df_results = pd.DataFrame(results, columns=['Num_Clusters','Max_Iter','Init_Algorithm', 'Num_Iter' ,'Cost', 'Seed' ] + METRICS)
+    if WARM_START:
+        df_results['Chosen_K'] = df_results['Init_Algorithm'].map(chosen)
     print("\nClustering Comparison Results\n", df_results)
 
-    Huang = pd.DataFrame(df_results.loc[df_results['Init_Algorithm'] == 'Huang'])
-    x = Huang['Num_Clusters']
-    y1 = Huang['Cost']
-
-    random = pd.DataFrame(df_results.loc[df_results['Init_Algorithm'] == 'random'])
-    y2 = random['Cost']
-
-    Cao = pd.DataFrame(df_results.loc[df_results['Init_Algorithm'] == 'Cao'])
-    y3 = Cao['Cost']
-
-    # plot the hyperparameter comparison data
-    plt.plot(x, y3, label='Cao')
-    plt.plot(x, y1, label='Huang')
-    plt.plot(x, y2, label='random')
-    plt.ylabel('Cost')
-    plt.xlabel('Number of Clusters')
-    plt.title("Hyperparameter Comparision for Categorical Clusters")
-    plt.legend()
-    plt.savefig("Data/Hyperparameter.png")
+    # lowest cost and mean quality metrics over the seeds for each algorithm and number of clusters
+    panels = ['Cost'] + (METRICS if QUALITY_METRICS else [])
+    lowest = df_results.groupby(['Init_Algorithm', 'Num_Clusters'], as_index=False).agg(
+        dict([('Cost', 'min')] + [(name, 'mean') for name in METRICS]))
+
+    # plot the hyperparameter comparison data, one panel per measure
+    # a warm started sweep stops at a different k for every algorithm
+    # matplotlib is only loaded here, when the results are plotted
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(len(panels), 1, sharex=True, squeeze=False, figsize=(6.4, 2.4 + 2.4 * len(panels)))
+    for ax, name in zip(axes[:, 0], panels):
+        for type in ['Cao', 'Huang', 'random']:
+            curve = pd.DataFrame(lowest.loc[lowest['Init_Algorithm'] == type])
+            line = ax.plot(curve['Num_Clusters'], curve[name], label=type)
+            if WARM_START:
+                elbow = curve.loc[curve['Num_Clusters'] == chosen[type]]
+                ax.plot(elbow['Num_Clusters'], elbow[name], 'o', color=line[0].get_color())
+        ax.set_ylabel(name)
+    axes[-1, 0].set_xlabel('Number of Clusters')
+    axes[0, 0].set_title("Hyperparameter Comparision for Categorical Clusters")
+    axes[0, 0].legend()
+    fig.tight_layout()
+    fig.savefig(HYPERPARAMETER_FILE_NAME)
     # plt.show()
 
     # Display the data about the best performing cluster
-    display(df, best, centroids, labels)
+    display(list(codebook), best, centroids, labels)
+    return df_results
 
 
 
-def display(df, best, centroids, labels):
+def display(columns, best, centroids, labels):
 
     # add counts to this dataframe
-    l = pd.DataFrame(centroids, columns=df.columns)
+    l = pd.DataFrame(centroids, columns=columns)
 
-    # add assigned cluster to record
-    df['Cluster'] = labels
-    clusters = pd.DataFrame(df.groupby('Cluster')['Cluster'].count())
-    clusters.rename(columns={'Cluster':'Cluster_Count'}, inplace=True)
-
-    cnt = []
-    for i in range(0, len(clusters)):
-         cnt.append(clusters.iloc[i][0])
-
-    l['Count'] = cnt
+    # number of records assigned to each cluster
+    l['Count'] = np.bincount(labels, minlength=len(l))
     print("\nTotal Cost of Selected Clustering Hyperparameters: ", best[4])
     print("Optimal Number of Clusters:  ", best[0])
     print("Optimal Algorithm: ", best[2])
+    for name, value in zip(METRICS, best[6:]):
+        print(name + ": ", value)
     print("Cluster data is printed to Clusters.csv.")
     print(l.sort_values('Count', ascending=False))
-    l.sort_values('Count', ascending=False).to_csv("Data/Clusters.csv", index=False)
+    l.sort_values('Count', ascending=False).to_csv(CLUSTERS_FILE_NAME, index=False)
+
+
+def run(input_file, assessment=True, validation=True, seeds=SEEDS):
+
+    # a step whose input file, parameters and code are unchanged reuses its outputs (see nvd_fingerprint.py), the
+    # data is only read when a step runs
+    data = None
+    if assessment:
+        outputs = [FREQUENCY_FILE_NAME] + ASSESSMENT_FILE_NAMES
+        record = fingerprint([input_file], dict())
+        if unchanged(outputs, record):
+            print("The cluster data is unchanged since the last run, reusing " + ", ".join(outputs))
+        else:
+            # assess data quality, general statistics
+            data = read_cluster_data(input_file)
+            data_assessment(data)
+            write_fingerprint(outputs, record)
+
+    if validation:
+        outputs = [HYPERPARAMETER_FILE_NAME, CLUSTERS_FILE_NAME]
+        record = fingerprint([input_file], dict(seeds=list(seeds)))
+        if unchanged(outputs, record):
+            print("The cluster data and the parameters are unchanged since the last run, reusing " + ", ".join(outputs))
+        else:
+            # encode the data once, or open the encoded dataset of an unchanged input file
+            with stage("encoding") as entry:
+                dataset = encoded_dataset(input_file, ENCODED_DIRECTORY, data)
+                entry['records'] = len(dataset)
+
+            # perform clustering clustering results
+            # display final clustering results
+            clustering_validation(dataset, seeds)
+            write_fingerprint(outputs, record)
+
+    # stage measures for Prometheus (see nvd_instrumentation.py)
+    flush()
 
 
 def main():
-    # assess data quality, general statistics
-    data_assessment()
 
-    # perform clustering clustering results
-    # display final clustering results
-    clustering_validation()
+    # add filename as a command line argument
+    if (len(sys.argv)==2):
+        input_file = sys.argv[1]
+    else:
+        input_file = DEFAULT_INPUT_FILE_NAME
+    run(input_file)
+
 
-main()
+if __name__ == "__main__":
+    main()
 
 
 
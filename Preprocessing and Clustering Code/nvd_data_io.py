@@ -0,0 +1,120 @@
+#
+# DESCRIPTION:
+# This module (nvd_data_io.py) reads and writes the cluster data table (CVD_ID, dates, Vendor, Product and the seven
+# base metric 3 fields) passed from the parsers to the clustering programs.
+#
+# The default format is a typed, columnar Parquet file:
+#   Attack_Vector ... Availability_Impact, Vendor, Product   dictionary encoded categoricals
+#   Date_Published, Date_Modified                             timestamps (UTC)
+#   CVD_ID                                                    string
+# so the clustering programs do not pay for text parsing and string memory on every run.
+#
+# The format is chosen by the file extension:
+#   .parquet    Parquet (default, requires pyarrow)
+#   .feather    Feather / Arrow IPC (requires pyarrow)
+#   .csv        plain csv, kept as an export option, e.g. for spreadsheets
+#
+# How to use this module
+#   from nvd_data_io import read_cluster_data, write_cluster_data_file
+#   df = read_cluster_data("Data/cluster_data.parquet")
+#   write_cluster_data_file(df, "Data/cluster_data.csv")
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import os
+
+import pandas as pd
+
+# base metric 3 fields used for clustering
+CVSS_COLUMNS = ["Attack_Vector", "Attack_Complexity", "User_Interaction", "Privileges_Required",
+                "Confidentiality_Impact", "Integrity_Impact", "Availability_Impact"]
+
+# columns stored as dictionary encoded categoricals
+CATEGORICAL_COLUMNS = CVSS_COLUMNS + ["Vendor", "Product"]
+
+# columns stored as timestamps
+DATE_COLUMNS = ["Date_Published", "Date_Modified"]
+
+# text layout of the dates in the NVD feeds, e.g. 2018-01-10T22:29Z
+NVD_DATE_FORMAT = "%Y-%m-%dT%H:%MZ"
+
+DEFAULT_FORMAT = ".parquet"
+
+
+def file_format(path):
+
+    # format of a cluster data file, taken from its extension
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".parquet", ".feather", ".csv"):
+        raise ValueError("Unsupported cluster data format: " + path)
+    return extension
+
+
+def to_typed_frame(df):
+
+    # convert a cluster data table of strings into its typed form
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], utc=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            # missing vendor and product data is extracted as "", store it as null as the csv reader does
+            df[col] = df[col].replace("", None).astype("category")
+    if "CVD_ID" in df.columns:
+        df["CVD_ID"] = df["CVD_ID"].astype(str)
+    return df
+
+
+def to_text_frame(df):
+
+    # dates back to their NVD text layout, used for csv export
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime(NVD_DATE_FORMAT)
+    return df
+
+
+def write_cluster_data_file(df, path):
+
+    # write the cluster data in the format given by the file extension
+    extension = file_format(path)
+    if extension == ".csv":
+        to_text_frame(df).to_csv(path, index=False)
+    elif extension == ".feather":
+        to_typed_frame(df).reset_index(drop=True).to_feather(path)
+    else:
+        to_typed_frame(df).to_parquet(path, index=False)
+
+
+def read_cluster_data(path, columns=None):
+
+    # read the cluster data, always returning the typed form
+    extension = file_format(path)
+    if extension == ".csv":
+        df = pd.read_csv(path, usecols=columns)
+    elif extension == ".feather":
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_parquet(path, columns=columns)
+    return to_typed_frame(df)
+
+
+def fill_unknown(df, value="UNKNOWN"):
+
+    # replace missing values (e.g. Vendor and Product) with a placeholder, categoricals get the placeholder as a category
+    df = df.copy()
+    for col in df.columns:
+        if df[col].isnull().any():
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                if value not in df[col].cat.categories:
+                    df[col] = df[col].cat.add_categories([value])
+            df[col] = df[col].fillna(value)
+    return df
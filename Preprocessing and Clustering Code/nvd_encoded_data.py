@@ -0,0 +1,175 @@
+#
+# DESCRIPTION:
+# This module (nvd_encoded_data.py) keeps the encoded cluster data on disk, so the seven base metric 3 fields are
+# encoded once per cluster data file and not in every program, stage and worker process.
+#
+# An encoded dataset is a directory named by a hash of the content of the cluster data file, holding
+#   codes.npy      uint8 code matrix, one row per record (see nvd_encoding.py)
+#   unique.npy     distinct rows of the code matrix, in the order of nvd_encoding.deduplicate
+#   weights.npy    multiplicity of every distinct row
+#   inverse.npy    index of the distinct row of every record
+#   ids.npy        CVD_ID of every record, fixed width bytes, row aligned with codes.npy
+#   dataset.json   codebook, number of records, newest Date_Modified and the name of the cluster data file
+# The .npy files are opened memory-mapped (read only), so every program and every worker process reading the same
+# dataset shares one copy in the operating system page cache and nothing is copied or pickled.  A run on an unchanged
+# cluster data file only hashes the file and opens the arrays, the data is not read or encoded again; a changed file
+# gets a new dataset.
+#
+# A dataset is written to a temporary directory and renamed, so an interrupted run never leaves a partial dataset and
+# two programs encoding the same file at once both end up with one complete copy.  Opening a dataset updates its
+# modification time and only the KEEP_DATASETS most recently used datasets are kept.
+#
+# How to use this module
+#   from nvd_encoded_data import encoded_dataset
+#   dataset = encoded_dataset("Data/cluster_data.parquet")
+#   dataset.codes, dataset.levels, dataset.codebook, dataset.ids
+#   dataset.unique, dataset.weights, dataset.inverse   # distinct vectors, weights and the row of every record
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from nvd_encoding import deduplicate, n_levels
+from nvd_fingerprint import file_hash
+
+DEFAULT_DATASET_DIRECTORY = "Data/encoded"
+
+# datasets kept in the directory, least recently used ones are removed, None keeps them all
+KEEP_DATASETS = 4
+
+# bumped when the files of a dataset change, older datasets are then encoded again
+FORMAT_VERSION = 1
+
+# name of the metadata file of a dataset
+METADATA_FILE_NAME = "dataset.json"
+
+
+class EncodedData:
+
+    # the arrays of an encoded dataset, memory-mapped read only, and its metadata
+    # attributes: codes, unique, weights, inverse, ids, codebook, levels, records, newest, path
+
+    def __init__(self, path):
+        with open(os.path.join(path, METADATA_FILE_NAME)) as f:
+            metadata = json.load(f)
+        self.path = path
+        self.codebook = metadata['codebook']
+        self.levels = n_levels(self.codebook)
+        self.records = metadata['records']
+        self.newest = metadata['newest']
+        self.source = metadata['source']
+        for name in ('codes', 'unique', 'weights', 'inverse', 'ids'):
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode='r'))
+        if self.codes.shape[0] != self.records:
+            raise ValueError("Incomplete encoded dataset " + path)
+
+    def __len__(self):
+        return self.records
+
+
+def file_key(input_file):
+
+    # hash of the content of the cluster data file (hashed once per process, see nvd_fingerprint.py) and of the
+    # dataset format
+    return hashlib.sha256((str(FORMAT_VERSION) + file_hash(input_file)).encode()).hexdigest()
+
+
+def dataset_path(directory, key):
+    return os.path.join(directory, key)
+
+
+def open_dataset(path):
+
+    # the encoded dataset in path, None when it is missing or unreadable
+    try:
+        dataset = EncodedData(path)
+    except (OSError, KeyError, ValueError):
+        return None
+    os.utime(path)
+    return dataset
+
+
+def save_dataset(path, codes, codebook, ids, newest="", source=""):
+
+    # write an encoded dataset, the distinct rows and their weights are computed here once
+    codes = np.ascontiguousarray(codes, dtype=np.uint8)
+    unique, weights, inverse = deduplicate(codes, n_levels(codebook))
+    ids = np.asarray(ids, dtype=object).astype(str)
+    arrays = dict(codes=codes, unique=unique, weights=weights, inverse=inverse.astype(np.int64),
+                  ids=np.char.encode(ids, "ascii") if len(ids) else np.empty(0, dtype="S1"))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp = tempfile.mkdtemp(dir=directory, prefix=".encoding_")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temp, name + ".npy"), array)
+        with open(os.path.join(temp, METADATA_FILE_NAME), "w") as f:
+            json.dump(dict(codebook=codebook, records=len(codes), newest=newest, source=source), f)
+        os.rename(temp, path)
+    except OSError:
+        # another program wrote the same dataset first, its copy is used
+        shutil.rmtree(temp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+def remove_stale(directory, keep=KEEP_DATASETS):
+
+    # remove the least recently used datasets beyond keep, and temporary directories left by interrupted runs
+    if keep is None or not os.path.isdir(directory):
+        return
+    datasets = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(".encoding_"):
+            # a run still writing its temporary directory started less than an hour ago
+            if os.path.getmtime(path) < time.time() - 3600:
+                shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isdir(path):
+            datasets.append((os.path.getmtime(path), path))
+    for mtime, path in sorted(datasets, reverse=True)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def encode_data(data):
+
+    # code matrix, codebook, CVD_IDs and newest Date_Modified of the cluster data
+    import pandas as pd
+    from nvd_data_io import NVD_DATE_FORMAT
+    from nvd_encoding import encode_cvss
+    codes, codebook = encode_cvss(data)
+    newest = data['Date_Modified'].max() if 'Date_Modified' in data else None
+    ids = data['CVD_ID'] if 'CVD_ID' in data else [""] * len(data)
+    return codes, codebook, ids, newest.strftime(NVD_DATE_FORMAT) if not pd.isnull(newest) else ""
+
+
+def encoded_dataset(input_file, directory=DEFAULT_DATASET_DIRECTORY, data=None):
+
+    # the encoded dataset of a cluster data file, encoded and saved first when the file has not been seen
+    # data (optional) is the already read cluster data of input_file, so it is not read twice
+    path = dataset_path(directory, file_key(input_file))
+    dataset = open_dataset(path)
+    if dataset is not None:
+        return dataset
+
+    if data is None:
+        from nvd_data_io import read_cluster_data, CVSS_COLUMNS
+        data = read_cluster_data(input_file, columns=['CVD_ID', 'Date_Modified'] + CVSS_COLUMNS)
+    codes, codebook, ids, newest = encode_data(data)
+    save_dataset(path, codes, codebook, ids, newest, os.path.basename(input_file))
+    remove_stale(directory)
+    return EncodedData(path)
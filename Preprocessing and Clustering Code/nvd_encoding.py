@@ -0,0 +1,159 @@
+#
+# DESCRIPTION:
+# This module (nvd_encoding.py) is the preprocessing stage between the cluster data and the k-modes implementation
+# in nvd_kmodes.py.  It maps the seven base metric 3 columns to a compact uint8 code matrix, one column per field,
+# and keeps the codebook needed to turn codes back into labels.
+#
+# The codebook lists, for every column, its labels in sorted order; the code of a label is its position in the list.
+# This is the same ordering the kmodes package uses internally, so seeded initializations pick the same records.
+#
+# Example codebook (json):
+#   {"Attack_Vector": ["ADJACENT_NETWORK", "LOCAL", "NETWORK", "PHYSICAL"], "Attack_Complexity": ["HIGH", "LOW"], ...}
+#
+# How to use this module
+#   from nvd_encoding import encode_cvss, decode_codes
+#   codes, codebook = encode_cvss(df)
+#   labels_df = decode_codes(codes, codebook)
+#
+# High cardinality columns (Vendor, Product) do not fit the sorted codebook, they are encoded with a bounded number of
+# labels: encode_capped() keeps the most frequent values and maps the others to OTHER, encode_hashed() hashes every
+# value (crc32) into a fixed number of buckets.
+#   vendor_codes, vendor_labels = encode_capped(df['Vendor'], 64)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import json
+import zlib
+
+import numpy as np
+
+# pandas (and nvd_data_io, which needs it) is imported by the functions working on tables, so the prediction path
+# (nvd_cluster_model.py, nvd_cli.py predict) starts with numpy only
+
+# largest number of labels a column can have in a uint8 code matrix
+MAX_LEVELS = 255
+
+# label of the values left out by encode_capped and of missing values
+OTHER = "OTHER"
+
+# every label the CVSS v3 base metrics can take in the NVD feeds, in codebook (sorted) order
+# used when the data is encoded chunk by chunk and the codebook cannot be taken from the whole data
+CVSS_V3_CODEBOOK = {
+    "Attack_Vector": ["ADJACENT_NETWORK", "LOCAL", "NETWORK", "PHYSICAL"],
+    "Attack_Complexity": ["HIGH", "LOW"],
+    "User_Interaction": ["NONE", "REQUIRED"],
+    "Privileges_Required": ["HIGH", "LOW", "NONE"],
+    "Confidentiality_Impact": ["HIGH", "LOW", "NONE"],
+    "Integrity_Impact": ["HIGH", "LOW", "NONE"],
+    "Availability_Impact": ["HIGH", "LOW", "NONE"],
+}
+
+
+def encode_cvss(df, columns=None, codebook=None):
+
+    # encode the columns of df (the seven base metric 3 fields by default) into a uint8 code matrix
+    # without a codebook one is built from the sorted labels found in df, otherwise the given codebook is applied
+    # returns the code matrix and the codebook
+    import pandas as pd
+    from nvd_data_io import CVSS_COLUMNS
+    columns = CVSS_COLUMNS if columns is None else columns
+    if codebook is None:
+        codebook = dict()
+        for col in columns:
+            labels = pd.unique(df[col].dropna().astype(str))
+            if len(labels) > MAX_LEVELS:
+                raise ValueError("Too many labels to encode in column " + col)
+            codebook[col] = sorted(labels)
+
+    codes = np.empty((len(df), len(columns)), dtype=np.uint8)
+    for j, col in enumerate(columns):
+        values = df[col]
+        if values.isnull().any():
+            raise ValueError("Missing values in column " + col)
+        position = pd.Index(codebook[col]).get_indexer(values.astype(str))
+        if (position < 0).any():
+            raise ValueError("Label not in codebook for column " + col)
+        codes[:, j] = position
+
+    return codes, codebook
+
+
+def decode_codes(codes, codebook):
+
+    # turn a code matrix (e.g. centroids) back into a DataFrame of labels
+    import pandas as pd
+    codes = np.atleast_2d(codes)
+    return pd.DataFrame(dict(
+        (col, np.asarray(labels, dtype=object)[codes[:, j]]) for j, (col, labels) in enumerate(codebook.items())
+    ))
+
+
+def encode_capped(values, max_levels=MAX_LEVELS, other=OTHER):
+
+    # codes of the max_levels - 1 most frequent values, every other value (and a missing value) gets the code of other
+    # returns the codes and the labels, other is the last label
+    import pandas as pd
+    if not 1 <= max_levels <= MAX_LEVELS:
+        raise ValueError("Number of levels must be between 1 and " + str(MAX_LEVELS) + " for a uint8 code: " +
+                         str(max_levels))
+    text = pd.Series(values, dtype=object)
+    missing = text.isnull().to_numpy()
+    text = text.astype(str)
+    kept = sorted(text[~missing].value_counts().index[:max_levels - 1])
+    position = pd.Index(kept).get_indexer(text)
+    position[missing] = -1
+    return np.where(position < 0, len(kept), position).astype(np.uint8), kept + [other]
+
+
+def encode_hashed(values, n_buckets=MAX_LEVELS, other=OTHER):
+
+    # codes of the crc32 hash of every value modulo n_buckets, the same value always gets the same code
+    # returns the codes and the labels (bucket numbers), a missing value is hashed as other
+    import pandas as pd
+    if not 1 <= n_buckets <= MAX_LEVELS:
+        raise ValueError("Number of hash buckets must be between 1 and " + str(MAX_LEVELS) + " for a uint8 code: " +
+                         str(n_buckets))
+    text = pd.Series(values, dtype=object)
+    text = text.where(text.notnull(), other).astype(str)
+    unique, inverse = np.unique(text.to_numpy(), return_inverse=True)
+    buckets = np.array([zlib.crc32(value.encode("utf-8")) % n_buckets for value in unique], dtype=np.uint8)
+    return buckets[inverse.reshape(-1)], ["bucket_" + str(b) for b in range(n_buckets)]
+
+
+def n_levels(codebook):
+
+    # number of labels of every column
+    return np.array([len(labels) for labels in codebook.values()])
+
+
+def pack(codes, levels):
+
+    # one integer key per record (mixed radix over the fields), equal vectors get equal keys
+    key = np.zeros(codes.shape[0], dtype=np.int64)
+    for j in range(codes.shape[1]):
+        key = key * int(levels[j]) + codes[:, j]
+    return key
+
+
+def deduplicate(codes, levels, weights=None):
+
+    # distinct rows of codes, their multiplicity (summed weights) and the index of every record's distinct row
+    keys, first, inverse = np.unique(pack(codes, levels), return_index=True, return_inverse=True)
+    multiplicity = np.bincount(inverse, weights=weights, minlength=len(keys)).astype(np.float64)
+    return codes[first], multiplicity, inverse.reshape(-1)
+
+
+def save_codebook(codebook, path):
+    with open(path, "w") as f:
+        json.dump(codebook, f, indent=2)
+
+
+def load_codebook(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,537 @@
+#
+# DESCRIPTION:
+# This Program  (nvd_extraction.py) is the shared extraction engine for the national threat database json feeds.
+# It reads a feed a single time and produces both the annotation data (nvd_annotation_data_parser.py) and the
+# cluster data (nvd_cluster_data_parser.py).
+#
+# The captured fields are listed in one declarative table (FIELD_SPECS).  Each field belongs to a group of fields
+# that live under the same part of the record (GROUP_PATHS), e.g. the seven cvssV3 fields all live under
+# impact/baseMetricV3/cvssV3.  Every path is compiled into an accessor once, and for each record the group path is
+# walked once before its fields are read.  The items are read CHUNK_SIZE at a time, one group and one field at a time
+# over the whole chunk, so the time of every group and field (Field timing in the error report) is taken once per
+# chunk and not for every record.
+#
+# Captured fields:
+# General Threat Information:
+# ID, Date Published, Date Modified
+# Description - when available, Vendor - when available, Product - when available
+#
+# Base Metric 3 (BM3)  threat analysis when available:
+# "Attack_Vector", "Attack_Complexity", "User_Interaction", "Privileges_Required",
+# "Confidentiality_Impact", "Integrity_Impact", "Availability_Impact"
+#
+# How to run this program (parameters are optional)
+#   python nvd_extraction.py input.json  threats.csv  cluster_data.parquet
+#
+# The program takes three optional command line arguments, the name of the input json file (plain, .gz or .zip),
+# the name of the annotation output csv file and the name of the cluster output file.  The cluster data is written as
+# a typed Parquet (.parquet) or Feather (.feather) file, a .csv name exports plain csv instead (see nvd_data_io.py).
+#
+# BATCH MODE
+# The input can also be a directory or a glob pattern matching several feeds, e.g. every NVD yearly feed
+#   python nvd_extraction.py "Data/feeds/"  threats.csv  cluster_data.parquet
+#   python nvd_extraction.py "Data/feeds/nvdcve-1.0-*.json.gz"  threats.csv  cluster_data.parquet
+# The feeds are parsed in a pool of worker processes, one feed per worker, and merged into a single table with one
+# record per CVD_ID (the record with the newest lastModifiedDate is kept).
+#
+# A summary of errors and exceptions, including the time spent reading each field, will print to the screen.
+#
+# The time, cpu time, peak memory and records per second of every stage can be logged or exported for Prometheus,
+# see nvd_instrumentation.py.
+#
+# DIRECTORY STRUCTURE
+# The annotation samples and the cluster sample are written next to the annotation and cluster output files.  The
+# samples are drawn from one seeded random order (SAMPLE_SEED, see nvd_sampler.py), so the same seed gives the same
+# samples, optionally stratified by a record field (STRATIFY_BY).  Records with near identical descriptions are
+# grouped by a MinHash index kept next to the annotation file (NEAR_DUPLICATE_INDEX, see nvd_near_duplicates.py), only
+# one record per group is drawn for the samples and the group of every record is written to near_duplicate_groups.csv.
+# The index keeps the records of earlier runs, so records of new feeds are grouped with the ones seen before.
+#
+# The output files are fingerprinted with the hash of the feeds, the run parameters and the code version
+# (nvd_fingerprint.py), a run on unchanged feeds with the same seed reuses them instead of parsing again.
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import glob
+import operator
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nvd_data_io import write_cluster_data_file
+from nvd_feed_reader import iter_cve_items
+from nvd_instrumentation import stage, flush
+from nvd_fingerprint import fingerprint, fingerprinted_outputs, unchanged, write_fingerprint
+from nvd_sampler import sample_order, write_batches, DEFAULT_SEED
+
+DEFAULT_INPUT_FILE_NAME = "Data/threats.json"
+DEFAULT_ANNOTATION_FILE_NAME = "Data/threats.csv"
+DEFAULT_CLUSTER_FILE_NAME = "Data/cluster_data.parquet"
+
+# file names recognised as feeds when a directory is given as the input
+FEED_PATTERNS = ["*.json", "*.json.gz", "*.json.zip"]
+
+# number of worker processes used to read several feeds, None uses one per cpu
+DEFAULT_WORKERS = None
+
+# items read at a time, every group and field is timed once per chunk
+CHUNK_SIZE = 1000
+
+# annotation samples, written next to the annotation file (see nvd_sampler.py)
+SAMPLE_COUNT = 6
+SAMPLE_SIZE = 50
+SAMPLE_SEED = DEFAULT_SEED   # the same seed gives the same samples
+STRATIFY_BY = None           # e.g. 'Vendor', spread the values of a record field evenly over the samples
+
+# near duplicate index, next to the annotation file (see nvd_near_duplicates.py), the samples hold one record per
+# group of near identical descriptions; None samples every record
+NEAR_DUPLICATE_INDEX = "near_duplicates.sqlite"
+NEAR_DUPLICATE_GROUPS = "near_duplicate_groups.csv"
+
+# groups of fields
+GENERAL = "General"
+DESCRIPTION = "Description data"
+VENDOR = "Vendor/Product"
+BM3 = "BM3"
+
+# path from the record to the part of the record holding the fields of a group
+GROUP_PATHS = dict([
+    (GENERAL, ()),
+    (DESCRIPTION, ('cve', 'description', 'description_data', 0)),
+    (VENDOR, ('cve', 'affects', 'vendor', 'vendor_data', 0)),
+    (BM3, ('impact', 'baseMetricV3', 'cvssV3'))
+])
+
+# captured fields:  column name, group, path within the group
+FIELD_SPECS = [
+    ('CVD_ID', GENERAL, ('cve', 'CVE_data_meta', 'ID')),
+    ('Description', DESCRIPTION, ('value',)),
+    ('Date_Published', GENERAL, ('publishedDate',)),
+    ('Date_Modified', GENERAL, ('lastModifiedDate',)),
+    ('Vendor', VENDOR, ('vendor_name',)),
+    ('Product', VENDOR, ('product', 'product_data', 0, 'product_name')),
+    ('Attack_Vector', BM3, ('attackVector',)),
+    ('Attack_Complexity', BM3, ('attackComplexity',)),
+    ('User_Interaction', BM3, ('userInteraction',)),
+    ('Privileges_Required', BM3, ('privilegesRequired',)),
+    ('Confidentiality_Impact', BM3, ('confidentialityImpact',)),
+    ('Integrity_Impact', BM3, ('integrityImpact',)),
+    ('Availability_Impact', BM3, ('availabilityImpact',))
+]
+
+# every record produced by the engine is a list with one value per field, in this order
+RECORD_COLUMNS = [name for name, group, path in FIELD_SPECS]
+
+# columns of the cluster data output
+CLUSTER_COLUMNS = ['CVD_ID', 'Date_Published', 'Date_Modified', "Vendor", "Product", "Attack_Vector", "Attack_Complexity",
+                   "User_Interaction", "Privileges_Required", "Confidentiality_Impact", "Integrity_Impact", "Availability_Impact"]
+
+# exceptions raised when a path is not present in a record
+MISSING = (KeyError, IndexError, TypeError)
+
+
+def compile_path(path):
+
+    # turn a path such as ('cve', 'CVE_data_meta', 'ID') into a function reading that path from a record
+    getters = [operator.itemgetter(key) for key in path]
+
+    if len(getters) == 0:
+        return lambda obj: obj
+    if len(getters) == 1:
+        return getters[0]
+
+    def accessor(obj):
+        for getter in getters:
+            obj = getter(obj)
+        return obj
+
+    return accessor
+
+
+def compile_specs(specs=FIELD_SPECS):
+
+    # compile the field table into (group, group accessor, [(record position, column, field accessor)]) entries
+    compiled = []
+    for group in GROUP_PATHS:
+        fields = [(RECORD_COLUMNS.index(name), name, compile_path(path))
+                  for name, field_group, path in specs if field_group == group]
+        compiled.append((group, compile_path(GROUP_PATHS[group]), fields))
+    return compiled
+
+
+def new_error_report():
+
+    # dictionary object containing program statistics, exceptions, and errors
+    return dict([
+        ('Feeds read', 0),
+        ('Records in file', 0),
+        ('Records read', 0),
+        ('No description', 0),
+        ('No vendor/product data', 0),
+        ('BM3 read', 0),
+        ('No BM3 data', 0),
+        ('No data', 0),
+        ('Error', 0),
+        ('Duplicate records', 0),
+        ('Field timing (s)', dict([(group, 0.0) for group in GROUP_PATHS] + [(name, 0.0) for name in RECORD_COLUMNS]))
+    ])
+
+
+def read_group(parts, records, group, group_accessor, fields, timing):
+
+    # fill the fields of one group into the records of a chunk, parts are the items of the records
+    # returns the positions of the records whose item does not have the group, their fields are None
+    clock = time.perf_counter
+    missing = set()
+
+    start = clock()
+    for i, item in enumerate(parts):
+        try:
+            parts[i] = group_accessor(item)
+        except MISSING:
+            missing.add(i)
+    timing[group] += clock() - start
+
+    for position, name, accessor in fields:
+        start = clock()
+        for i, part in enumerate(parts):
+            if i not in missing:
+                try:
+                    records[i][position] = accessor(part)
+                except MISSING:
+                    missing.add(i)
+        timing[name] += clock() - start
+
+    for i in missing:
+        for position, name, accessor in fields:
+            records[i][position] = None
+    return missing
+
+
+def read_chunk(items, first_index, compiled, errorReport):
+
+    # the records of a chunk of items, items without the General group are reported and left out
+    errorReport["Records in file"] += len(items)
+    timing = errorReport['Field timing (s)']
+    indices = list(range(first_index, first_index + len(items)))
+    records = [[None] * len(RECORD_COLUMNS) for item in items]
+
+    for group, group_accessor, fields in compiled:
+
+        missing = read_group(list(items), records, group, group_accessor, fields, timing)
+        if group == GENERAL:
+            errorReport["Records read"] += len(items) - len(missing)
+        elif group == BM3:
+            errorReport["BM3 read"] += len(items) - len(missing)
+
+        for i in sorted(missing):
+            if group == GENERAL:
+                print("Unknown Exception (General Data) Index ", indices[i], " ", items[i])
+                errorReport["Error"] += 1
+
+            elif group == DESCRIPTION:
+                for position, name, accessor in fields:
+                    records[i][position] = ""
+                errorReport["No description"] += 1
+
+            elif group == VENDOR:
+                for position, name, accessor in fields:
+                    records[i][position] = ""
+                errorReport["No vendor/product data"] += 1
+
+            elif isinstance(items[i], dict) and items[i].get('impact') == {}:
+                errorReport["No data"] += 1
+
+            else:
+                errorReport["No BM3 data"] += 1
+
+        if group == GENERAL and missing:
+            kept = [i for i in range(len(items)) if i not in missing]
+            items = [items[i] for i in kept]
+            indices = [indices[i] for i in kept]
+            records = [records[i] for i in kept]
+
+    return records
+
+
+def extract_records(items, errorReport=None, specs=FIELD_SPECS, chunk_size=CHUNK_SIZE):
+
+    # yield one record (see RECORD_COLUMNS) per usable item of a feed
+    # Description, Vendor and Product are "" and the BM3 fields are None when the item does not have that data
+    if errorReport is None:
+        errorReport = new_error_report()
+
+    compiled = compile_specs(specs)
+    chunk = []
+    first_index = 0
+
+    for index, item in enumerate(items):
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield from read_chunk(chunk, first_index, compiled, errorReport)
+            chunk = []
+            first_index = index + 1
+
+    if chunk:
+        yield from read_chunk(chunk, first_index, compiled, errorReport)
+
+
+def extract_feed(input_file, errorReport=None):
+
+    # read a feed a single time and return the list of its records
+    if errorReport is None:
+        errorReport = new_error_report()
+    records = list(extract_records(iter_cve_items(input_file), errorReport))
+    errorReport["Feeds read"] += 1
+    return records
+
+
+def find_feeds(source):
+
+    # expand a feed file, a directory of feeds or a glob pattern (e.g. "Data/nvdcve-1.0-*.json.gz") into feed files
+    if os.path.isdir(source):
+        feeds = set()
+        for pattern in FEED_PATTERNS:
+            feeds.update(glob.glob(os.path.join(source, pattern)))
+        return sorted(feeds)
+
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+
+    return [source]
+
+
+def merge_error_reports(errorReport, other):
+
+    # add the statistics of one feed to the combined report
+    for key, value in other.items():
+        if isinstance(value, dict):
+            for field, seconds in value.items():
+                errorReport[key][field] += seconds
+        else:
+            errorReport[key] += value
+
+
+def merge_records(record_lists, errorReport=None):
+
+    # combine the records of several feeds, keeping a single record per CVD_ID
+    # when an ID appears in more than one feed the record with the newest lastModifiedDate is kept
+    # (NVD dates such as 2018-02-23T02:29Z sort correctly as text)
+    id_col = RECORD_COLUMNS.index('CVD_ID')
+    modified_col = RECORD_COLUMNS.index('Date_Modified')
+
+    merged = dict()
+    duplicates = 0
+    for records in record_lists:
+        for record in records:
+            current = merged.get(record[id_col])
+            if current is None:
+                merged[record[id_col]] = record
+            else:
+                duplicates += 1
+                if record[modified_col] >= current[modified_col]:
+                    merged[record[id_col]] = record
+
+    if errorReport is not None:
+        errorReport["Duplicate records"] += duplicates
+
+    return list(merged.values())
+
+
+def _extract_feed_job(input_file):
+
+    # work done by one worker process, parse a single feed
+    errorReport = new_error_report()
+    records = extract_feed(input_file, errorReport)
+    return records, errorReport
+
+
+def extract_feeds(input_files, errorReport=None, workers=DEFAULT_WORKERS):
+
+    # read several feeds in parallel, one feed per worker process, and merge them into one set of records
+    if errorReport is None:
+        errorReport = new_error_report()
+
+    if len(input_files) == 1:
+        return extract_feed(input_files[0], errorReport)
+
+    record_lists = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for records, feed_report in executor.map(_extract_feed_job, input_files):
+            merge_error_reports(errorReport, feed_report)
+            record_lists.append(records)
+
+    return merge_records(record_lists, errorReport)
+
+
+def annotation_frame(records):
+
+    # ID and "ID | Description" for every record
+    id_col = RECORD_COLUMNS.index('CVD_ID')
+    description_col = RECORD_COLUMNS.index('Description')
+    return pd.DataFrame([[r[id_col], r[id_col] + " | " + r[description_col]] for r in records])
+
+
+def cluster_frame(records):
+
+    # records with base metric 3 data, in the cluster data column layout
+    positions = [RECORD_COLUMNS.index(name) for name in CLUSTER_COLUMNS]
+    bm3_col = RECORD_COLUMNS.index('Attack_Vector')
+    return pd.DataFrame([[r[p] for p in positions] for r in records if r[bm3_col] is not None],
+                        columns=CLUSTER_COLUMNS)
+
+
+def record_column(records, name):
+
+    # one field of every record, e.g. the vendors used to stratify the annotation samples
+    col = RECORD_COLUMNS.index(name)
+    return [r[col] for r in records]
+
+
+def annotation_inputs(feeds, output_file):
+
+    # the inputs the annotation samples depend on: the feeds and the near duplicate index next to the output file,
+    # whose earlier records decide the groups the samples are drawn from
+    index_file = os.path.join(os.path.dirname(output_file), NEAR_DUPLICATE_INDEX) if NEAR_DUPLICATE_INDEX else None
+    return list(feeds) + ([index_file] if index_file and os.path.exists(index_file) else [])
+
+
+def near_duplicate_representatives(records, output_file, index_name=NEAR_DUPLICATE_INDEX):
+
+    # flag one record per group of near duplicate descriptions, the groups are written next to the output file
+    # imported here, nvd_near_duplicates uses the tokenizer of nvd_text_features which imports this module
+    from nvd_near_duplicates import open_index, representatives, load_groups
+
+    directory = os.path.dirname(output_file)
+    ids = record_column(records, 'CVD_ID')
+    index = open_index(os.path.join(directory, index_name))
+    try:
+        flags = representatives(index, ids, record_column(records, 'Description'))
+        groups = pd.DataFrame({'CVD_ID': ids, 'Group': load_groups(index, ids)})
+    finally:
+        index.close()
+    groups.to_csv(os.path.join(directory, NEAR_DUPLICATE_GROUPS), index=False)
+    print("Near duplicates:", len(ids), "records,", int(flags.sum()), "groups")
+    return flags
+
+
+def sample_file_names(output_file, sample_size=SAMPLE_SIZE):
+
+    # file name patterns of the annotation samples and of the remainder, next to the annotation file
+    directory = os.path.dirname(output_file)
+    return (os.path.join(directory, str(sample_size) + "_sample_{}.csv"),
+            os.path.join(directory, "remainder_sample_{}.csv"))
+
+
+def annotation_files(output_file, n_samples=SAMPLE_COUNT, sample_size=SAMPLE_SIZE):
+
+    # every file written for the annotation data: the annotation file, the samples, the remainder and the near
+    # duplicate groups
+    sample_file, remainder_file = sample_file_names(output_file, sample_size)
+    files = [output_file] + [sample_file.format(i) for i in range(1, n_samples + 1)]
+    files.append(remainder_file.format(n_samples + 1))
+    if NEAR_DUPLICATE_INDEX:
+        files.append(os.path.join(os.path.dirname(output_file), NEAR_DUPLICATE_GROUPS))
+    return files
+
+
+def cluster_data_files(output_file):
+
+    # every file written for the cluster data: the cluster data file and its short sample
+    return [output_file, os.path.join(os.path.dirname(output_file),
+                                      "cluster_sample_" + str(SAMPLE_SIZE) + os.path.splitext(output_file)[1])]
+
+
+def write_annotation_data(df, output_file, strata=None, n_samples=SAMPLE_COUNT, sample_size=SAMPLE_SIZE,
+                          seed=SAMPLE_SEED, representatives=None):
+
+    # returns the number of samples written, fewer than n_samples when there are not enough records
+    # all threat data
+    df.to_csv(output_file)
+
+    # create n_samples files of sample_size randomly selected records each, and the remaining records not in an
+    # annotation sample, from one seeded random order (stratified when strata is given)
+    # with representatives (one flag per record) the samples are drawn from the flagged records only, the other
+    # records follow them in the order and go to the remainder
+    if representatives is None:
+        order = sample_order(len(df), seed, strata)
+    else:
+        flags = np.asarray(representatives, dtype=bool)
+        drawn = np.flatnonzero(flags)
+        strata = None if strata is None else [strata[i] for i in drawn]
+        order = np.concatenate((drawn[sample_order(len(drawn), seed, strata)], np.flatnonzero(~flags)))
+    sample_file, remainder_file = sample_file_names(output_file, sample_size)
+    return write_batches(df, order, sample_size, n_samples, sample_file, remainder_file)
+
+
+def write_cluster_data(df, output_file, seed=SAMPLE_SEED):
+
+    # complete data set, typed columnar file (.parquet/.feather) or csv export depending on the extension
+    write_cluster_data_file(df, output_file)
+
+    # create short sample file for testing, in the same format, next to the cluster data
+    sample1 = df.iloc[sample_order(len(df), seed)[:SAMPLE_SIZE]]
+    write_cluster_data_file(sample1, cluster_data_files(output_file)[1])
+
+
+def run(input_file, annotation_file, cluster_file, seed=SAMPLE_SEED):
+
+    # the outputs are reused when the feeds, the near duplicate index, the parameters and the code are unchanged (see
+    # nvd_fingerprint.py), every file written is fingerprinted, the samples and the remainder as well
+    # the number of samples depends on the data, the files written by the last run are checked
+    feeds = find_feeds(input_file)
+    params = dict(outputs=[annotation_file, cluster_file], seed=seed)
+    record = fingerprint(annotation_inputs(feeds, annotation_file), params)
+    outputs = fingerprinted_outputs(annotation_file,
+                                    annotation_files(annotation_file) + cluster_data_files(cluster_file))
+    if unchanged(outputs, record):
+        print("The feeds are unchanged since the last run, reusing " + ", ".join(outputs))
+        return
+
+    # every stage is measured (see nvd_instrumentation.py)
+    errorReport = new_error_report()
+    with stage("extraction") as entry:
+        records = extract_feeds(feeds, errorReport)
+        entry.update(records=len(records), error_report=errorReport)
+    print(errorReport)
+
+    strata = record_column(records, STRATIFY_BY) if STRATIFY_BY else None
+    with stage("near_duplicates", len(records)):
+        flags = near_duplicate_representatives(records, annotation_file) if NEAR_DUPLICATE_INDEX else None
+    with stage("annotation_data", len(records)):
+        n_samples = write_annotation_data(annotation_frame(records), annotation_file, strata, seed=seed,
+                                          representatives=flags)
+    with stage("cluster_data") as entry:
+        df = cluster_frame(records)
+        entry['records'] = len(df)
+        write_cluster_data(df, cluster_file, seed)
+    # the records of this run are now in the near duplicate index, the next run is compared with that state
+    record = fingerprint(annotation_inputs(feeds, annotation_file), params)
+    write_fingerprint(annotation_files(annotation_file, n_samples) + cluster_data_files(cluster_file), record)
+    flush()
+
+
+def main():
+
+    input_file = DEFAULT_INPUT_FILE_NAME
+    annotation_file = DEFAULT_ANNOTATION_FILE_NAME
+    cluster_file = DEFAULT_CLUSTER_FILE_NAME
+
+    # add filenames as command line arguments
+    if (len(sys.argv) == 4):
+        input_file, annotation_file, cluster_file = sys.argv[1:4]
+    run(input_file, annotation_file, cluster_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#
+# DESCRIPTION:
+# This module (nvd_feed_reader.py) reads json feeds from the national threat database one CVE record at a time.
+# It is shared by nvd_annotation_data_parser.py and nvd_cluster_data_parser.py.
+#
+# The feed is never loaded into memory as a whole.  The text is read in fixed size chunks and each entry of the
+# CVE_Items list is decoded as soon as it is complete, so memory use depends on the size of the largest record and
+# not on the size of the feed.
+#
+# Supported inputs:
+#   threats.json        plain json feed
+#   threats.json.gz     gzip compressed feed (as published by the NVD)
+#   threats.json.zip    zip archive containing the feed (as saved in "Original Source Data")
+#
+# How to use this module
+#   from nvd_feed_reader import iter_cve_items
+#
+#   header = {}
+#   for item in iter_cve_items("Data/threats.json.zip", header):
+#       print(item['cve']['CVE_data_meta']['ID'])
+#   print(header['CVE_data_numberOfCVEs'])
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import gzip
+import io
+import json
+import zipfile
+
+# number of characters read from the feed at a time
+CHUNK_SIZE = 1 << 16
+
+# name of the list holding the vulnerability records
+ITEMS_KEY = "CVE_Items"
+
+WHITESPACE = " \t\n\r"
+
+
+class _ZipFeedStream(io.TextIOWrapper):
+
+    # text stream of a member of a zip archive, closing the stream closes the archive as well
+
+    def __init__(self, archive, member):
+        super().__init__(archive.open(member), encoding="utf-8")
+        self.archive = archive
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.archive.close()
+
+
+def open_feed(path):
+
+    # open a feed as a text stream, decompressing gzip and zip files on the fly
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+
+    if path.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        members = [name for name in archive.namelist()
+                   if name.endswith(".json") and not name.startswith("__MACOSX/")]
+        try:
+            if not members:
+                raise ValueError("No json feed found in " + path)
+            return _ZipFeedStream(archive, members[0])
+        except BaseException:
+            archive.close()
+            raise
+
+    return open(path, encoding="utf-8")
+
+
+class _FeedTokenizer:
+
+    # incremental reader over a text stream, keeps only the unconsumed part of the feed in its buffer
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # drop the consumed text and append the next chunk of the feed
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        # return the next non whitespace character without consuming it, "" at end of feed
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError("Malformed feed: expected one of %r but found %r" % (chars, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        # decode the next complete json value, reading more of the feed until it is available
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a value that ends with the buffer may have been cut off (e.g. a number), read on to be sure
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_cve_items(path, header=None, chunk_size=CHUNK_SIZE):
+
+    # yield each record of the CVE_Items list of a feed
+    # if a header dictionary is passed, it is filled with the other top level fields of the feed
+    # (CVE_data_type, CVE_data_numberOfCVEs, ...)
+    with open_feed(path) as stream:
+        tokens = _FeedTokenizer(stream, chunk_size)
+        tokens.expect("{")
+        if tokens.peek() == "}":
+            return
+
+        while True:
+            key = tokens.value()
+            tokens.expect(":")
+
+            if key == ITEMS_KEY:
+                tokens.expect("[")
+                if tokens.peek() == "]":
+                    tokens.pos += 1
+                else:
+                    while True:
+                        yield tokens.value()
+                        if tokens.expect(",]") == "]":
+                            break
+            else:
+                value = tokens.value()
+                if header is not None:
+                    header[key] = value
+
+            if tokens.expect(",}") == "}":
+                return
@@ -0,0 +1,150 @@
+#
+# DESCRIPTION:
+# This module (nvd_fingerprint.py) lets a program stage reuse its previous output when nothing it depends on changed.
+#
+# The fingerprint of a stage is a hash of
+#   the input data     content hash of every input file (feeds, cluster data)
+#   the parameters     the arguments of the run, e.g. the file names, the seed and the clustering mode
+#   the code version   content hash of every nvd_*.py module and the numpy version, so editing a module or one of the
+#                      constants at the top of a program is a change as well
+# and is written next to every output file as <output>.fingerprint.json, with the input hashes, parameters and code
+# version it was made from, and the list of all outputs fingerprinted together.  A stage whose outputs all exist with
+# the same fingerprint is not run again; the output of a stage that runs loses its old fingerprint and is only
+# fingerprinted again after it has been written completely.  A stage whose number of outputs depends on the data
+# checks the outputs of its last run (fingerprinted_outputs) instead of the ones it could write.
+#
+# With every random step seeded (SAMPLE_SEED, RANDOM_STATE, SEEDS) the same fingerprint always means the same output,
+# so two runs on the same data can be compared file by file.  Setting the environment variable NVD_RECOMPUTE=1 runs
+# every stage regardless.
+#
+# How to use this module
+#   from nvd_fingerprint import fingerprint, unchanged, write_fingerprint
+#   record = fingerprint([input_file], dict(seed=0, mixed=False))
+#   outputs = ["Data/Final_Clusters.csv"]
+#   if unchanged(outputs, record):
+#       print("reusing", outputs)
+#   else:
+#       ...   # write the outputs
+#       write_fingerprint(outputs, record)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+RECOMPUTE = os.environ.get("NVD_RECOMPUTE", "").lower() in ("1", "true", "yes")
+
+# file name suffix of the fingerprint of an output file
+FINGERPRINT_EXTENSION = ".fingerprint.json"
+
+# bytes read at a time when hashing a file
+HASH_BLOCK_SIZE = 2**20
+
+# content hashes of the files hashed by this process, keyed by path, size and modification time
+_file_hashes = dict()
+_code_version = []
+
+
+def file_hash(path):
+
+    # sha256 of the content of a file, hashed once per process while the file is unchanged
+    info = os.stat(path)
+    key = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+def code_version():
+
+    # hash of the source of every nvd_*.py module next to this one and of the numpy version
+    if not _code_version:
+        digest = hashlib.sha256(np.__version__.encode())
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "nvd_*.py"))):
+            digest.update(os.path.basename(path).encode())
+            digest.update(file_hash(path).encode())
+        _code_version.append(digest.hexdigest())
+    return _code_version[0]
+
+
+def fingerprint(inputs, params):
+
+    # fingerprint record of a stage, inputs are file names and params a dict of json serializable run arguments
+    record = dict(inputs=dict((path, file_hash(path)) for path in inputs),
+                  params=json.loads(json.dumps(params, sort_keys=True, default=str)),
+                  code_version=code_version())
+    # the key depends on the content of the inputs, not on their names
+    content = [sorted(record['inputs'].values()), record['params'], record['code_version']]
+    record['key'] = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+    return record
+
+
+def fingerprint_path(output):
+    return output + FINGERPRINT_EXTENSION
+
+
+def read_fingerprint(output):
+
+    # fingerprint record of an output file, None when it has none or it cannot be read
+    try:
+        with open(fingerprint_path(output)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def fingerprinted_outputs(output, default):
+
+    # the outputs fingerprinted together with output by the last run, default when output has no fingerprint
+    entry = read_fingerprint(output)
+    if entry is None or not isinstance(entry.get('outputs'), list) or output not in entry['outputs']:
+        return list(default)
+    return entry['outputs']
+
+
+def unchanged(outputs, record):
+
+    # True when every output exists and was made with the same fingerprint
+    # otherwise the stage runs and the old fingerprints are removed first, so outputs left half written by an
+    # interrupted run are never reused
+    if not RECOMPUTE:
+        previous = [read_fingerprint(output) for output in outputs]
+        if all(os.path.exists(output) and entry is not None and entry.get('key') == record['key']
+               for output, entry in zip(outputs, previous)):
+            return True
+    remove_fingerprint(outputs)
+    return False
+
+
+def write_fingerprint(outputs, record):
+
+    # fingerprint every output, replaced at once so an interrupted run never leaves a half written fingerprint
+    # every fingerprint lists all the outputs, see fingerprinted_outputs()
+    entry = dict(record, outputs=list(outputs))
+    for output in outputs:
+        temp = fingerprint_path(output) + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(entry, f, indent=1, sort_keys=True)
+        os.replace(temp, fingerprint_path(output))
+
+
+def remove_fingerprint(outputs):
+
+    # outputs written without a fingerprint (e.g. from the record store) must not be taken for a fingerprinted run
+    for output in outputs:
+        if os.path.exists(fingerprint_path(output)):
+            os.remove(fingerprint_path(output))
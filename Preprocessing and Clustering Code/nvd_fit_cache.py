@@ -0,0 +1,147 @@
+#
+# DESCRIPTION:
+# This module (nvd_fit_cache.py) keeps the result of every hyperparameter sweep fit (see nvd_sweep.py) on disk, so an
+# interrupted sweep resumes where it stopped and extending the grid (e.g. NUMBER_OF_CLUSTERS) only fits the new points.
+#
+# Every fit is one .npz file in the cache directory, named by a hash of
+#   the input data      the encoded code matrix, the number of labels per column and the weights of the rows
+#   the parameters      init, n_clusters, n_init, max_iter, seed
+#   the code version    content hash of the nvd_*.py modules (see nvd_fingerprint.py), so a change to the k-modes
+#                       code or to the entry format is a cache miss as well
+# so a change to the data or to any parameter is a cache miss, never a stale result.  An entry holds the parameters,
+# cost, centroids, labels and number of iterations of the fit.
+#
+# Entries are written to a temporary .tmp file and renamed, so an interrupted run never leaves a partial entry.
+# Reading an entry updates its modification time, evict() removes entries by age and then, oldest first, by total
+# size, and removes the temporary files left by interrupted runs.
+#
+# How to use this module
+#   from nvd_fit_cache import data_key, fit_key, load_fit, save_fit, evict
+#   key = fit_key(data_key(codes, levels), 'Cao', 11, 10, 100, 0)
+#   fit = load_fit("Data/sweep_cache", key)   # None when the fit is not cached
+#   evict("Data/sweep_cache", max_age=30 * 86400, max_bytes=500 * 2**20)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from nvd_fingerprint import code_version
+
+DEFAULT_CACHE_DIRECTORY = "Data/sweep_cache"
+
+# file extension of a cache entry
+ENTRY_EXTENSION = ".npz"
+
+# file extension of an entry being written, never read or evicted as an entry
+TEMP_EXTENSION = ".tmp"
+
+# age in seconds after which a temporary file is taken as left by an interrupted run
+TEMP_MAX_AGE = 3600
+
+
+def data_key(codes, levels, weights=None):
+
+    # hash of the data a fit sees
+    digest = hashlib.sha256()
+    codes = np.ascontiguousarray(codes, dtype=np.uint8)
+    digest.update(str(codes.shape).encode())
+    digest.update(codes.tobytes())
+    digest.update(np.asarray(levels, dtype=np.int64).tobytes())
+    if weights is not None:
+        digest.update(np.ascontiguousarray(weights, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def fit_key(data, init, n_clusters, n_init, max_iter, seed):
+
+    # hash of the data key, the parameters of one fit and the code version
+    params = "|".join(str(value) for value in (data, init, n_clusters, n_init, max_iter, seed, code_version()))
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+def entry_path(directory, key):
+    return os.path.join(directory, key + ENTRY_EXTENSION)
+
+
+def load_fit(directory, key):
+
+    # cached (cost, centroids, labels, n_iter) of a fit, None when it is not cached
+    path = entry_path(directory, key)
+    try:
+        with np.load(path) as entry:
+            fit = (float(entry['cost']), entry['centroids'], entry['labels'], int(entry['n_iter']))
+    except (OSError, KeyError, ValueError):
+        # missing or unreadable entry, the fit is run again
+        return None
+    os.utime(path)
+    return fit
+
+
+def save_fit(directory, key, point, n_init, max_iter, fit):
+
+    # store the fit of a grid point (init, n_clusters, seed)
+    os.makedirs(directory, exist_ok=True)
+    init, n_clusters, seed = point
+    cost, centroids, labels, n_iter = fit
+    handle, temp_path = tempfile.mkstemp(prefix=key, suffix=TEMP_EXTENSION, dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.savez(f, init=init, n_clusters=n_clusters, n_init=n_init, max_iter=max_iter,
+                     seed=-1 if seed is None else seed, cost=cost, centroids=centroids, labels=labels, n_iter=n_iter)
+        os.replace(temp_path, entry_path(directory, key))
+    except BaseException:
+        # the temporary file may already be gone, that must not hide the original error
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def evict(directory, max_age=None, max_bytes=None):
+
+    # remove entries not used for more than max_age seconds, then the least recently used entries until the
+    # cache holds at most max_bytes, returns the number of entries removed
+    # entries removed meanwhile by another process are skipped
+    if not os.path.isdir(directory):
+        return 0
+
+    now = time.time()
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+            if name.endswith(ENTRY_EXTENSION):
+                entries.append((stat.st_mtime, stat.st_size, path))
+            elif name.endswith(TEMP_EXTENSION) and now - stat.st_mtime > TEMP_MAX_AGE:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+    entries.sort()
+
+    removed = 0
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in entries:
+        expired = max_age is not None and now - mtime > max_age
+        oversize = max_bytes is not None and total > max_bytes
+        if not (expired or oversize):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,179 @@
+#
+# DESCRIPTION:
+# This module (nvd_grouped_clustering.py) clusters the cluster data per time window of Date_Published and/or per
+# vendor in one job, to follow how the threat mix shifts over time.  It is the grouped mode of nvd_clustering.py.
+#
+# partition_index() groups the rows of the cluster data by
+#   window   the period of Date_Published (pandas period alias, e.g. 'Q' quarters, 'M' months, 'Y' years)
+#   vendor   one of the top_vendors most frequent vendors
+# and keeps, for every partition, only the row numbers of its records; partitions with fewer than min_records records
+# are left out.  fit_partitions() fits one k-modes model (nvd_kmodes.py, distinct vectors weighted by their frequency)
+# per partition on a pool of worker processes.  The code matrix is shared with the workers as a memory-mapped .npy file
+# (the encoded dataset of nvd_encoded_data.py, or a temporary copy), only the row numbers are sent to every worker.
+# Every partition is fitted with the same seed, so the results do not depend on the number of workers.
+#
+# drift() compares consecutive windows of the same vendor (or of all records), windows left out for having too few
+# records are skipped:
+#   Centroid_Drift       mean Hamming distance (in fields) of every centroid to the nearest centroid of the other
+#                        window, weighted by cluster size and averaged over both directions
+#   Max_Centroid_Drift   largest of those distances, a cluster with no counterpart in the other window
+#   Mix_Shift            total variation distance between the CVSS vector distributions of the two windows, 0 when
+#                        the mix is unchanged and 1 when no vector is shared
+#
+# How to use this module
+#   from nvd_grouped_clustering import partition_index, fit_partitions, grouped_table, drift
+#   partitions = partition_index(data, window='Q', top_vendors=10)
+#   fits = fit_partitions(dataset.codes, dataset.levels, partitions, n_clusters=10, workers=8)
+#   table = grouped_table(fits, dataset.codebook)
+#   changes = drift(fits, dataset.levels)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nvd_encoding import decode_codes, pack
+from nvd_kmodes import KModes, distances
+from nvd_sweep import shared_file
+
+# label of the partitions not split by time window or by vendor
+ALL = "ALL"
+
+# partitions with fewer records are not clustered
+DEFAULT_MIN_RECORDS = 20
+
+# number of worker processes, None uses one per cpu
+DEFAULT_WORKERS = None
+
+# data shared with the worker processes, opened memory-mapped by _open_shared_codes
+_shared = dict()
+
+
+def partition_index(data, window=None, top_vendors=None, min_records=DEFAULT_MIN_RECORDS):
+
+    # row numbers of the records of every partition, keyed by (window, vendor) in window order
+    # window is a pandas period alias or None, top_vendors the number of vendors or None
+    keys = []
+    if window:
+        published = data['Date_Published']
+        if getattr(published.dt, 'tz', None) is not None:
+            published = published.dt.tz_localize(None)
+        keys.append(published.dt.to_period(window).astype(str).where(published.notnull()))
+    else:
+        keys.append(pd.Series(ALL, index=data.index))
+    if top_vendors:
+        vendors = data['Vendor'].astype(object)
+        top = vendors.value_counts().index[:top_vendors]
+        keys.append(vendors.where(vendors.isin(top)))
+    else:
+        keys.append(pd.Series(ALL, index=data.index))
+
+    # records without a date or outside the top vendors have a missing key and are in no partition
+    groups = pd.DataFrame(dict(window=keys[0].to_numpy(), vendor=keys[1].to_numpy())).groupby(
+        ['window', 'vendor'], sort=True, dropna=True).indices
+    return dict((key, rows) for key, rows in sorted(groups.items()) if len(rows) >= min_records)
+
+
+def _open_shared_codes(codes_file, levels, params):
+
+    # worker initializer, open the code matrix without copying it
+    _shared['codes'] = np.load(codes_file, mmap_mode='r')
+    _shared['levels'] = levels
+    _shared['params'] = params
+
+
+def fit_partition(task):
+
+    # one k-modes fit on the rows of a partition, returns the key, centroids, cluster sizes, cost, number of
+    # iterations and the distinct vectors (packed) of the partition with their counts
+    key, rows = task
+    levels = _shared['levels']
+    n_clusters, init, n_init, max_iter, seed = _shared['params']
+    codes = np.asarray(_shared['codes'][np.sort(rows)], dtype=np.uint8)
+    km = KModes(n_clusters=n_clusters, init=init, n_init=n_init, max_iter=max_iter, random_state=seed,
+                deduplicate=True).fit(codes, levels)
+    vectors, counts = np.unique(pack(codes, levels), return_counts=True)
+    sizes = np.bincount(km.labels_, minlength=len(km.cluster_centroids_))
+    return key, km.cluster_centroids_, sizes, km.cost_, km.n_iter_, (vectors, counts)
+
+
+def fit_partitions(codes, levels, partitions, n_clusters=10, init='Huang', n_init=10, max_iter=100, seed=0,
+                   workers=DEFAULT_WORKERS):
+
+    # fit every partition of partition_index(), returns the fit_partition() results in partition order
+    # the largest partitions are submitted first so the pool stays busy to the end
+    levels = np.asarray(levels)
+    params = (n_clusters, init, n_init, max_iter, seed)
+    tasks = sorted(partitions.items(), key=lambda task: -len(task[1]))
+    if workers == 1 or len(tasks) <= 1:
+        _shared.update(codes=codes, levels=levels, params=params)
+        fits = [fit_partition(task) for task in tasks]
+    else:
+        codes = codes if isinstance(codes, np.memmap) else np.ascontiguousarray(codes, dtype=np.uint8)
+        with tempfile.TemporaryDirectory(prefix="nvd_grouped_") as directory:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_shared_codes,
+                                     initargs=(shared_file(directory, "codes", codes), levels, params)) as executor:
+                fits = list(executor.map(fit_partition, tasks))
+    order = dict((key, i) for i, key in enumerate(partitions))
+    return sorted(fits, key=lambda fit: order[fit[0]])
+
+
+def grouped_table(fits, codebook):
+
+    # one row per cluster of every partition: Window, Vendor, Cluster, the labels of the centroid, Count, Share of the
+    # partition, Records and Cost of the partition, largest clusters first within a partition
+    tables = []
+    for (window, vendor), centroids, sizes, cost, n_iter, mix in fits:
+        table = decode_codes(centroids, codebook)
+        table.insert(0, 'Cluster', np.arange(len(table)))
+        table.insert(0, 'Vendor', vendor)
+        table.insert(0, 'Window', window)
+        table['Count'] = sizes
+        table['Share'] = sizes / float(sizes.sum())
+        table['Records'] = int(sizes.sum())
+        table['Cost'] = cost
+        tables.append(table.sort_values('Count', ascending=False, kind='stable'))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def mix_shift(previous, current):
+
+    # total variation distance between two vector distributions given as (packed vectors, counts)
+    vectors = np.union1d(previous[0], current[0])
+    p = np.zeros(len(vectors))
+    q = np.zeros(len(vectors))
+    p[np.searchsorted(vectors, previous[0])] = previous[1] / float(previous[1].sum())
+    q[np.searchsorted(vectors, current[0])] = current[1] / float(current[1].sum())
+    return 0.5 * float(np.abs(p - q).sum())
+
+
+def drift(fits, levels):
+
+    # drift between consecutive windows of every vendor, one row per pair of windows
+    levels = np.asarray(levels)
+    rows = []
+    last = dict()
+    for (window, vendor), centroids, sizes, cost, n_iter, mix in fits:
+        if vendor in last:
+            previous_window, previous, previous_sizes, previous_mix = last[vendor]
+            dist = distances(centroids, previous, levels)
+            forward = dist.min(axis=1)
+            backward = dist.min(axis=0)
+            rows.append(dict(Vendor=vendor, From_Window=previous_window, To_Window=window,
+                             Centroid_Drift=0.5 * (np.average(forward, weights=sizes) +
+                                                   np.average(backward, weights=previous_sizes)),
+                             Max_Centroid_Drift=int(max(forward.max(), backward.max())),
+                             Mix_Shift=mix_shift(previous_mix, mix),
+                             From_Records=int(previous_sizes.sum()), To_Records=int(sizes.sum())))
+        last[vendor] = (window, centroids, sizes, mix)
+    return pd.DataFrame(rows, columns=['Vendor', 'From_Window', 'To_Window', 'Centroid_Drift', 'Max_Centroid_Drift',
+                                       'Mix_Shift', 'From_Records', 'To_Records'])
@@ -0,0 +1,218 @@
+#
+# DESCRIPTION:
+# This module (nvd_instrumentation.py) records where the parsers and the clustering programs spend their time.
+#
+# Every stage of a program (e.g. extraction, write, data_assessment, clustering) is run inside stage(), which records
+#   seconds              wall time
+#   cpu_seconds          cpu time of this process and of its finished worker processes
+#   peak_rss_mb          peak resident memory during the stage (Linux), or since the program started elsewhere
+#   records              number of records of the stage, set by the program
+#   records_per_second   records / seconds
+#   iterations           per iteration k-modes cost and moves, when the program passes iteration_recorder() to a fit
+# and any other field the program adds to the stage entry.
+#
+# Output, chosen with environment variables so the programs run unchanged by default:
+#   NVD_METRICS_LOG      structured log, one json line per finished stage is appended to this file
+#   NVD_METRICS_FILE     Prometheus textfile (node_exporter textfile collector), written by flush() at the end of a
+#                        program with one gauge per stage and measure, or a directory getting one <program>.prom per
+#                        program, e.g.
+#                        nvd_stage_seconds{program="nvd_clustering",stage="clustering"} 1.52
+#   NVD_PROFILE          cprofile or pyinstrument, every stage is profiled and the profile is written to
+#                        NVD_PROFILE_DIRECTORY (default Data/profiles) as <program>_<stage>.prof (cProfile, read with
+#                        python -m pstats or snakeviz) or .html (pyinstrument, optional package)
+#
+# How to use this module
+#   from nvd_instrumentation import stage, iteration_recorder, flush
+#   with stage("extraction") as entry:
+#       records = extract_feeds(...)
+#       entry['records'] = len(records)
+#   with stage("clustering") as entry:
+#       KModes(..., callback=iteration_recorder(entry)).fit(codes)
+#   flush()
+#
+#   NVD_METRICS_LOG=Data/metrics.jsonl NVD_PROFILE=cprofile python nvd_clustering.py "Data/cluster_data.parquet"
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+METRICS_LOG = os.environ.get("NVD_METRICS_LOG")
+METRICS_FILE = os.environ.get("NVD_METRICS_FILE")
+PROFILE = os.environ.get("NVD_PROFILE", "").lower()
+PROFILE_DIRECTORY = os.environ.get("NVD_PROFILE_DIRECTORY", "Data/profiles")
+
+# measures exported to the Prometheus textfile, with their help text
+PROMETHEUS_MEASURES = [
+    ('seconds', "Wall time of the stage in seconds"),
+    ('cpu_seconds', "Cpu time of the stage in seconds, worker processes included"),
+    ('peak_rss_mb', "Peak resident memory during the stage in megabytes"),
+    ('records', "Records processed by the stage"),
+    ('records_per_second', "Records processed per second"),
+    ('cost', "Clustering cost of the stage"),
+]
+
+# finished stages of this program
+_stages = []
+
+
+def program_name():
+
+    # name of the running program, e.g. nvd_clustering
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+
+def reset_peak_rss():
+
+    # reset the peak resident memory of this process (Linux), so the peak of every stage can be read
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+
+    # peak resident memory of this process since the last reset (VmHWM), or since it started
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+
+
+def cpu_seconds():
+
+    # cpu time of this process and of its finished worker processes
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def start_profiler(kind):
+
+    # start a profiler of the given kind, None when profiling is off
+    if not kind:
+        return None
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        except ImportError:
+            print("pyinstrument is not installed, profiling with cProfile")
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler, name):
+
+    # stop a profiler and write its profile, returns the file name
+    if profiler is None:
+        return None
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    path = os.path.join(PROFILE_DIRECTORY, program_name() + "_" + name)
+    if hasattr(profiler, "output_html"):
+        profiler.stop()
+        path += ".html"
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path += ".prof"
+        profiler.dump_stats(path)
+    return path
+
+
+@contextmanager
+def stage(name, records=None, profile=None):
+
+    # measure one stage of a program, the entry (a dict) can be given the records and other fields by the program
+    entry = dict([('program', program_name()), ('stage', name), ('records', records)])
+    reset_peak_rss()
+    profiler = start_profiler(PROFILE if profile is None else profile)
+    start_cpu = cpu_seconds()
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        seconds = time.perf_counter() - start
+        entry['seconds'] = seconds
+        entry['cpu_seconds'] = cpu_seconds() - start_cpu
+        entry['profile'] = stop_profiler(profiler, name)
+        entry['peak_rss_mb'] = peak_rss_mb()
+        entry['records_per_second'] = entry['records'] / seconds if entry['records'] and seconds > 0 else None
+        entry['timestamp'] = time.time()
+        _stages.append(entry)
+        if METRICS_LOG:
+            with open(METRICS_LOG, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+
+def iteration_recorder(entry):
+
+    # callback for the k-modes fits (callback parameter), keeps the cost and moves of every iteration in the entry
+    iterations = entry.setdefault('iterations', [])
+
+    def record(init_no, iteration, moves, cost):
+        iterations.append(dict(run=init_no + 1, iteration=iteration, moves=moves, cost=cost))
+    return record
+
+
+def finished_stages():
+    return list(_stages)
+
+
+def prometheus_text(stages):
+
+    # the stages in the Prometheus text exposition format
+    lines = []
+    for measure, help_text in PROMETHEUS_MEASURES:
+        metric = "nvd_stage_" + measure
+        lines.append("# HELP " + metric + " " + help_text)
+        lines.append("# TYPE " + metric + " gauge")
+        for entry in stages:
+            if entry.get(measure) is not None:
+                lines.append('%s{program="%s",stage="%s"} %s' % (metric, entry['program'], entry['stage'],
+                                                                repr(float(entry[measure]))))
+    lines.append("# HELP nvd_stage_timestamp_seconds Time the stage finished")
+    lines.append("# TYPE nvd_stage_timestamp_seconds gauge")
+    for entry in stages:
+        lines.append('nvd_stage_timestamp_seconds{program="%s",stage="%s"} %s' % (entry['program'], entry['stage'],
+                                                                                  repr(float(entry['timestamp']))))
+    return "\n".join(lines) + "\n"
+
+
+def flush(path=None):
+
+    # write the Prometheus textfile of the finished stages, replaced at once so a collector never reads half a file
+    path = path or METRICS_FILE
+    if not path or not _stages:
+        return None
+    if os.path.isdir(path):
+        path = os.path.join(path, program_name() + ".prom")
+    temp = path + ".tmp"
+    with open(temp, "w") as f:
+        f.write(prometheus_text(_stages))
+    os.replace(temp, path)
+    return path
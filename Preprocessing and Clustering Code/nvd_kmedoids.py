@@ -0,0 +1,154 @@
+#
+# DESCRIPTION:
+# This module (nvd_kmedoids.py) searches for better clusters than k-modes by using how small the CVSS v3 base metric
+# space is: AV 4 x AC 2 x UI 2 x PR 3 x C/I/A 3^3 = 1296 possible vectors.  It is the exact search mode of
+# nvd_clustering.py.
+#
+# The k-modes cost is the weighted Hamming distance of every record to its nearest centroid, and a centroid can be any
+# vector of the space.  That is a weighted k-medoids problem with every one of the 1296 vectors as a candidate medoid,
+# so the Hamming distances between the distinct vectors of the data and every vector of the space are computed once
+# (at most 1296 x 1296) and the search only works on that matrix:
+#   build   greedy start, every step adds the candidate that lowers the cost most (Kaufman and Rousseeuw)
+#   swap    PAM swap search, the cost change of swapping every medoid with every candidate is computed at once from the
+#           nearest and second nearest medoid of every vector (as in FastPAM), and the best swap is made until no swap
+#           lowers the cost.  The result is a local optimum of the whole space: no single medoid can be replaced by
+#           any of the 1296 vectors to lower the cost.
+# Started from the centroids of a k-modes fit (init=centroids) the swap search can only lower the cost, so the result
+# is never worse than the k-modes result it started from.  With one cluster the search is exact.
+#
+# How to use this module
+#   from nvd_kmedoids import KMedoids
+#   km = KModes(n_clusters=10, init='Huang', random_state=0).fit(codes, levels)
+#   kd = KMedoids(n_clusters=10, init=km.cluster_centroids_).fit(codes, levels)
+#   kd.cluster_centroids_, kd.labels_, kd.cost_, kd.n_iter_   # cost_ <= km.cost_
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import numpy as np
+
+from nvd_encoding import deduplicate, pack
+from nvd_kmodes import distances
+
+# largest number of swaps of one search
+MAX_SWAPS = 1000
+
+# largest vector space searched, the distinct vectors of the data are the candidates above it
+MAX_SPACE = 20000
+
+
+def vector_space(levels):
+
+    # every vector of the code space, in pack() order
+    levels = [int(n) for n in levels]
+    return np.indices(levels, dtype=np.uint8).reshape(len(levels), -1).T.copy()
+
+
+def nearest_two(dist, medoids):
+
+    # distance to the nearest and second nearest medoid and the position of the nearest medoid, for every vector
+    medoid_dist = dist[:, medoids]
+    if len(medoids) == 1:
+        return medoid_dist[:, 0], np.full(dist.shape[0], np.inf), np.zeros(dist.shape[0], dtype=np.intp)
+    order = np.argsort(medoid_dist, axis=1, kind='stable')[:, :2]
+    rows = np.arange(dist.shape[0])
+    return medoid_dist[rows, order[:, 0]], medoid_dist[rows, order[:, 1]], order[:, 0]
+
+
+def build(dist, weights, n_clusters):
+
+    # greedy start, one candidate at a time
+    cost = weights @ dist
+    medoids = [int(np.argmin(cost))]
+    nearest = dist[:, medoids[0]]
+    while len(medoids) < n_clusters:
+        cost = weights @ np.minimum(dist, nearest[:, None])
+        cost[medoids] = np.inf
+        medoids.append(int(np.argmin(cost)))
+        nearest = np.minimum(nearest, dist[:, medoids[-1]])
+    return np.array(medoids, dtype=np.intp)
+
+
+def swap_deltas(dist, weights, medoids):
+
+    # cost change of replacing the medoid at every position (rows) with every candidate (columns)
+    d1, d2, near = nearest_two(dist, medoids)
+    # every vector moves to the candidate when it is closer than its nearest medoid
+    closer = np.minimum(dist - d1[:, None], 0.0)
+    deltas = np.tile(weights @ closer, (len(medoids), 1))
+    # the vectors of the removed medoid go to the candidate or to their second nearest medoid
+    removed = weights[:, None] * (np.minimum(dist, d2[:, None]) - d1[:, None] - closer)
+    np.add.at(deltas, near, removed)
+    return deltas
+
+
+def swap(dist, weights, medoids, max_swaps=MAX_SWAPS):
+
+    # PAM swap search, returns the medoids and the number of swaps made
+    medoids = np.array(medoids, dtype=np.intp)
+    n_swaps = 0
+    while n_swaps < max_swaps:
+        deltas = swap_deltas(dist, weights, medoids)
+        deltas[:, medoids] = np.inf
+        position, candidate = np.unravel_index(np.argmin(deltas), deltas.shape)
+        # a swap has to lower the cost by more than rounding of the weighted sums
+        if deltas[position, candidate] >= -1e-9 * max(1.0, float(weights.sum())):
+            break
+        medoids[position] = candidate
+        n_swaps += 1
+    return medoids, n_swaps
+
+
+class KMedoids:
+
+    # weighted k-medoids over the whole code space of a uint8 code matrix
+    # init is 'build' or an array of initial centroids (e.g. of a k-modes fit)
+    # attributes: cluster_centroids_, labels_, cost_, n_iter_ (number of swaps), start_cost_ (cost of the start)
+
+    def __init__(self, n_clusters=8, init='build', max_swaps=MAX_SWAPS):
+        self.n_clusters = n_clusters
+        self.init = init
+        self.max_swaps = max_swaps
+
+    def fit(self, codes, levels=None, sample_weight=None):
+
+        # levels is the number of labels of every field (see nvd_encoding.n_levels), taken from the data if not given
+        codes = np.asarray(codes, dtype=np.uint8)
+        self.levels_ = np.asarray(levels) if levels is not None else codes.max(axis=0).astype(np.intp) + 1
+        unique, weights, inverse = deduplicate(codes, self.levels_, sample_weight)
+
+        # every vector of the space is a candidate, unless the space is too large for the distance matrix
+        if np.prod(self.levels_.astype(np.float64)) <= MAX_SPACE:
+            space = vector_space(self.levels_)
+        else:
+            space = unique
+        dist = distances(unique, space, self.levels_).astype(np.float64)
+
+        if isinstance(self.init, str) and self.init == 'build':
+            medoids = build(dist, weights, min(self.n_clusters, space.shape[0]))
+        else:
+            start = np.asarray(self.init, dtype=np.uint8)
+            medoids = np.searchsorted(pack(space, self.levels_), pack(start, self.levels_))
+            if not (pack(space[np.minimum(medoids, len(space) - 1)], self.levels_) == pack(start, self.levels_)).all():
+                raise ValueError("Initial centroids are not in the candidate vectors")
+        self.start_cost_ = float(weights @ nearest_two(dist, medoids)[0])
+
+        medoids, self.n_iter_ = swap(dist, weights, medoids, self.max_swaps)
+        d1, d2, near = nearest_two(dist, medoids)
+        self.cluster_centroids_ = space[medoids]
+        self.labels_ = near[inverse]
+        self.cost_ = float(weights @ d1)
+        return self
+
+    def fit_predict(self, codes, levels=None, sample_weight=None):
+        return self.fit(codes, levels, sample_weight).labels_
+
+    def predict(self, codes):
+        assert hasattr(self, 'cluster_centroids_'), "Model not yet fitted."
+        codes = np.asarray(codes, dtype=np.uint8)
+        return np.argmin(distances(codes, self.cluster_centroids_, self.levels_), axis=1)
@@ -0,0 +1,576 @@
+#
+# DESCRIPTION:
+# This module (nvd_kmodes.py) is a vectorized k-modes implementation for the integer coded CVSS matrix produced by
+# nvd_encoding.py.  It replaces kmodes.kmodes.KModes in nvd_clustering.py and nvd_clustering_hyperparameter_validation.py
+# and keeps the same parameters and result attributes (cluster_centroids_, labels_, cost_, n_iter_, epoch_costs_).
+#
+# - Hamming (simple matching) distances are computed in blocks of records.  Codes are one-hot expanded, so the number
+#   of matching fields between every record of a block and every centroid is a single matrix product.
+# - Modes are updated for all clusters at once with one bincount per field.
+# - With deduplicate=True only the distinct vectors are clustered, weighted by their multiplicity (weighted mode
+#   updates and weighted cost), and the labels are expanded back to every record.  There are only a few hundred
+#   distinct CVSS vectors, so the run time no longer grows with the number of CVEs.
+#
+# Seeding ('Huang', 'Cao', 'random'), the per-run seeds drawn from random_state, tie breaking (lowest cluster, lowest
+# code) and the handling of empty clusters follow the kmodes package.  With the default update='online' records are
+# moved one at a time in record order exactly as kmodes does, so for the same random_state the centroids, labels and
+# costs are the same.  The distances of every record to every centroid are kept in a matrix, and only the column of a
+# centroid that changed is recomputed, so records that stay in their cluster are not visited one by one.
+# update='batch' moves all records at once (Lloyd style); it is faster still but can settle in a different local
+# optimum than kmodes.
+#
+# How to use this module
+#   from nvd_encoding import encode_cvss, decode_codes
+#   from nvd_kmodes import KModes
+#   codes, codebook = encode_cvss(df)
+#   km = KModes(n_clusters=10, init='Huang', random_state=0)
+#   labels = km.fit_predict(codes)
+#   centroids = decode_codes(km.cluster_centroids_, codebook)
+#
+# init_extend() adds seeds to the centroids of a smaller k, used by the warm started k sweep in nvd_sweep.py.
+#
+# MiniBatchKModes clusters data batch by batch (e.g. the record store read in chunks) with running per cluster label
+# counts, and partial_fit folds new records into an existing clustering; save_minibatch/load_minibatch keep its state.
+#   km = MiniBatchKModes(n_clusters=10, init='Huang', random_state=0)
+#   for codes in batches: km.partial_fit(codes, levels)
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import numpy as np
+
+from nvd_encoding import deduplicate
+
+# number of records per block when computing distances
+BLOCK_SIZE = 8192
+
+INIT_METHODS = ['Huang', 'Cao', 'random']
+
+
+def check_random_state(seed):
+
+    # same conventions as the random_state parameter of the kmodes package (and scikit-learn)
+    if seed is None or seed is np.random:
+        return np.random.mtrand._rand
+    if isinstance(seed, np.random.RandomState):
+        return seed
+    return np.random.RandomState(seed)
+
+
+def one_hot(codes, levels):
+
+    # expand a code matrix into a float32 indicator matrix with one column per (field, label)
+    offsets = np.concatenate(([0], np.cumsum(levels)[:-1]))
+    encoded = np.zeros((codes.shape[0], int(np.sum(levels))), dtype=np.float32)
+    rows = np.arange(codes.shape[0])[:, None]
+    encoded[rows, codes.astype(np.intp) + offsets] = 1.0
+    return encoded
+
+
+def distances(codes, centroids, levels):
+
+    # Hamming distance between every record of codes and every centroid (records x centroids)
+    matches = one_hot(codes, levels) @ one_hot(centroids, levels).T
+    return codes.shape[1] - matches
+
+
+def assign(codes, centroids, levels, block_size=BLOCK_SIZE, weights=None):
+
+    # nearest centroid for every record and the total (weighted) cost, computed block by block
+    labels = np.empty(codes.shape[0], dtype=np.intp)
+    cost = 0.0
+    centroid_matrix = one_hot(centroids, levels).T
+    for start in range(0, codes.shape[0], block_size):
+        block = codes[start:start + block_size]
+        dist = block.shape[1] - one_hot(block, levels) @ centroid_matrix
+        block_labels = np.argmin(dist, axis=1)
+        labels[start:start + block_size] = block_labels
+        block_cost = dist[np.arange(block.shape[0]), block_labels]
+        if weights is not None:
+            block_cost = block_cost * weights[start:start + block_size]
+        cost += float(block_cost.sum())
+    return labels, cost
+
+
+def cluster_counts(codes, labels, n_clusters, levels, weights=None):
+
+    # per cluster (weighted) counts of every label of every field, one bincount per field
+    return [np.bincount(labels * levels[j] + codes[:, j], weights=weights,
+                        minlength=n_clusters * levels[j]).reshape(n_clusters, levels[j])
+            for j in range(codes.shape[1])]
+
+
+def choose(random_state, choices, weights=None):
+
+    # one random element of choices, with probability proportional to its weight when weights are given
+    if weights is None:
+        return random_state.choice(choices)
+    return choices[random_state.choice(len(choices), p=weights / weights.sum())]
+
+
+def modes(counts):
+
+    # most frequent label of every field for every cluster, ties go to the lowest code
+    return np.stack([field_counts.argmax(axis=1) for field_counts in counts], axis=1).astype(np.uint8)
+
+
+def init_huang(codes, n_clusters, random_state, levels=None, weights=None):
+
+    # Huang [1997]: sample every field by its frequency, then replace each centroid by the closest distinct record
+    # with weights the frequencies are the weighted label counts
+    n_attrs = codes.shape[1]
+    centroids = np.empty((n_clusters, n_attrs), dtype=np.uint8)
+    for iattr in range(n_attrs):
+        if weights is None:
+            centroids[:, iattr] = random_state.choice(np.sort(codes[:, iattr]), n_clusters)
+        else:
+            freq = np.bincount(codes[:, iattr], weights=weights, minlength=levels[iattr])
+            centroids[:, iattr] = random_state.choice(len(freq), n_clusters, p=freq / freq.sum())
+
+    for ik in range(n_clusters):
+        order = np.argsort(np.sum(codes != centroids[ik], axis=1))
+        # we want the centroid to be unique, if possible
+        chosen = order[-1]
+        for ndx in order:
+            if not np.all(codes[ndx] == centroids, axis=1).any():
+                chosen = ndx
+                break
+        centroids[ik] = codes[chosen]
+
+    return centroids
+
+
+def init_cao(codes, n_clusters, levels, weights=None):
+
+    # Cao et al. [2009]: choose centroids by density and distance to the centroids already chosen
+    # with weights the density is computed from the weighted label counts
+    n_points, n_attrs = codes.shape
+    total = float(n_points) if weights is None else float(np.sum(weights))
+    dens = np.zeros(n_points)
+    for iattr in range(n_attrs):
+        freq = np.bincount(codes[:, iattr], weights=weights, minlength=levels[iattr])
+        dens += freq[codes[:, iattr]] / total / float(n_attrs)
+
+    centroids = np.empty((n_clusters, n_attrs), dtype=np.uint8)
+    centroids[0] = codes[np.argmax(dens)]
+    if n_clusters > 1:
+        # the lowest dens * dissim to an already chosen centroid, kept up to date as centroids are added
+        lowest = np.sum(codes != centroids[0], axis=1) * dens
+        for ik in range(1, n_clusters):
+            centroids[ik] = codes[np.argmax(lowest)]
+            lowest = np.minimum(lowest, np.sum(codes != centroids[ik], axis=1) * dens)
+
+    return centroids
+
+
+def init_centroids(codes, n_clusters, init, levels, random_state, weights=None):
+    if isinstance(init, str) and init.lower() == 'huang':
+        return init_huang(codes, n_clusters, random_state, levels, weights)
+    if isinstance(init, str) and init.lower() == 'cao':
+        return init_cao(codes, n_clusters, levels, weights)
+    if isinstance(init, str) and init.lower() == 'random':
+        if weights is None:
+            return codes[random_state.choice(range(codes.shape[0]), n_clusters)].copy()
+        return codes[random_state.choice(codes.shape[0], n_clusters, p=weights / weights.sum())].copy()
+    if hasattr(init, '__array__'):
+        return np.array(init, dtype=np.uint8).reshape(n_clusters, codes.shape[1])
+    raise NotImplementedError("Unknown init method: " + str(init))
+
+
+def init_extend(codes, centroids, n_new, init, levels, random_state, weights=None):
+
+    # warm start for a larger number of clusters: keep the given centroids and add n_new seeds chosen like init
+    # 'Cao' adds the densest records far from every centroid, 'Huang' samples fields by frequency and takes the
+    # closest record that is not a centroid yet, 'random' draws records that are not a centroid yet (by weight)
+    centroids = np.array(centroids, dtype=np.uint8).reshape(-1, codes.shape[1])
+    if n_new == 0:
+        return centroids
+    n_points, n_attrs = codes.shape
+    added = np.empty((n_new, n_attrs), dtype=np.uint8)
+
+    if isinstance(init, str) and init.lower() == 'cao':
+        total = float(n_points) if weights is None else float(np.sum(weights))
+        dens = np.zeros(n_points)
+        for iattr in range(n_attrs):
+            freq = np.bincount(codes[:, iattr], weights=weights, minlength=levels[iattr])
+            dens += freq[codes[:, iattr]] / total / float(n_attrs)
+        lowest = dens * n_attrs
+        for centroid in centroids:
+            lowest = np.minimum(lowest, np.sum(codes != centroid, axis=1) * dens)
+        for ik in range(n_new):
+            added[ik] = codes[np.argmax(lowest)]
+            lowest = np.minimum(lowest, np.sum(codes != added[ik], axis=1) * dens)
+    elif isinstance(init, str) and init.lower() == 'huang':
+        for iattr in range(n_attrs):
+            freq = np.bincount(codes[:, iattr], weights=weights, minlength=levels[iattr])
+            added[:, iattr] = random_state.choice(len(freq), n_new, p=freq / freq.sum())
+        chosen = centroids
+        for ik in range(n_new):
+            order = np.argsort(np.sum(codes != added[ik], axis=1), kind='stable')
+            taken = (codes[order][:, None, :] == chosen[None, :, :]).all(axis=2).any(axis=1)
+            free = np.flatnonzero(~taken)
+            added[ik] = codes[order[free[0]] if len(free) else order[-1]]
+            chosen = np.vstack([chosen, added[ik:ik + 1]])
+    elif isinstance(init, str) and init.lower() == 'random':
+        # records that are not a centroid yet, if there are enough of them
+        free = ~(codes[:, None, :] == centroids[None, :, :]).all(axis=2).any(axis=1)
+        if free.sum() < n_new:
+            free[:] = True
+        p = np.where(free, 1.0 if weights is None else weights, 0.0)
+        added[:] = codes[random_state.choice(n_points, n_new, replace=np.count_nonzero(p) < n_new, p=p / p.sum())]
+    else:
+        raise NotImplementedError("Unknown init method: " + str(init))
+
+    return np.vstack([centroids, added])
+
+
+def refresh_column(dist, best, codes, centroids, ik):
+
+    # recompute the distances to centroid ik after it changed and keep the nearest centroid of every record current
+    # (ties go to the lowest cluster, as with np.argmin)
+    old = dist[:, ik].copy()
+    dist[:, ik] = np.sum(codes != centroids[ik], axis=1)
+    new = dist[:, ik]
+
+    rows = np.arange(codes.shape[0])
+    was_best = best == ik
+    stale = np.flatnonzero(was_best & (new > old))
+    best_dist = dist[rows, best]
+    gained = ~was_best & ((new < best_dist) | ((new == best_dist) & (ik < best)))
+    best[gained] = ik
+    if stale.size:
+        best[stale] = np.argmin(dist[stale], axis=1)
+
+
+def move_point(codes, ipoint, to_clust, from_clust, counts, centroids, labels, sizes, weight=1):
+
+    # move one record (with its weight) between clusters and update the label counts and centroids of both clusters
+    # returns the clusters whose centroid changed
+    changed = set()
+    labels[ipoint] = to_clust
+    sizes[to_clust] += weight
+    sizes[from_clust] -= weight
+    for iattr, curattr in enumerate(codes[ipoint]):
+        to_counts = counts[iattr][to_clust]
+        from_counts = counts[iattr][from_clust]
+
+        # increment the label count for the new "to" cluster, the label becomes the mode when it passes the current one
+        to_counts[curattr] += weight
+        if to_counts[centroids[to_clust, iattr]] < to_counts[curattr]:
+            centroids[to_clust, iattr] = curattr
+            changed.add(to_clust)
+
+        # decrement the label count for the old "from" cluster, recalculate its mode when the mode lost a count
+        from_counts[curattr] -= weight
+        if centroids[from_clust, iattr] == curattr:
+            mode = from_counts.argmax()
+            if mode != curattr:
+                centroids[from_clust, iattr] = mode
+                changed.add(from_clust)
+
+    return changed
+
+
+def online_iteration(codes, centroids, members, counts, levels, random_state, block_size=BLOCK_SIZE, weights=None):
+
+    # one pass over the records in order, moving each record to its nearest centroid as soon as it is seen and updating
+    # the two centroids involved, as kmodes does.  The distances to all centroids are kept in a matrix and only the
+    # column of a centroid that changed is recomputed, so the records that do not move are never visited one by one.
+    n_clusters = centroids.shape[0]
+    dist = np.empty((codes.shape[0], n_clusters), dtype=np.int8)
+    for start in range(0, codes.shape[0], block_size):
+        block = codes[start:start + block_size]
+        dist[start:start + block_size] = distances(block, centroids, levels)
+    best = np.argmin(dist, axis=1)
+    sizes = np.bincount(members, weights=weights, minlength=n_clusters)
+
+    moves = 0
+    ipoint = 0
+    while ipoint < codes.shape[0]:
+        # next record that is not in its nearest cluster
+        pending = best[ipoint:] != members[ipoint:]
+        offset = int(pending.argmax())
+        if not pending[offset]:
+            break
+        ipoint += offset
+        clust = best[ipoint]
+        old_clust = members[ipoint]
+
+        moves += 1
+        changed = move_point(codes, ipoint, clust, old_clust, counts, centroids, members, sizes,
+                             1 if weights is None else weights[ipoint])
+
+        # in case of an empty cluster, reinitialize with a random record from the largest cluster
+        if sizes[old_clust] <= 0:
+            from_clust = sizes.argmax()
+            choices = np.flatnonzero(members == from_clust)
+            rindx = choose(random_state, choices, None if weights is None else weights[choices])
+            changed |= move_point(codes, rindx, old_clust, from_clust, counts, centroids, members, sizes,
+                                  1 if weights is None else weights[rindx])
+
+        for ik in changed:
+            refresh_column(dist, best, codes, centroids, ik)
+        ipoint += 1
+
+    return centroids, members, moves
+
+
+def batch_iteration(codes, centroids, members, counts, levels, random_state, block_size=BLOCK_SIZE, weights=None):
+
+    # move all records at once: reassign every record to its nearest centroid, then recompute every mode
+    n_clusters = centroids.shape[0]
+    new_members = assign(codes, centroids, levels, block_size)[0]
+    moves = int(np.count_nonzero(new_members != members))
+    centroids = modes(cluster_counts(codes, new_members, n_clusters, levels, weights))
+
+    # in case of an empty cluster, reinitialize with a random record from the largest cluster
+    sizes = np.bincount(new_members, weights=weights, minlength=n_clusters)
+    for ik in np.flatnonzero(sizes <= 0):
+        from_clust = sizes.argmax()
+        choices = np.flatnonzero(new_members == from_clust)
+        rindx = choose(random_state, choices, None if weights is None else weights[choices])
+        weight = 1 if weights is None else weights[rindx]
+        centroids[ik] = codes[rindx]
+        new_members[rindx] = ik
+        sizes[from_clust] -= weight
+        sizes[ik] += weight
+
+    return centroids, new_members, moves
+
+
+def k_modes_single(codes, n_clusters, max_iter, init, levels, random_state, verbose=0, init_no=0,
+                   update='online', block_size=BLOCK_SIZE, weights=None, callback=None):
+
+    # one k-modes run, returns centroids, labels, cost, number of iterations and the cost of every epoch
+    # weights (optional) are the multiplicity of every record, used for the mode updates and the cost
+    # callback (optional) is called as callback(init_no, iteration, moves, cost) after every iteration
+    random_state = check_random_state(random_state)
+    centroids = init_centroids(codes, n_clusters, init, levels, random_state, weights)
+
+    # initial assignment and centroid update
+    # members is the cluster each record belongs to for the mode updates; it is kept apart from the labels reported
+    # with the cost, which are recomputed against the final centroids of every epoch
+    members = assign(codes, centroids, levels, block_size)[0]
+    counts = cluster_counts(codes, members, n_clusters, levels, weights)
+    centroids = modes(counts)
+    sizes = np.bincount(members, minlength=n_clusters)
+    for ik in np.flatnonzero(sizes == 0):
+        # empty centroid, choose randomly
+        for iattr in range(codes.shape[1]):
+            centroids[ik, iattr] = choose(random_state, codes[:, iattr], weights)
+
+    labels, cost = assign(codes, centroids, levels, block_size, weights)
+    epoch_costs = [cost]
+    itr = 0
+    converged = False
+    iteration = online_iteration if update == 'online' else batch_iteration
+
+    while itr < max_iter and not converged:
+        itr += 1
+        centroids, members, moves = iteration(codes, centroids, members, counts, levels, random_state, block_size,
+                                              weights)
+        counts = cluster_counts(codes, members, n_clusters, levels, weights)
+        labels, ncost = assign(codes, centroids, levels, block_size, weights)
+        converged = (moves == 0) or (ncost >= cost)
+        epoch_costs.append(ncost)
+        cost = ncost
+        if verbose:
+            print("Run %d, iteration: %d/%d, moves: %d, cost: %s" % (init_no + 1, itr, max_iter, moves, cost))
+        if callback is not None:
+            callback(init_no, itr, moves, cost)
+
+    return centroids, labels, cost, itr, epoch_costs
+
+
+class KModes:
+
+    # k-modes clustering of a uint8 code matrix, parameters and attributes follow kmodes.kmodes.KModes
+
+    def __init__(self, n_clusters=8, max_iter=100, init='Cao', n_init=10, verbose=0, random_state=None,
+                 update='online', deduplicate=False, block_size=BLOCK_SIZE, callback=None):
+        self.n_clusters = n_clusters
+        self.max_iter = max_iter
+        self.init = init
+        self.n_init = n_init
+        self.verbose = verbose
+        self.random_state = random_state
+        self.update = update
+        self.deduplicate = deduplicate
+        self.block_size = block_size
+        self.callback = callback
+        if ((isinstance(init, str) and init == 'Cao') or hasattr(init, '__array__')) and n_init > 1:
+            # initialization method and algorithm are deterministic
+            self.n_init = 1
+
+    def fit(self, codes, levels=None, sample_weight=None):
+
+        # levels is the number of labels of every field (see nvd_encoding.n_levels), taken from the data if not given
+        # sample_weight (optional) is the multiplicity of every record
+        codes = np.asarray(codes, dtype=np.uint8)
+        self.levels_ = np.asarray(levels) if levels is not None else codes.max(axis=0).astype(np.intp) + 1
+        weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        random_state = check_random_state(self.random_state)
+
+        inverse = None
+        if self.deduplicate:
+            # cluster the distinct vectors only, weighted by how often they occur, and expand the labels afterwards
+            codes, weights, inverse = deduplicate(codes, self.levels_, weights)
+
+        n_clusters = self.n_clusters
+        max_iter = self.max_iter
+        n_init = self.n_init
+        init = self.init
+        assert n_clusters <= codes.shape[0] or inverse is not None, \
+            "Cannot have more clusters (%d) than data points (%d)." % (n_clusters, codes.shape[0])
+
+        # are there more n_clusters than unique rows? then set the unique rows as initial values and skip iteration
+        unique = codes if inverse is not None else np.unique(codes, axis=0)
+        if unique.shape[0] <= n_clusters:
+            max_iter = 0
+            n_init = 1
+            n_clusters = unique.shape[0]
+            init = unique
+
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=n_init)
+        results = [k_modes_single(codes, n_clusters, max_iter, init, self.levels_, seeds[init_no], self.verbose,
+                                  init_no, self.update, self.block_size, weights, self.callback)
+                   for init_no in range(n_init)]
+
+        best = int(np.argmin([result[2] for result in results]))
+        self.cluster_centroids_, self.labels_, self.cost_, self.n_iter_, self.epoch_costs_ = results[best]
+        if inverse is not None:
+            self.labels_ = self.labels_[inverse]
+        return self
+
+    def fit_predict(self, codes, levels=None, sample_weight=None):
+        return self.fit(codes, levels, sample_weight).labels_
+
+    def predict(self, codes):
+        assert hasattr(self, 'cluster_centroids_'), "Model not yet fitted."
+        return assign(np.asarray(codes, dtype=np.uint8), self.cluster_centroids_, self.levels_, self.block_size)[0]
+
+
+class MiniBatchKModes:
+
+    # mini-batch k-modes for data that does not fit in memory, e.g. the record store read in chunks
+    # every batch is assigned to the current centroids, its per cluster label counts are added to the running counts
+    # (counts_) and the centroids are the modes of the running counts, so partial_fit can fold new records into an
+    # existing clustering without a refit
+    # the centroids start from a KModes fit (init, n_init, max_iter) of the first batch, or init is an array of
+    # centroids to start from
+
+    def __init__(self, n_clusters=8, init='Huang', n_init=10, max_iter=100, verbose=0, random_state=None,
+                 block_size=BLOCK_SIZE):
+        self.n_clusters = n_clusters
+        self.init = init
+        self.n_init = n_init
+        self.max_iter = max_iter
+        self.verbose = verbose
+        self.random_state = random_state
+        self.block_size = block_size
+
+    def partial_fit(self, codes, levels=None, sample_weight=None):
+
+        # update the centroids with one batch of records
+        codes = np.asarray(codes, dtype=np.uint8)
+        weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        if not hasattr(self, 'cluster_centroids_'):
+            self.levels_ = np.asarray(levels) if levels is not None else codes.max(axis=0).astype(np.intp) + 1
+            self.random_state_ = check_random_state(self.random_state)
+            if hasattr(self.init, '__array__'):
+                self.cluster_centroids_ = np.array(self.init, dtype=np.uint8).reshape(self.n_clusters, codes.shape[1])
+            else:
+                first = KModes(n_clusters=self.n_clusters, max_iter=self.max_iter, init=self.init, n_init=self.n_init,
+                               random_state=self.random_state_, block_size=self.block_size, deduplicate=True)
+                self.cluster_centroids_ = first.fit(codes, self.levels_, weights).cluster_centroids_.copy()
+                if len(self.cluster_centroids_) < self.n_clusters:
+                    # fewer distinct records than clusters in the first batch, the other clusters start from random records
+                    extra = init_centroids(codes, self.n_clusters - len(self.cluster_centroids_), 'random',
+                                           self.levels_, self.random_state_, weights)
+                    self.cluster_centroids_ = np.vstack([self.cluster_centroids_, extra])
+            self.counts_ = [np.zeros((self.n_clusters, level)) for level in self.levels_]
+            self.n_batches_ = 0
+            self.n_records_ = 0.0
+            self.batch_costs_ = []
+
+        labels, cost = assign(codes, self.cluster_centroids_, self.levels_, self.block_size, weights)
+        for field_counts, batch_counts in zip(self.counts_, cluster_counts(codes, labels, self.n_clusters,
+                                                                           self.levels_, weights)):
+            field_counts += batch_counts
+
+        # clusters that have not received any record yet keep their seed
+        seen = self.counts_[0].sum(axis=1) > 0
+        self.cluster_centroids_[seen] = modes(self.counts_)[seen]
+
+        self.n_batches_ += 1
+        self.n_records_ += codes.shape[0] if weights is None else float(weights.sum())
+        self.batch_costs_.append(cost)
+        if self.verbose:
+            print("Batch %d, records: %d, cost: %s" % (self.n_batches_, codes.shape[0], cost))
+        return self
+
+    def fit(self, batches, levels=None):
+
+        # one pass over an iterable of code matrices
+        for codes in batches:
+            self.partial_fit(codes, levels)
+        return self
+
+    def predict(self, codes):
+        assert hasattr(self, 'cluster_centroids_'), "Model not yet fitted."
+        return assign(np.asarray(codes, dtype=np.uint8), self.cluster_centroids_, self.levels_, self.block_size)[0]
+
+    def score(self, codes, sample_weight=None):
+
+        # total (weighted) distance of codes to their nearest centroid, the k-modes cost
+        assert hasattr(self, 'cluster_centroids_'), "Model not yet fitted."
+        weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        return assign(np.asarray(codes, dtype=np.uint8), self.cluster_centroids_, self.levels_, self.block_size,
+                      weights)[1]
+
+
+def minibatch_from_labels(codes, centroids, labels, levels, weights=None):
+
+    # MiniBatchKModes holding the result of a full fit (centroids and the label counts of its clusters), so records
+    # ingested later can be folded in with partial_fit
+    km = MiniBatchKModes(n_clusters=centroids.shape[0], init=centroids)
+    km.cluster_centroids_ = np.array(centroids, dtype=np.uint8)
+    km.levels_ = np.asarray(levels)
+    km.counts_ = [field_counts.astype(np.float64)
+                  for field_counts in cluster_counts(codes, labels, centroids.shape[0], km.levels_, weights)]
+    km.n_batches_ = 1
+    km.n_records_ = codes.shape[0] if weights is None else float(np.sum(weights))
+    km.batch_costs_ = [assign(codes, km.cluster_centroids_, km.levels_, km.block_size, weights)[1]]
+    km.random_state_ = check_random_state(None)
+    return km
+
+
+def save_minibatch(km, path, last_modified=""):
+
+    # keep the state of a MiniBatchKModes (centroids and running counts) so later runs can continue with partial_fit
+    # last_modified is the newest Date_Modified folded into the model
+    state = dict(('counts_%d' % j, field_counts) for j, field_counts in enumerate(km.counts_))
+    np.savez(path, cluster_centroids=km.cluster_centroids_, levels=km.levels_, n_batches=km.n_batches_,
+             n_records=km.n_records_, batch_costs=np.asarray(km.batch_costs_), last_modified=last_modified, **state)
+
+
+def load_minibatch(path, verbose=0, block_size=BLOCK_SIZE):
+
+    # MiniBatchKModes saved by save_minibatch, and the newest Date_Modified folded into it
+    with np.load(path) as state:
+        centroids = state['cluster_centroids']
+        km = MiniBatchKModes(n_clusters=centroids.shape[0], init=centroids, verbose=verbose, block_size=block_size)
+        km.cluster_centroids_ = centroids.copy()
+        km.levels_ = state['levels']
+        km.counts_ = [state['counts_%d' % j] for j in range(len(km.levels_))]
+        km.n_batches_ = int(state['n_batches'])
+        km.n_records_ = float(state['n_records'])
+        km.batch_costs_ = list(state['batch_costs'])
+        km.random_state_ = check_random_state(None)
+        last_modified = str(state['last_modified'])
+    return km, last_modified
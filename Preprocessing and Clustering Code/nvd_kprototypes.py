@@ -0,0 +1,206 @@
+#
+# DESCRIPTION:
+# This module (nvd_kprototypes.py) clusters the cluster data with the fields k-modes leaves out: the dates, the vendor
+# and the product.  It is the mixed type counterpart of nvd_kmodes.py, used by nvd_clustering.py with MIXED_FEATURES.
+#
+# Features (mixed_features):
+#   categorical   the seven base metric 3 codes, plus Vendor and Product as uint8 codes with a bounded number of
+#                 labels, the MAX_CATEGORIES most frequent values and OTHER ('capped') or crc32 hash buckets ('hashed'),
+#                 so memory does not grow with the number of vendors and products
+#   numeric       Days_To_Modify        days between Date_Published and Date_Modified
+#                 Log_Vendor_Frequency  log(1 + number of records of the vendor), 0 when the vendor is missing
+#                 standardized (zero mean, unit variance) before clustering
+#
+# k-prototypes (Huang [1998]) minimizes, over all records, the squared euclidean distance of the numeric features to
+# the cluster mean plus gamma times the Hamming distance of the categorical codes to the cluster mode.  Like
+# nvd_kmodes.py the distances are computed in blocks of records (one matrix product for the Hamming part) and the
+# means and modes of all clusters are updated at once with bincounts; every record is moved at once (Lloyd style).
+# gamma defaults to half the mean standard deviation of the numeric features, as in the kmodes package.
+#
+# How to use this module
+#   from nvd_kprototypes import mixed_features, scale_numeric, KPrototypes
+#   codes, numeric, codebook = mixed_features(df)
+#   scaled, mean, std = scale_numeric(numeric)
+#   kp = KPrototypes(n_clusters=10, init='Huang', random_state=0).fit(codes, scaled, n_levels(codebook))
+#   kp.cluster_centroids_, kp.cluster_means_ * std + mean, kp.labels_, kp.cost_
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import numpy as np
+import pandas as pd
+
+from nvd_encoding import encode_cvss, encode_capped, encode_hashed
+from nvd_kmodes import BLOCK_SIZE, check_random_state, choose, cluster_counts, distances, init_centroids, modes
+
+# numeric features, in column order
+NUMERIC_COLUMNS = ['Days_To_Modify', 'Log_Vendor_Frequency']
+
+# high cardinality categorical fields and how they are encoded
+CATEGORY_COLUMNS = ['Vendor', 'Product']
+CATEGORY_ENCODING = 'capped'   # 'capped' or 'hashed'
+MAX_CATEGORIES = 64            # labels per field, including OTHER
+
+
+def mixed_features(df, encoding=CATEGORY_ENCODING, max_categories=MAX_CATEGORIES):
+
+    # categorical codes (CVSS fields then CATEGORY_COLUMNS), numeric features (NUMERIC_COLUMNS) and the codebook
+    # of the codes
+    codes, codebook = encode_cvss(df)
+    columns = [codes]
+    for col in CATEGORY_COLUMNS:
+        if encoding == 'capped':
+            col_codes, labels = encode_capped(df[col], max_categories)
+        elif encoding == 'hashed':
+            col_codes, labels = encode_hashed(df[col], max_categories)
+        else:
+            raise ValueError("Unknown category encoding: " + encoding)
+        columns.append(col_codes[:, None])
+        codebook[col] = labels
+
+    days = (df['Date_Modified'] - df['Date_Published']).dt.total_seconds() / 86400.0
+    vendors = pd.Series(df['Vendor'], dtype=object)
+    vendor_frequency = vendors.map(vendors.value_counts()).fillna(0).to_numpy(dtype=np.float64)
+    numeric = np.column_stack([days.fillna(0).to_numpy(dtype=np.float64), np.log1p(vendor_frequency)])
+    return np.hstack(columns), numeric, codebook
+
+
+def scale_numeric(numeric):
+
+    # standardized numeric features, and the mean and standard deviation to scale the cluster means back
+    mean = numeric.mean(axis=0)
+    std = numeric.std(axis=0)
+    std[std == 0] = 1.0
+    return (numeric - mean) / std, mean, std
+
+
+def decode_numeric(means, mean, std, columns=NUMERIC_COLUMNS):
+
+    # cluster means back in their original units, as a DataFrame
+    return pd.DataFrame(np.atleast_2d(means) * std + mean, columns=columns)
+
+
+def assign_mixed(codes, numeric, centroids, means, levels, gamma, block_size=BLOCK_SIZE):
+
+    # nearest prototype for every record and the total cost, computed block by block
+    labels = np.empty(codes.shape[0], dtype=np.intp)
+    cost = 0.0
+    for start in range(0, codes.shape[0], block_size):
+        block = slice(start, start + block_size)
+        dist = ((numeric[block, None, :] - means[None, :, :]) ** 2).sum(axis=2) + \
+            gamma * distances(codes[block], centroids, levels)
+        block_labels = np.argmin(dist, axis=1)
+        labels[block] = block_labels
+        cost += float(dist[np.arange(len(block_labels)), block_labels].sum())
+    return labels, cost
+
+
+def cluster_means(numeric, labels, n_clusters):
+
+    # mean of the numeric features of every cluster, one bincount per feature
+    sizes = np.bincount(labels, minlength=n_clusters)
+    sums = np.stack([np.bincount(labels, weights=numeric[:, j], minlength=n_clusters)
+                     for j in range(numeric.shape[1])], axis=1)
+    return sums / np.maximum(sizes, 1)[:, None], sizes
+
+
+def init_means(numeric, n_clusters, random_state):
+
+    # numeric part of the initial prototypes, drawn around the mean as the kmodes package does
+    return numeric.mean(axis=0) + random_state.randn(n_clusters, numeric.shape[1]) * numeric.std(axis=0)
+
+
+def k_prototypes_single(codes, numeric, n_clusters, max_iter, init, levels, gamma, random_state, verbose=0,
+                        init_no=0, block_size=BLOCK_SIZE, callback=None):
+
+    # one k-prototypes run, returns modes, means, labels, cost, number of iterations and the cost of every epoch
+    # callback (optional) is called as callback(init_no, iteration, moves, cost) after every iteration
+    random_state = check_random_state(random_state)
+    centroids = init_centroids(codes, n_clusters, init, levels, random_state)
+    means = init_means(numeric, n_clusters, random_state)
+
+    labels, cost = assign_mixed(codes, numeric, centroids, means, levels, gamma, block_size)
+    epoch_costs = [cost]
+    itr = 0
+    converged = False
+    while itr < max_iter and not converged:
+        itr += 1
+        means, sizes = cluster_means(numeric, labels, n_clusters)
+        centroids = modes(cluster_counts(codes, labels, n_clusters, levels))
+
+        # in case of an empty cluster, reinitialize with a random record from the largest cluster
+        for ik in np.flatnonzero(sizes == 0):
+            rindx = choose(random_state, np.flatnonzero(labels == sizes.argmax()))
+            centroids[ik] = codes[rindx]
+            means[ik] = numeric[rindx]
+            sizes[labels[rindx]] -= 1
+            sizes[ik] += 1
+            labels[rindx] = ik
+
+        new_labels, ncost = assign_mixed(codes, numeric, centroids, means, levels, gamma, block_size)
+        moves = int(np.count_nonzero(new_labels != labels))
+        converged = (moves == 0) or (ncost >= cost)
+        epoch_costs.append(ncost)
+        labels, cost = new_labels, ncost
+        if verbose:
+            print("Run %d, iteration: %d/%d, moves: %d, cost: %s" % (init_no + 1, itr, max_iter, moves, cost))
+        if callback is not None:
+            callback(init_no, itr, moves, cost)
+
+    return centroids, means, labels, cost, itr, epoch_costs
+
+
+class KPrototypes:
+
+    # k-prototypes clustering of a uint8 code matrix and a numeric matrix with one row per record
+    # attributes: cluster_centroids_ (modes of the codes), cluster_means_ (means of the numeric features), labels_,
+    # cost_, n_iter_, epoch_costs_, gamma_
+
+    def __init__(self, n_clusters=8, max_iter=100, init='Cao', n_init=10, gamma=None, verbose=0, random_state=None,
+                 block_size=BLOCK_SIZE, callback=None):
+        self.n_clusters = n_clusters
+        self.max_iter = max_iter
+        self.init = init
+        self.n_init = n_init
+        self.gamma = gamma
+        self.verbose = verbose
+        self.random_state = random_state
+        self.block_size = block_size
+        self.callback = callback
+
+    def fit(self, codes, numeric, levels=None):
+
+        # levels is the number of labels of every code column, taken from the data if not given
+        codes = np.asarray(codes, dtype=np.uint8)
+        numeric = np.asarray(numeric, dtype=np.float64).reshape(codes.shape[0], -1)
+        self.levels_ = np.asarray(levels) if levels is not None else codes.max(axis=0).astype(np.intp) + 1
+        self.gamma_ = self.gamma if self.gamma is not None else 0.5 * float(np.mean(numeric.std(axis=0)))
+        assert self.n_clusters <= codes.shape[0], \
+            "Cannot have more clusters (%d) than data points (%d)." % (self.n_clusters, codes.shape[0])
+
+        random_state = check_random_state(self.random_state)
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=self.n_init)
+        results = [k_prototypes_single(codes, numeric, self.n_clusters, self.max_iter, self.init, self.levels_,
+                                       self.gamma_, seeds[init_no], self.verbose, init_no, self.block_size,
+                                       self.callback)
+                   for init_no in range(self.n_init)]
+
+        best = int(np.argmin([result[3] for result in results]))
+        self.cluster_centroids_, self.cluster_means_, self.labels_, self.cost_, self.n_iter_, self.epoch_costs_ = \
+            results[best]
+        return self
+
+    def fit_predict(self, codes, numeric, levels=None):
+        return self.fit(codes, numeric, levels).labels_
+
+    def predict(self, codes, numeric):
+        assert hasattr(self, 'cluster_centroids_'), "Model not yet fitted."
+        codes = np.asarray(codes, dtype=np.uint8)
+        numeric = np.asarray(numeric, dtype=np.float64).reshape(codes.shape[0], -1)
+        return assign_mixed(codes, numeric, self.cluster_centroids_, self.cluster_means_, self.levels_, self.gamma_,
+                            self.block_size)[0]
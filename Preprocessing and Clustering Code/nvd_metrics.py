@@ -0,0 +1,183 @@
+#
+# DESCRIPTION:
+# This module (nvd_metrics.py) computes cluster quality metrics for the hyperparameter sweep of
+# nvd_clustering_hyperparameter_validation.py, since the k-modes cost always goes down as the number of clusters grows.
+#
+#   Silhouette        mean silhouette under Hamming distance, -1 (wrong clusters) ... 1 (compact, well separated)
+#   Davies_Bouldin    mean over the clusters of the largest (scatter_i + scatter_j) / distance(mode_i, mode_j), where
+#                     the scatter is the mean Hamming distance of the members to their mode; lower is better
+#   Stability         mean adjusted Rand index between the labels of single runs with different seeds, 1 means every
+#                     restart finds the same clusters
+#
+# Pairwise metrics are O(n^2), so they are computed on the distinct CVSS vectors weighted by their multiplicity (a few
+# hundred vectors whatever the number of records), which gives the same values as on every record.  The Hamming
+# distance matrix of the distinct vectors is computed once, block by block, and the grid points are evaluated on a
+# pool of worker processes.
+#
+# How to use this module
+#   from nvd_metrics import evaluate_sweep
+#   metrics = evaluate_sweep(codes, levels, results, workers=8)    # results of nvd_sweep.run_sweep
+#   metrics[0]['Silhouette'], metrics[0]['Davies_Bouldin'], metrics[0]['Stability']
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from nvd_encoding import deduplicate
+from nvd_kmodes import KModes, BLOCK_SIZE, distances
+
+# metric names, in the order of the results table columns
+METRICS = ['Silhouette', 'Davies_Bouldin', 'Stability']
+
+# direction of every metric (and of the cost), used to pick the best grid point
+HIGHER_IS_BETTER = {'Cost': False, 'Silhouette': True, 'Davies_Bouldin': False, 'Stability': True}
+
+# number of single runs compared for the stability
+DEFAULT_RESTARTS = 5
+
+# number of worker processes, None uses one per cpu
+DEFAULT_WORKERS = None
+
+# distinct vectors, weights and distance matrix shared with the worker processes
+_shared = dict()
+
+
+def hamming_matrix(codes, levels, block_size=BLOCK_SIZE):
+
+    # Hamming distance between every pair of rows of codes, block by block
+    dist = np.empty((codes.shape[0], codes.shape[0]), dtype=np.float32)
+    for start in range(0, codes.shape[0], block_size):
+        dist[start:start + block_size] = distances(codes[start:start + block_size], codes, levels)
+    return dist
+
+
+def silhouette(dist, labels, weights, block_size=BLOCK_SIZE):
+
+    # weighted mean silhouette, every row stands for weights[i] identical records
+    # a row's own copies are at distance 0, so the mean distance within its cluster divides by the cluster size - 1
+    n_clusters = int(labels.max()) + 1
+    if n_clusters < 2:
+        return np.nan
+    membership = np.zeros((len(labels), n_clusters))
+    membership[np.arange(len(labels)), labels] = weights
+    sizes = membership.sum(axis=0)
+
+    scores = np.zeros(len(labels))
+    for start in range(0, len(labels), block_size):
+        block = slice(start, start + block_size)
+        sums = dist[block] @ membership
+        own = labels[block]
+        rows = np.arange(sums.shape[0])
+        others = np.where(sizes > 0, sums / np.maximum(sizes, 1), np.inf)
+        others[rows, own] = np.inf
+        b = others.min(axis=1)
+        a = sums[rows, own] / np.maximum(sizes[own] - 1, 1)
+        score = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+        # a record alone in its cluster scores 0
+        scores[block] = np.where(sizes[own] > 1, score, 0.0)
+    return float(np.sum(scores * weights) / np.sum(weights))
+
+
+def davies_bouldin(codes, centroids, labels, weights, levels):
+
+    # categorical Davies-Bouldin index, clusters without records and pairs of identical modes are left out
+    n_clusters = centroids.shape[0]
+    to_mode = distances(codes, centroids, levels)[np.arange(len(labels)), labels]
+    sizes = np.bincount(labels, weights=weights, minlength=n_clusters)
+    used = np.flatnonzero(sizes > 0)
+    if len(used) < 2:
+        return np.nan
+    scatter = np.bincount(labels, weights=weights * to_mode, minlength=n_clusters)[used] / sizes[used]
+    separation = distances(centroids[used], centroids[used], levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (scatter[:, None] + scatter[None, :]) / separation
+    ratio[(separation == 0) | np.eye(len(used), dtype=bool)] = np.nan
+    worst = np.nanmax(np.where(np.isnan(ratio), -np.inf, ratio), axis=1)
+    return float(np.mean(worst[np.isfinite(worst)])) if np.isfinite(worst).any() else np.nan
+
+
+def comb2(x):
+    return x * (x - 1) / 2.0
+
+
+def adjusted_rand(labels_a, labels_b, weights):
+
+    # adjusted Rand index of two labelings of weighted rows
+    table = np.zeros((int(labels_a.max()) + 1, int(labels_b.max()) + 1))
+    np.add.at(table, (labels_a, labels_b), weights)
+    index = comb2(table).sum()
+    rows = comb2(table.sum(axis=1)).sum()
+    cols = comb2(table.sum(axis=0)).sum()
+    expected = rows * cols / comb2(np.sum(weights))
+    maximum = (rows + cols) / 2.0
+    if maximum == expected:
+        return 1.0
+    return float((index - expected) / (maximum - expected))
+
+
+def stability(codes, levels, weights, init, n_clusters, seed, restarts=DEFAULT_RESTARTS, max_iter=100):
+
+    # mean adjusted Rand index between single runs with seeds derived from seed
+    if init == 'Cao':
+        # deterministic initialization, every restart gives the same clusters
+        return 1.0
+    base = 0 if seed is None else seed
+    runs = [KModes(n_clusters=n_clusters, init=init, n_init=1, max_iter=max_iter, deduplicate=True,
+                   random_state=base * restarts + r).fit(codes, levels, weights).labels_
+            for r in range(restarts)]
+    scores = [adjusted_rand(runs[i], runs[j], weights) for i in range(restarts) for j in range(i + 1, restarts)]
+    return float(np.mean(scores)) if scores else np.nan
+
+
+def _open_shared(codes, levels, weights, dist, restarts, max_iter):
+
+    # worker initializer, also used for serial runs
+    _shared.update(codes=codes, levels=levels, weights=weights, dist=dist, restarts=restarts, max_iter=max_iter)
+
+
+def evaluate_point(point):
+
+    # metrics of one fitted grid point, labels given for the distinct vectors
+    init, n_clusters, seed, centroids, labels = point
+    codes, levels, weights = _shared['codes'], _shared['levels'], _shared['weights']
+    return dict([
+        ('Silhouette', silhouette(_shared['dist'], labels, weights)),
+        ('Davies_Bouldin', davies_bouldin(codes, centroids, labels, weights, levels)),
+        ('Stability', stability(codes, levels, weights, init, n_clusters, seed, _shared['restarts'],
+                                _shared['max_iter'])),
+    ])
+
+
+def evaluate_sweep(codes, levels, results, restarts=DEFAULT_RESTARTS, max_iter=100, workers=DEFAULT_WORKERS,
+                   weights=None, inverse=None):
+
+    # metrics of every fit of a sweep, results as returned by nvd_sweep.run_sweep (labels of every record)
+    # weights and inverse are given when codes are already the distinct vectors (e.g. of nvd_encoded_data.py)
+    levels = np.asarray(levels)
+    if inverse is None:
+        unique, weights, inverse = deduplicate(np.ascontiguousarray(codes, dtype=np.uint8), levels)
+    else:
+        unique, weights = np.ascontiguousarray(codes, dtype=np.uint8), np.asarray(weights, dtype=np.float64)
+    dist = hamming_matrix(unique, levels)
+
+    points = []
+    for init, n_clusters, seed, cost, centroids, labels, n_iter in results:
+        # equal vectors always have the same label, take it for the distinct vectors
+        unique_labels = np.empty(unique.shape[0], dtype=np.intp)
+        unique_labels[inverse] = labels
+        points.append((init, n_clusters, seed, np.asarray(centroids, dtype=np.uint8), unique_labels))
+
+    if workers == 1:
+        _open_shared(unique, levels, weights, dist, restarts, max_iter)
+        return [evaluate_point(point) for point in points]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_shared,
+                             initargs=(unique, levels, weights, dist, restarts, max_iter)) as executor:
+        return list(executor.map(evaluate_point, points))
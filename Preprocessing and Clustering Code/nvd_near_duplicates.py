@@ -0,0 +1,223 @@
+#
+# DESCRIPTION:
+# This module (nvd_near_duplicates.py) groups CVE records with near identical descriptions, e.g. a vendor advisory
+# reused for a dozen CVE IDs (see FINAL_ANNOTATION_DATA_FILES/sample_7A.csv), so the annotation samples hold one
+# representative per group instead of a dozen copies of the same text.
+#
+# MinHash / LSH (locality sensitive hashing):
+# - every description is reduced to its set of word SHINGLE_SIZE-grams, and the set to a MinHash signature of
+#   NUM_PERM values; the fraction of equal values of two signatures estimates the Jaccard similarity of the two sets
+# - the signature is cut into BANDS bands, and records with an equal band land in the same bucket; only records that
+#   share a bucket are compared, so grouping takes roughly linear time
+# - a pair is a near duplicate when its estimated similarity is at least THRESHOLD, and the groups are the connected
+#   components of the near duplicate pairs; the group of a record is named by the smallest CVD_ID in it
+# - a description without words (empty, or only stop words) has no shingles; its record is not put in any bucket and
+#   stays a group of its own, so records without a description are never taken for copies of each other
+#
+# The index is kept in an SQLite file (signatures, buckets and group of every record), so records of new feeds are
+# inserted incrementally: they are only compared with the records sharing a bucket, and groups they connect are merged.
+# A record already in the index is not inserted again.
+#
+# How to use this module
+#   from nvd_near_duplicates import open_index, add_records, load_groups
+#   index = open_index("Data/near_duplicates.sqlite")
+#   add_records(index, ids, descriptions)
+#   groups = load_groups(index, ids)          # group (CVD_ID of its representative) of every id
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import sqlite3
+import zlib
+
+import numpy as np
+
+from nvd_text_features import tokenize
+
+DEFAULT_INDEX_FILE_NAME = "Data/near_duplicates.sqlite"
+
+# MinHash and LSH parameters, BANDS * ROWS = NUM_PERM
+NUM_PERM = 128
+BANDS = 16
+ROWS = 8
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8
+
+# Mersenne prime of the MinHash permutations (a * x + b) mod PRIME
+PRIME = (1 << 31) - 1
+
+# signature value of a description without shingles, the permuted values of a shingle are always below PRIME
+EMPTY = PRIME
+
+# seed of the permutations, the same for every run so stored signatures stay comparable
+PERMUTATION_SEED = 2018
+
+
+def permutations(num_perm=NUM_PERM, seed=PERMUTATION_SEED):
+
+    # coefficients of the MinHash permutations, and odd 64 bit multipliers hashing the ROWS values of a band
+    random_state = np.random.RandomState(seed)
+    return (random_state.randint(1, PRIME, size=num_perm).astype(np.uint64),
+            random_state.randint(0, PRIME, size=num_perm).astype(np.uint64),
+            random_state.randint(0, 1 << 62, size=ROWS).astype(np.uint64) * np.uint64(2) + np.uint64(1))
+
+
+PERM_A, PERM_B, BAND_MULTIPLIERS = permutations()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+
+    # crc32 of the word size-grams of a description (the words themselves for short descriptions), none without words
+    words = tokenize(text or "")
+    grams = [" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))] if words else []
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in set(grams)), dtype=np.uint64)
+
+
+def signature(text):
+
+    # MinHash signature of a description, every value EMPTY when it has no shingles
+    values = shingles(text) % PRIME
+    if len(values) == 0:
+        return np.full(NUM_PERM, EMPTY, dtype=np.uint32)
+    return ((values[:, None] * PERM_A[None, :] + PERM_B[None, :]) % PRIME).min(axis=0).astype(np.uint32)
+
+
+def band_keys(signatures):
+
+    # one 63 bit bucket key per band of every signature (records x BANDS), multiply-add hashing modulo 2^64
+    bands = signatures.astype(np.uint64).reshape(signatures.shape[0], BANDS, ROWS)
+    return ((bands * BAND_MULTIPLIERS).sum(axis=2, dtype=np.uint64) >> np.uint64(1)).astype(np.int64)
+
+
+def similarity(sig_a, sig_b):
+
+    # estimated Jaccard similarity of the shingle sets behind two signatures
+    return float(np.mean(sig_a == sig_b))
+
+
+def open_index(path=DEFAULT_INDEX_FILE_NAME):
+
+    # open (and create when needed) a near duplicate index
+    index = sqlite3.connect(path)
+    index.execute("CREATE TABLE IF NOT EXISTS signatures "
+                  "(CVD_ID TEXT PRIMARY KEY, group_id TEXT NOT NULL, signature BLOB NOT NULL) WITHOUT ROWID")
+    index.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, CVD_ID TEXT)")
+    index.execute("CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, bucket)")
+    index.execute("CREATE INDEX IF NOT EXISTS signatures_group ON signatures (group_id)")
+    index.commit()
+    return index
+
+
+class UnionFind:
+
+    # connected components of the near duplicate pairs, every component is named by its smallest id
+
+    def __init__(self):
+        self.parent = dict()
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x != y:
+            self.parent[max(x, y)] = min(x, y)
+
+
+def add_records(index, ids, descriptions):
+
+    # insert new records into the index and merge their groups, returns the number of records inserted
+    known = set(row[0] for row in index.execute("SELECT CVD_ID FROM signatures"))
+    new = [(id, description) for id, description in dict(zip(ids, descriptions)).items() if id not in known]
+    if not new:
+        return 0
+    new_ids = [id for id, description in new]
+    sigs = np.stack([signature(description) for id, description in new])
+    keys = band_keys(sigs)
+    # records without shingles get no buckets, they are never compared and stay groups of their own
+    banded = np.flatnonzero(~(sigs == EMPTY).all(axis=1))
+
+    with index:
+        index.execute("CREATE TEMP TABLE new_buckets (band INTEGER, bucket INTEGER, row INTEGER)")
+        index.executemany("INSERT INTO new_buckets VALUES (?, ?, ?)",
+                          ((band, int(keys[row, band]), int(row)) for row in banded for band in range(BANDS)))
+
+        # candidates among the indexed records, compared with their stored signatures
+        links = UnionFind()
+        candidates = index.execute(
+            "SELECT DISTINCT n.row, s.CVD_ID, s.group_id, s.signature FROM new_buckets n "
+            "JOIN buckets b ON b.band = n.band AND b.bucket = n.bucket "
+            "JOIN signatures s ON s.CVD_ID = b.CVD_ID").fetchall()
+        for row, id, group_id, stored in candidates:
+            if similarity(sigs[row], np.frombuffer(stored, dtype=np.uint32)) >= THRESHOLD:
+                links.union(new_ids[row], group_id)
+
+        # candidates among the new records, every record of a bucket is compared with the members of every other
+        # group in the bucket until one is similar, so a bucket of copies of one text takes linear time
+        for band in range(BANDS):
+            order = banded[np.argsort(keys[banded, band], kind='stable')]
+            bucket_keys = keys[order, band]
+            starts = np.flatnonzero(np.r_[True, bucket_keys[1:] != bucket_keys[:-1]])
+            ends = np.r_[starts[1:], len(order)]
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                groups = dict()
+                for member in order[start:end]:
+                    for root, members in list(groups.items()):
+                        if links.find(new_ids[member]) == root:
+                            continue
+                        if any(similarity(sigs[member], sigs[other]) >= THRESHOLD for other in members):
+                            links.union(new_ids[member], root)
+                    merged = dict()
+                    for root, members in groups.items():
+                        merged.setdefault(links.find(root), []).extend(members)
+                    merged.setdefault(links.find(new_ids[member]), []).append(member)
+                    groups = merged
+
+        # groups merged through a new record take the name of the merged group
+        old_groups = set(group_id for row, id, group_id, stored in candidates)
+        for group_id in old_groups:
+            root = links.find(group_id)
+            if root != group_id:
+                index.execute("UPDATE signatures SET group_id = ? WHERE group_id = ?", (root, group_id))
+
+        index.executemany("INSERT INTO signatures VALUES (?, ?, ?)",
+                          ((id, links.find(id), sigs[row].tobytes()) for row, id in enumerate(new_ids)))
+        index.executemany("INSERT INTO buckets VALUES (?, ?, ?)",
+                          ((band, int(keys[row, band]), new_ids[row]) for row in banded for band in range(BANDS)))
+        index.execute("DROP TABLE new_buckets")
+    return len(new)
+
+
+def load_groups(index, ids=None):
+
+    # group of every id (the CVD_ID of the group representative), every indexed record when ids is not given
+    groups = dict(index.execute("SELECT CVD_ID, group_id FROM signatures"))
+    if ids is None:
+        return groups
+    return [groups.get(id, id) for id in ids]
+
+
+def representatives(index, ids, descriptions):
+
+    # insert the records and flag the one representative of every group among ids (the first id of each group)
+    add_records(index, ids, descriptions)
+    seen = set()
+    flags = np.zeros(len(ids), dtype=bool)
+    for i, group_id in enumerate(load_groups(index, ids)):
+        if group_id not in seen:
+            seen.add(group_id)
+            flags[i] = True
+    return flags
@@ -0,0 +1,139 @@
+#
+# DESCRIPTION:
+# This module (nvd_record_store.py) keeps a persistent local copy of the extracted national threat database records in
+# an SQLite file, keyed by CVD_ID.
+#
+# Instead of rebuilding cluster_data.csv from every feed on each run, the records of a new run (typically the small NVD
+# "modified" feed) are applied to the store.  A record is only written when its ID is new or its Date_Modified
+# (lastModifiedDate) is newer than the stored one.  The counts of inserted, updated and unchanged records are reported.
+#
+# The store holds every record extracted by nvd_extraction.py, including the records without base metric 3 data, so
+# both the annotation data and the cluster data can be produced from it.
+#
+# How to use this module
+#   python nvd_cluster_data_parser.py "Data/nvdcve-1.0-modified.json.gz"  cluster_data.csv  "Data/nvd_records.sqlite"
+#
+#   from nvd_record_store import open_store, apply_records, load_cluster_frame
+#   store = open_store("Data/nvd_records.sqlite")
+#   print(apply_records(store, records))     # {'Inserted': 12, 'Updated': 240, 'Unchanged': 31}
+#   df = load_cluster_frame(store)
+#   for chunk in iter_cluster_chunks(store, 10000): ...    # without loading every record at once
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import sqlite3
+
+import pandas as pd
+
+from nvd_extraction import RECORD_COLUMNS, CLUSTER_COLUMNS, merge_records
+
+DEFAULT_STORE_FILE_NAME = "Data/nvd_records.sqlite"
+
+TABLE_NAME = "records"
+
+# number of records per chunk when the cluster data is read in chunks
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def open_store(path=DEFAULT_STORE_FILE_NAME):
+
+    # open (and create when needed) the record store
+    store = sqlite3.connect(path)
+    columns = ", ".join(name + " TEXT" for name in RECORD_COLUMNS[1:])
+    store.execute("CREATE TABLE IF NOT EXISTS " + TABLE_NAME +
+                  " (CVD_ID TEXT PRIMARY KEY, " + columns + ") WITHOUT ROWID")
+    store.commit()
+    return store
+
+
+def apply_records(store, records):
+
+    # apply new or changed records to the store, returns the number of inserted, updated and unchanged records
+    # records with an ID that is already stored are only written when their Date_Modified is newer
+    records = merge_records([records])
+    columns = ", ".join(RECORD_COLUMNS)
+    placeholders = ", ".join("?" * len(RECORD_COLUMNS))
+    assignments = ", ".join(name + " = excluded." + name for name in RECORD_COLUMNS[1:])
+
+    with store:
+        store.execute("CREATE TEMP TABLE incoming AS SELECT * FROM " + TABLE_NAME + " WHERE 0")
+        store.executemany("INSERT INTO incoming (" + columns + ") VALUES (" + placeholders + ")", records)
+
+        inserted, updated = store.execute(
+            "SELECT SUM(r.CVD_ID IS NULL), SUM(r.CVD_ID IS NOT NULL AND i.Date_Modified > r.Date_Modified) "
+            "FROM incoming i LEFT JOIN " + TABLE_NAME + " r ON r.CVD_ID = i.CVD_ID").fetchone()
+
+        store.execute("INSERT INTO " + TABLE_NAME + " (" + columns + ") SELECT " + columns + " FROM incoming WHERE 1 "
+                      "ON CONFLICT (CVD_ID) DO UPDATE SET " + assignments +
+                      " WHERE excluded.Date_Modified > " + TABLE_NAME + ".Date_Modified")
+        store.execute("DROP TABLE incoming")
+
+    inserted = inserted or 0
+    updated = updated or 0
+    return dict([
+        ('Inserted', inserted),
+        ('Updated', updated),
+        ('Unchanged', len(records) - inserted - updated)
+    ])
+
+
+def load_records(store):
+
+    # every stored record, in RECORD_COLUMNS order
+    return [list(row) for row in store.execute("SELECT " + ", ".join(RECORD_COLUMNS) + " FROM " + TABLE_NAME)]
+
+
+def load_cluster_frame(store):
+
+    # stored records with base metric 3 data, in the cluster data column layout
+    return pd.read_sql_query("SELECT " + ", ".join(CLUSTER_COLUMNS) + " FROM " + TABLE_NAME +
+                             " WHERE Attack_Vector IS NOT NULL ORDER BY CVD_ID", store)
+
+
+def cluster_filter(modified_after=None, published_after=None, published_until=None):
+
+    # WHERE clause and parameters selecting the stored records with base metric 3 data, with the optional NVD date
+    # texts only the records with a newer Date_Modified, a newer Date_Published or a Date_Published not after it
+    query = " WHERE Attack_Vector IS NOT NULL"
+    params = []
+    for column, operator, value in (('Date_Modified', '>', modified_after), ('Date_Published', '>', published_after),
+                                    ('Date_Published', '<=', published_until)):
+        if value:
+            query += " AND " + column + " " + operator + " ?"
+            params.append(value)
+    return query, tuple(params)
+
+
+def count_cluster_records(store, modified_after=None, published_after=None, published_until=None):
+
+    # number of stored records with base metric 3 data selected as in cluster_filter()
+    query, params = cluster_filter(modified_after, published_after, published_until)
+    return store.execute("SELECT COUNT(*) FROM " + TABLE_NAME + query, params).fetchone()[0]
+
+
+def iter_cluster_chunks(store, chunk_size=DEFAULT_CHUNK_SIZE, modified_after=None, published_after=None):
+
+    # stored records with base metric 3 data as DataFrames of at most chunk_size records, in the cluster data layout
+    # with modified_after (NVD date text) only the records with a newer Date_Modified, e.g. the ones ingested since
+    # the last clustering run, with published_after only the records published since
+    query, params = cluster_filter(modified_after, published_after)
+    query = "SELECT " + ", ".join(CLUSTER_COLUMNS) + " FROM " + TABLE_NAME + query
+    for chunk in pd.read_sql_query(query + " ORDER BY CVD_ID", store, params=params, chunksize=chunk_size):
+        # an empty result comes back as one empty chunk
+        if len(chunk) > 0:
+            yield chunk
+
+
+def iter_description_chunks(store, chunk_size=DEFAULT_CHUNK_SIZE):
+
+    # CVD_ID and Description of every stored record as DataFrames of at most chunk_size records
+    query = "SELECT CVD_ID, Description FROM " + TABLE_NAME + " ORDER BY CVD_ID"
+    for chunk in pd.read_sql_query(query, store, chunksize=chunk_size):
+        if len(chunk) > 0:
+            yield chunk
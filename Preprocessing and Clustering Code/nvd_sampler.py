@@ -0,0 +1,94 @@
+#
+# DESCRIPTION:
+# This module (nvd_sampler.py) splits a table into disjoint random batches, e.g. the 50 record annotation samples
+# written by nvd_annotation_data_parser.py.
+#
+# The records are put in one seeded random order, and batch i is the records at positions
+# i * batch_size ... (i + 1) * batch_size - 1 of that order, the records after the last batch are the remainder.
+# The same seed always gives the same batches, and no record is in two batches.
+#
+# With strata (e.g. the vendor or the cluster of every record) the order is stratified: every stratum is shuffled and
+# its records are spread evenly over the order, so every batch holds the strata in about their overall proportions.
+#
+# Batches are written one after the other, each file only touches the rows it holds, so the time to split a table
+# grows with the size of the output and not with the number of batches times the size of the table.
+#
+# How to use this module
+#   from nvd_sampler import sample_order, iter_batches, write_batches
+#   order = sample_order(len(df), seed=0, strata=df['Vendor'])
+#   for batch in iter_batches(order, 50, 6): ...
+#   write_batches(df, order, 50, 6, "Data/50_sample_{}.csv", "Data/remainder_sample_{}.csv")
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 0
+
+# rows written at a time for the remainder
+REMAINDER_CHUNK_SIZE = 100000
+
+
+def sample_order(n_records, seed=DEFAULT_SEED, strata=None):
+
+    # one random order of the records 0 ... n_records - 1, stratified when strata (one value per record) is given
+    random_state = np.random.RandomState(seed)
+    order = random_state.permutation(n_records)
+    if strata is None:
+        return order
+
+    # position of every record within its stratum, in the random order, scaled to 0 ... 1 with a random offset
+    # so the records of every stratum are spread evenly over the order
+    codes = pd.factorize(pd.Series(strata).iloc[order], use_na_sentinel=False)[0]
+    sizes = np.bincount(codes)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    by_stratum = np.argsort(codes, kind='stable')
+    rank = np.empty(n_records)
+    rank[by_stratum] = np.arange(n_records) - starts[codes[by_stratum]]
+    offset = random_state.random_sample(len(sizes))
+    position = (rank + offset[codes]) / sizes[codes]
+    return order[np.argsort(position, kind='stable')]
+
+
+def iter_batches(order, batch_size, n_batches=None):
+
+    # record indices of every batch, as many full batches as the records allow when n_batches is not given
+    available = len(order) // batch_size
+    n_batches = available if n_batches is None else min(n_batches, available)
+    for batch_no in range(n_batches):
+        yield order[batch_no * batch_size:(batch_no + 1) * batch_size]
+
+
+def remainder(order, batch_size, n_batches=None):
+
+    # record indices not in any batch, in their original order
+    available = len(order) // batch_size
+    n_batches = available if n_batches is None else min(n_batches, available)
+    return np.sort(order[n_batches * batch_size:])
+
+
+def write_batches(df, order, batch_size, n_batches, batch_file, remainder_file=None, header=False):
+
+    # write every batch to batch_file.format(batch number, from 1), and the remaining records to
+    # remainder_file.format(n_batches + 1), returns the number of batches written
+    written = 0
+    for batch_no, batch in enumerate(iter_batches(order, batch_size, n_batches), start=1):
+        df.iloc[batch].to_csv(batch_file.format(batch_no), index=False, header=header)
+        written = batch_no
+
+    if remainder_file is not None:
+        rest = remainder(order, batch_size, n_batches)
+        with open(remainder_file.format(written + 1), "w", newline="") as f:
+            if len(rest) == 0 and header:
+                df.iloc[:0].to_csv(f, index=False, header=header)
+            for start in range(0, len(rest), REMAINDER_CHUNK_SIZE):
+                df.iloc[rest[start:start + REMAINDER_CHUNK_SIZE]].to_csv(f, index=False,
+                                                                          header=header and start == 0)
+    return written
@@ -0,0 +1,218 @@
+#
+# DESCRIPTION:
+# This module (nvd_sweep.py) runs the k-modes hyperparameter sweep of nvd_clustering_hyperparameter_validation.py
+# on a pool of worker processes.
+#
+# Every grid point (init method, number of clusters, seed) is one KModes fit (see nvd_kmodes.py) with its own
+# random_state, so the results do not depend on the number of workers or on the order in which the fits finish.
+# Results are always returned in grid order.
+#
+# The encoded data is written once to .npy files in a temporary directory and every worker opens them memory-mapped,
+# so the code matrix is shared through the operating system page cache instead of being pickled to every worker.
+# Arrays that are already memory-mapped .npy files, e.g. the arrays of an encoded dataset (nvd_encoded_data.py), are
+# opened by the workers from their own file and not written again.
+# When deduplicate is set the distinct vectors and their weights are computed once here, the workers only see the
+# distinct vectors, and the labels are expanded back to every record afterwards.  Data that is already deduplicated
+# is passed as the distinct vectors with their weights and inverse (e.g. dataset.unique, dataset.weights,
+# dataset.inverse) and is not deduplicated again.
+#
+# With a cache directory every finished fit is stored as soon as it completes (nvd_fit_cache.py) and grid points
+# already in the cache are not fitted again, so an interrupted sweep resumes and a larger grid only fits new points.
+#
+# warm_sweep() is the alternative elbow search: the values of k are fitted in increasing order, each one starting from
+# the centroids of the previous k plus new seeds chosen by the init method (nvd_kmodes.init_extend), and the sweep stops
+# once a step no longer reduces the cost by more than min_gain (a fraction of the cost of the smallest k) for patience
+# steps in a row.  The
+# last k before those steps is the chosen k.
+#
+# How to use this module
+#   from nvd_sweep import sweep_grid, run_sweep
+#   grid = sweep_grid(['Huang', 'Cao', 'random'], range(1, 236, 5), [0])
+#   results = run_sweep(codes, levels, grid, workers=8, cache="Data/sweep_cache")
+#   results = run_sweep(dataset.unique, dataset.levels, grid, weights=dataset.weights, inverse=dataset.inverse)
+#   for init, n_clusters, seed, cost, centroids, labels, n_iter in results: ...
+#   results, chosen = warm_sweep(codes, levels, range(1, 236, 5), init='Cao')
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from nvd_encoding import deduplicate
+from nvd_fit_cache import data_key, fit_key, load_fit, save_fit
+from nvd_kmodes import KModes, check_random_state, init_extend
+
+# number of worker processes, None uses one per cpu
+DEFAULT_WORKERS = None
+
+# warm sweep stopping rule, cost reduction per step relative to the cost of the smallest k, and the number of steps
+# in a row below it
+DEFAULT_MIN_GAIN = 0.01
+DEFAULT_PATIENCE = 2
+
+# data shared with the worker processes, opened memory-mapped by _open_shared_data
+_shared = dict()
+
+
+def sweep_grid(inits, cluster_range, seeds):
+
+    # every (init method, number of clusters, seed) combination, in the order the results are reported
+    return [(init, n_clusters, seed) for init in inits for n_clusters in cluster_range for seed in seeds]
+
+
+def _open_shared_data(codes_file, weights_file, levels, n_init, max_iter):
+
+    # worker initializer, open the shared arrays without copying them
+    _shared['codes'] = np.load(codes_file, mmap_mode='r')
+    _shared['weights'] = np.load(weights_file, mmap_mode='r') if weights_file is not None else None
+    _shared['levels'] = levels
+    _shared['n_init'] = n_init
+    _shared['max_iter'] = max_iter
+
+
+def _open_in_process(codes, weights, levels, n_init, max_iter):
+
+    # serial runs use the arrays directly
+    _shared['codes'] = codes
+    _shared['weights'] = weights
+    _shared['levels'] = levels
+    _shared['n_init'] = n_init
+    _shared['max_iter'] = max_iter
+
+
+def npy_file(array):
+
+    # the .npy file an array is memory-mapped from, None when it lives in memory or is only a part of the file
+    if isinstance(array, np.memmap) and array.filename and array.filename.endswith(".npy") and \
+            os.path.exists(array.filename) and array.flags.c_contiguous:
+        header = np.load(array.filename, mmap_mode='r')
+        if header.shape == array.shape and header.dtype == array.dtype:
+            return array.filename
+    return None
+
+
+def shared_file(directory, name, array):
+
+    # file the workers open an array from, the array is written to directory unless it is a .npy file already
+    path = npy_file(array)
+    if path is None:
+        path = os.path.join(directory, name + ".npy")
+        np.save(path, array)
+    return path
+
+
+def fit_grid_point(point):
+
+    # one KModes fit on the shared data
+    init, n_clusters, seed = point
+    weights = _shared['weights']
+    km = KModes(n_clusters=n_clusters, init=init, n_init=_shared['n_init'], max_iter=_shared['max_iter'],
+                random_state=seed, deduplicate=weights is not None)
+    km.fit(_shared['codes'], _shared['levels'], None if weights is None else np.asarray(weights))
+    return km.cost_, km.cluster_centroids_, km.labels_, km.n_iter_
+
+
+def run_sweep(codes, levels, grid, n_init=10, max_iter=100, deduplicate_rows=False, workers=DEFAULT_WORKERS,
+              cache=None, weights=None, inverse=None):
+
+    # fit every grid point, returns (init, n_clusters, seed, cost, centroids, labels, n_iter) in grid order
+    # cache is a cache directory (see nvd_fit_cache.py) or None
+    # weights and inverse are given when codes are already the distinct vectors, the labels are then expanded with
+    # inverse to every record
+    # memory-mapped uint8 arrays are kept as they are, so the workers open them from their own file
+    codes = codes if isinstance(codes, np.memmap) else np.ascontiguousarray(codes, dtype=np.uint8)
+    levels = np.asarray(levels)
+    if inverse is None:
+        weights = None
+        if deduplicate_rows:
+            codes, weights, inverse = deduplicate(codes, levels)
+
+    fits = [None] * len(grid)
+    keys = [None] * len(grid)
+    if cache is not None:
+        data = data_key(codes, levels, weights)
+        for i, (init, n_clusters, seed) in enumerate(grid):
+            keys[i] = fit_key(data, init, n_clusters, n_init, max_iter, seed)
+            fits[i] = load_fit(cache, keys[i])
+    pending = [i for i in range(len(grid)) if fits[i] is None]
+
+    def finished(i, fit):
+        fits[i] = fit
+        if cache is not None:
+            save_fit(cache, keys[i], grid[i], n_init, max_iter, fit)
+
+    if workers == 1 or not pending:
+        _open_in_process(codes, weights, levels, n_init, max_iter)
+        for i in pending:
+            finished(i, fit_grid_point(grid[i]))
+    else:
+        with tempfile.TemporaryDirectory(prefix="nvd_sweep_") as directory:
+            codes_file = shared_file(directory, "codes", codes)
+            weights_file = shared_file(directory, "weights", weights) if weights is not None else None
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_shared_data,
+                                     initargs=(codes_file, weights_file, levels, n_init, max_iter)) as executor:
+                futures = dict((executor.submit(fit_grid_point, grid[i]), i) for i in pending)
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+
+    results = []
+    for (init, n_clusters, seed), (cost, centroids, labels, n_iter) in zip(grid, fits):
+        if inverse is not None:
+            labels = labels[inverse]
+        results.append((init, n_clusters, seed, cost, centroids, labels, n_iter))
+    return results
+
+
+def warm_sweep(codes, levels, cluster_range, init='Cao', n_init=10, max_iter=100, min_gain=DEFAULT_MIN_GAIN,
+               patience=DEFAULT_PATIENCE, deduplicate_rows=True, seed=0):
+
+    # warm started elbow search over the increasing values of cluster_range
+    # returns the fitted points (init, n_clusters, seed, cost, centroids, labels, n_iter) and the chosen k
+    codes = np.ascontiguousarray(codes, dtype=np.uint8)
+    levels = np.asarray(levels)
+    inverse = None
+    weights = None
+    if deduplicate_rows:
+        codes, weights, inverse = deduplicate(codes, levels)
+    random_state = check_random_state(seed)
+
+    results = []
+    centroids = None
+    chosen = None
+    below = 0
+    for n_clusters in sorted(cluster_range):
+        if centroids is None:
+            km = KModes(n_clusters=n_clusters, init=init, n_init=n_init, max_iter=max_iter, random_state=seed)
+            km.fit(codes, levels, weights)
+        else:
+            # Cao seeds are deterministic, Huang and random seeds are drawn n_init times and the best run is kept
+            km = None
+            for init_no in range(1 if init == 'Cao' else n_init):
+                start = init_extend(codes, centroids, n_clusters - len(centroids), init, levels, random_state, weights)
+                run = KModes(n_clusters=n_clusters, init=start, max_iter=max_iter, random_state=seed)
+                run.fit(codes, levels, weights)
+                if km is None or run.cost_ < km.cost_:
+                    km = run
+        labels = km.labels_ if inverse is None else km.labels_[inverse]
+
+        if results:
+            # cost reduction of this step relative to the cost of the smallest k
+            gain = (results[-1][3] - km.cost_) / results[0][3] if results[0][3] > 0 else 0.0
+            below = below + 1 if gain < min_gain else 0
+        if below == 0:
+            chosen = n_clusters
+        results.append((init, n_clusters, seed, km.cost_, km.cluster_centroids_, labels, km.n_iter_))
+        centroids = km.cluster_centroids_
+        if below >= patience or km.cost_ == 0:
+            break
+
+    return results, chosen
@@ -0,0 +1,265 @@
+#
+# DESCRIPTION:
+# This Program  (nvd_text_features.py) turns the CVE descriptions into a sparse feature matrix, so descriptions can
+# be clustered, or combined with the seven base metric 3 codes, without building a dense matrix.
+#
+# The descriptions are read as a stream of chunks from the record store and every chunk is tokenized and counted in a
+# pool of worker processes, each worker returns a CSR (compressed sparse row) matrix and the chunks are stacked in
+# order.  Feeds are first streamed into a temporary record store, one feed at a time and CHUNK_SIZE records at a time
+# (the store keeps the newest version of a CVE found in several feeds), so the feeds are parsed once and never held in
+# memory as a whole; both passes of tfidf read the store.  Two kinds of features:
+#   hashing   every token is hashed (crc32) into one of N_FEATURES columns, one pass over the data, no vocabulary
+#   tfidf     the MAX_FEATURES tokens found in the most descriptions (and in at least MIN_DF of them) are the columns,
+#             a first pass counts the document frequencies, a second pass builds the matrix
+# Both are weighted by tf-idf (the idf is taken from the column document frequencies) and every row is scaled to
+# unit length.
+#
+# OUTPUT:  description_features.npz     the CSR matrix (scipy.sparse.save_npz), one row per CVE
+#          description_features.json    the CVD_ID of every row, the kind of features and the vocabulary (tfidf)
+#
+# combine_features() appends the one-hot CVSS codes (see nvd_encoding.py) to the description features.
+#
+# How to run this program (parameters are optional)
+#   python nvd_text_features.py  input  output.npz  hashing|tfidf
+#   python nvd_text_features.py  "Data/threats.json"  "Data/description_features.npz"  hashing
+#   python nvd_text_features.py  "Data/nvd_records.sqlite"  "Data/description_features.npz"  tfidf
+#
+# The input is a feed, a directory or glob of feeds (see nvd_extraction.py) or the record store (.sqlite, see
+# nvd_record_store.py).
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import json
+import os
+import re
+import sys
+import tempfile
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from nvd_extraction import extract_records, find_feeds
+from nvd_feed_reader import iter_cve_items
+from nvd_record_store import open_store, apply_records, iter_description_chunks
+
+DEFAULT_INPUT_FILE_NAME = "Data/threats.json"
+DEFAULT_OUTPUT_FILE_NAME = "Data/description_features.npz"
+DEFAULT_MODE = "hashing"
+
+STORE_EXTENSION = ".sqlite"
+
+# feature parameters
+N_FEATURES = 2 ** 18     # hashing, number of columns
+MAX_FEATURES = 50000     # tfidf, vocabulary cap
+MIN_DF = 2               # tfidf, a token must be found in at least this many descriptions
+CHUNK_SIZE = 5000        # descriptions per chunk
+DEFAULT_WORKERS = None   # worker processes, None uses one per cpu
+
+# lower case words and numbers, keeping names and versions such as cross-site, mod_ssl and 2.4.10 in one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9_.\-]*[a-z0-9])?")
+
+STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "via", "was", "when", "which", "with",
+])
+
+
+def tokenize(text):
+
+    # tokens of a description, stop words left out
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def hash_token(token, n_features):
+
+    # column of a token, crc32 gives the same column in every process and every run
+    return zlib.crc32(token.encode("utf-8")) % n_features
+
+
+def count_matrix(texts, column, n_features):
+
+    # CSR matrix of token counts, column(token) is the column of a token or None to leave it out
+    indptr = [0]
+    indices = []
+    for text in texts:
+        counts = Counter(col for col in (column(token) for token in tokenize(text or "")) if col is not None)
+        indices.extend(counts.items())
+        indptr.append(len(indices))
+    cols = np.fromiter((col for col, count in indices), dtype=np.int32, count=len(indices))
+    data = np.fromiter((count for col, count in indices), dtype=np.float32, count=len(indices))
+    return sp.csr_matrix((data, cols, np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, n_features))
+
+
+def _hashing_chunk(args):
+    texts, n_features = args
+    return count_matrix(texts, lambda token: hash_token(token, n_features), n_features)
+
+
+def _document_frequency_chunk(texts):
+    return Counter(token for text in texts for token in set(tokenize(text or "")))
+
+
+def _vocabulary_chunk(args):
+    texts, vocabulary = args
+    return count_matrix(texts, vocabulary.get, len(vocabulary))
+
+
+def map_chunks(function, chunks, workers=DEFAULT_WORKERS):
+
+    # function of every chunk in chunk order, on a pool of worker processes
+    # only a few chunks per worker are in flight, so the input is read as a stream
+    if workers == 1:
+        for chunk in chunks:
+            yield function(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window = 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def tfidf_weight(counts):
+
+    # tf-idf weighting with smoothed idf, rows scaled to unit length
+    n_docs = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+    weighted = counts.multiply(idf[None, :]).tocsr()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(weighted).tocsr().astype(np.float32), idf
+
+
+def hashing_features(chunks, n_features=N_FEATURES, workers=DEFAULT_WORKERS):
+
+    # feature hashed tf-idf matrix of an iterable of description chunks (lists of strings), one pass
+    counts = sp.vstack(list(map_chunks(_hashing_chunk, ((texts, n_features) for texts in chunks), workers)),
+                       format="csr")
+    return tfidf_weight(counts)[0]
+
+
+def tfidf_features(make_chunks, max_features=MAX_FEATURES, min_df=MIN_DF, workers=DEFAULT_WORKERS):
+
+    # tf-idf matrix over a capped vocabulary, make_chunks() returns a new iterable of description chunks per pass
+    # returns the matrix and the vocabulary (token of every column)
+    document_frequency = Counter()
+    for counts in map_chunks(_document_frequency_chunk, make_chunks(), workers):
+        document_frequency.update(counts)
+    kept = [(count, token) for token, count in document_frequency.items() if count >= min_df]
+    kept.sort(key=lambda item: (-item[0], item[1]))
+    tokens = sorted(token for count, token in kept[:max_features])
+    vocabulary = dict((token, col) for col, token in enumerate(tokens))
+
+    counts = sp.vstack(list(map_chunks(_vocabulary_chunk, ((texts, vocabulary) for texts in make_chunks()), workers)),
+                       format="csr")
+    return tfidf_weight(counts)[0], tokens
+
+
+def combine_features(text_matrix, codes, levels, weight=1.0):
+
+    # description features followed by the one-hot CVSS codes (weight per field), rows in the same order
+    offsets = np.concatenate(([0], np.cumsum(levels)[:-1]))
+    n_rows, n_fields = codes.shape
+    one_hot = sp.csr_matrix((np.full(n_rows * n_fields, weight, dtype=np.float32),
+                             (codes.astype(np.int64) + offsets).reshape(-1),
+                             np.arange(0, n_rows * n_fields + 1, n_fields)),
+                            shape=(n_rows, int(np.sum(levels))))
+    return sp.hstack([text_matrix, one_hot], format="csr")
+
+
+def save_features(path, matrix, ids, mode, vocabulary=None):
+    sp.save_npz(path, matrix)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"mode": mode, "shape": list(matrix.shape), "CVD_ID": list(ids), "vocabulary": vocabulary}, f)
+
+
+def feed_store(input_file, store_file, chunk_size=CHUNK_SIZE):
+
+    # stream the records of the feeds into a record store, one feed and at most chunk_size records at a time
+    store = open_store(store_file)
+    try:
+        for feed in find_feeds(input_file):
+            chunk = []
+            for record in extract_records(iter_cve_items(feed)):
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    apply_records(store, chunk)
+                    chunk = []
+            if chunk:
+                apply_records(store, chunk)
+    finally:
+        store.close()
+
+
+def description_chunks(store_file, chunk_size=CHUNK_SIZE):
+
+    # (ids, descriptions) chunks of the record store
+    store = open_store(store_file)
+    try:
+        for chunk in iter_description_chunks(store, chunk_size):
+            yield list(chunk['CVD_ID']), list(chunk['Description'])
+    finally:
+        store.close()
+
+
+def features(store_file, output_file, mode):
+
+    # description features of the records of a record store
+    ids = []
+
+    def texts():
+        # descriptions of every chunk, the ids are collected on the first pass
+        collect = not ids
+        for chunk_ids, chunk_texts in description_chunks(store_file):
+            if collect:
+                ids.extend(chunk_ids)
+            yield chunk_texts
+
+    if mode == "tfidf":
+        matrix, vocabulary = tfidf_features(texts)
+    elif mode == "hashing":
+        matrix, vocabulary = hashing_features(texts()), None
+    else:
+        raise ValueError("Unknown feature mode: " + mode)
+
+    save_features(output_file, matrix, ids, mode, vocabulary)
+    print("Description features:", matrix.shape[0], "records,", matrix.shape[1], "columns,", matrix.nnz, "non zero")
+    print("Features written to", output_file)
+
+
+def run(input_file, output_file, mode=DEFAULT_MODE):
+
+    # feeds are parsed once into a temporary record store, a record store is read directly
+    if input_file.endswith(STORE_EXTENSION):
+        features(input_file, output_file, mode)
+    else:
+        with tempfile.TemporaryDirectory(prefix="nvd_text_features_") as directory:
+            store_file = os.path.join(directory, "records" + STORE_EXTENSION)
+            feed_store(input_file, store_file)
+            features(store_file, output_file, mode)
+
+
+def main():
+
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INPUT_FILE_NAME
+    output_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT_FILE_NAME
+    mode = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_MODE
+    run(input_file, output_file, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#
+# DESCRIPTION:
+# Tests of nvd_clustering_hyperparameter_validation.py: the Max_Iter column of the results table is the max_iter every
+# fit of the sweep, of the warm started sweep and of the quality metrics was actually run with.
+#
+# How to run the tests
+#   python -m pytest -q test_nvd_clustering_hyperparameter_validation.py
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+import glob
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pytest
+
+import nvd_clustering_hyperparameter_validation as validation
+import nvd_metrics
+import nvd_sweep
+from nvd_encoded_data import EncodedData, save_dataset
+from nvd_encoding import CVSS_V3_CODEBOOK, n_levels
+from nvd_kmodes import KModes
+
+
+def small_dataset(directory):
+
+    # encoded dataset of 200 random CVSS vectors
+    levels = n_levels(CVSS_V3_CODEBOOK)
+    codes = np.random.RandomState(0).randint(0, levels, size=(200, len(levels))).astype(np.uint8)
+    path = os.path.join(directory, "dataset")
+    save_dataset(path, codes, CVSS_V3_CODEBOOK, ["CVE-%d" % i for i in range(len(codes))])
+    return EncodedData(path)
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+
+    # a small in-process sweep with its outputs and cache in tmp_path, every max_iter a KModes is built with is recorded
+    used = []
+
+    class RecordingKModes(KModes):
+        def __init__(self, *args, **kwargs):
+            used.append(kwargs.get('max_iter'))
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(nvd_sweep, "KModes", RecordingKModes)
+    monkeypatch.setattr(nvd_metrics, "KModes", RecordingKModes)
+    monkeypatch.setattr(validation, "ITERATIONS_MAX", 7)
+    monkeypatch.setattr(validation, "NUMBER_OF_CLUSTERS", [2, 3, 4])
+    monkeypatch.setattr(validation, "NUMBER_RUNS", 2)
+    monkeypatch.setattr(validation, "STABILITY_RESTARTS", 2)
+    monkeypatch.setattr(validation, "WORKERS", 1)
+    monkeypatch.setattr(validation, "CACHE_DIRECTORY", str(tmp_path / "cache"))
+    monkeypatch.setattr(validation, "HYPERPARAMETER_FILE_NAME", str(tmp_path / "Hyperparameter.png"))
+    monkeypatch.setattr(validation, "CLUSTERS_FILE_NAME", str(tmp_path / "Clusters.csv"))
+    return used
+
+
+@pytest.mark.parametrize("warm_start", [False, True])
+def test_max_iter_column_is_the_fit_setting(settings, tmp_path, monkeypatch, warm_start):
+    monkeypatch.setattr(validation, "WARM_START", warm_start)
+    results = validation.clustering_validation(small_dataset(str(tmp_path)))
+
+    assert set(results['Max_Iter']) == {7}
+    # every fit of the sweep and of the quality metrics
+    assert settings and set(settings) == {7}
+    if not warm_start:
+        # the cached fits are keyed and stored with the same setting
+        entries = glob.glob(str(tmp_path / "cache" / "*.npz"))
+        assert len(entries) == len(results)
+        for entry in entries:
+            with np.load(entry) as fit:
+                assert int(fit['max_iter']) == 7
@@ -0,0 +1,42 @@
+#
+# DESCRIPTION:
+# Tests of nvd_near_duplicates.py: records without a description (empty, or only stop words) stay groups of their own
+# and are never banded together, while copies of one description are still grouped.
+#
+# How to run the tests
+#   python -m pytest -q test_nvd_near_duplicates.py
+#
+# Version History:
+#
+#   Written by:  INCAT Project
+#   Date:  10/18/2026
+#
+#   Modified by: .....
+#
+
+from nvd_near_duplicates import open_index, add_records, load_groups, representatives
+
+ADVISORY = ("Multiple cross-site scripting vulnerabilities in the admin console of the example web server allow "
+            "remote attackers to inject arbitrary web script or HTML via crafted parameters")
+
+
+def test_empty_descriptions_are_not_near_duplicates(tmp_path):
+    index = open_index(str(tmp_path / "index.sqlite"))
+    ids = ["CVE-2018-0001", "CVE-2018-0002", "CVE-2018-0003", "CVE-2018-0004", "CVE-2018-0005"]
+    descriptions = ["", "", "the of and", ADVISORY, ADVISORY + "."]
+
+    flags = representatives(index, ids, descriptions)
+    groups = load_groups(index, ids)
+
+    # every record without a description is its own group and is sampled, the two copies share one group
+    assert groups[:3] == ids[:3]
+    assert groups[3] == groups[4] == "CVE-2018-0004"
+    assert list(flags) == [True, True, True, True, False]
+
+
+def test_empty_description_added_later_stays_alone(tmp_path):
+    index = open_index(str(tmp_path / "index.sqlite"))
+    add_records(index, ["CVE-2018-0001"], [""])
+    add_records(index, ["CVE-2018-0002"], [None])
+
+    assert load_groups(index, ["CVE-2018-0001", "CVE-2018-0002"]) == ["CVE-2018-0001", "CVE-2018-0002"]